@@ -0,0 +1,2 @@
+""" Benchmarks of hugin, run them with `python -m benchmarks.<name>` from the root of the repository
+"""
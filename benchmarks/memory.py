@@ -0,0 +1,135 @@
+""" Memory kept per flowcell after discovery, on synthetic data folders: the parsed flowcells (BaseFlowcell with
+RunInfo, runParameters, sample sheet and cycle times) against the FlowcellSummary records given to the trello board.
+Measured with tracemalloc, python 3 only.
+
+python -m benchmarks.memory --count 50 --samples 400 --output memory.json
+"""
+import os
+import gc
+import sys
+import json
+import shutil
+import logging
+import argparse
+import tempfile
+
+try:
+	import tracemalloc
+except ImportError:
+	# python 2
+	tracemalloc = None
+
+from utils.config.config import CONFIG
+from utils.cache.parse_cache import PARSE_CACHE
+from monitor_flowcells.flowcell_monitor import iter_flowcell_paths, summarize_flowcells, _init_flowcell
+from monitor_flowcells.flowcells.base_flowcell import BaseFlowcell
+from monitor_flowcells.flowcells import cycle_times
+from benchmarks import synthetic
+
+
+def full_flowcell(path):
+	""" Flowcell kept in memory as before the summaries: parsed files and computed status """
+	flowcell = BaseFlowcell.init_flowcell(path)
+	flowcell.run_info
+	flowcell.run_parameters
+	flowcell.cycle_times
+	if hasattr(flowcell, 'sample_sheet_summary'):
+		flowcell.sample_sheet_summary
+	flowcell.status
+	flowcell.due_date
+	flowcell.description
+	return flowcell
+
+
+def summary(path):
+	# transfers are not configured: no remote check
+	summaries = summarize_flowcells([_init_flowcell(path)])
+	return summaries[0] if summaries else None
+
+
+def retained(function, paths):
+	""" Return (objects kept by function for every path, bytes still allocated once they are built, errors) """
+	gc.collect()
+	tracemalloc.start()
+	try:
+		before = tracemalloc.get_traced_memory()[0]
+		kept = []
+		errors = 0
+		for path in paths:
+			try:
+				flowcell = function(path)
+			except Exception as e:
+				logging.debug("Cannot initialize flowcell {}: {}".format(path, e))
+				errors += 1
+				continue
+			if flowcell is not None:
+				kept.append(flowcell)
+		gc.collect()
+		size = tracemalloc.get_traced_memory()[0] - before
+	finally:
+		tracemalloc.stop()
+	return kept, size, errors
+
+
+def run(root, count, samples):
+	# MiseqFlowcell cannot build a description yet
+	data_folders = synthetic.generate(root, count, samples, instruments=('hiseq', 'hiseqx'))
+	config = {
+		'data_folders': data_folders,
+		'parse_cache': {'path': os.path.join(root, 'parse_cache.sqlite'), 'enabled': True},
+	}
+	CONFIG.update(config)
+	PARSE_CACHE.configure(config)
+	folders = [(folder, True) for folder in data_folders] + [(os.path.join(folder, 'nosync'), False) for folder in data_folders]
+	paths = [path for folder, dirs_only in folders if os.path.exists(folder) for path in iter_flowcell_paths(folder, dirs_only)]
+	# fill the parse cache, both scenarios then read the same files
+	retained(full_flowcell, paths)
+
+	results = {}
+	for name, function in (('flowcells', full_flowcell), ('summaries', summary)):
+		cycle_times.READERS.clear()
+		kept, size, errors = retained(function, paths)
+		results[name] = {
+			'flowcells': len(kept),
+			'errors': errors,
+			'bytes': size,
+			'bytes_per_flowcell': size // max(len(kept), 1),
+		}
+		del kept
+	results['ratio'] = round(results['flowcells']['bytes_per_flowcell'] / float(max(results['summaries']['bytes_per_flowcell'], 1)), 1)
+	return results
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--count', type=int, default=10, help='flowcells per instrument type and state')
+	parser.add_argument('--samples', type=int, default=None, help='rows of the sample sheets')
+	parser.add_argument('--output', help='write the results to this file instead of stdout')
+	args = parser.parse_args(argv)
+	if tracemalloc is None:
+		sys.stderr.write("The memory benchmark needs tracemalloc (python 3)\n")
+		return 1
+
+	root = tempfile.mkdtemp()
+	try:
+		results = run(root, args.count, args.samples)
+	finally:
+		# the last access times are written to the parse cache before it is removed
+		PARSE_CACHE.flush()
+		shutil.rmtree(root)
+
+	report = json.dumps({
+		'benchmark': 'memory',
+		'parameters': {'count': args.count, 'samples': args.samples},
+		'results': results,
+	}, indent=2, sort_keys=True)
+	if args.output:
+		with open(args.output, 'w') as f:
+			f.write(report)
+	else:
+		print(report)
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,114 @@
+""" Scaling benchmark of hugin on synthetic data folders and an in-process fake trello.
+Times flowcell discovery with the status/due date computation, and the trello board update,
+and prints the results as JSON.
+
+python -m benchmarks.run --count 50 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+
+from utils.config.config import CONFIG
+from utils.cache.parse_cache import PARSE_CACHE
+from monitor_flowcells.flowcell_monitor import FlowcellMonitor
+from monitor_flowcells.trello_utils.trello_board import TrelloBoard
+from benchmarks import synthetic
+from tests.fake_trello import FakeTrello
+
+
+def timed(results, name, function, *args):
+	start = time.time()
+	cpu_start = time.clock() if hasattr(time, 'clock') else time.process_time()
+	result = function(*args)
+	cpu_end = time.clock() if hasattr(time, 'clock') else time.process_time()
+	results[name] = {'seconds': round(time.time() - start, 4), 'cpu_seconds': round(cpu_end - cpu_start, 4)}
+	return result
+
+
+def discover(monitor):
+	""" Discovery of the flowcells. The status and due date are computed by the discovery workers
+	when they summarize the flowcells, so they are timed together. Returns the valid flowcells, all flowcells and the errors
+	"""
+	flowcells = monitor.get_running_flowcells() + monitor.get_nosync_flowcells()
+	valid, errors = compute_statuses(flowcells)
+	return valid, flowcells, errors
+
+
+def compute_statuses(flowcells):
+	""" Returns the flowcells whose status and due date can be computed, and the number of errors """
+	valid = []
+	errors = 0
+	for flowcell in flowcells:
+		try:
+			if flowcell.status is not None:
+				flowcell.due_date
+				valid.append(flowcell)
+		except Exception as e:
+			logging.debug("Cannot compute the status of {}: {}".format(flowcell.path, e))
+			errors += 1
+	return valid, errors
+
+
+def run(root, count, samples, workers, use_cache):
+	data_folders = synthetic.generate(root, count, samples)
+	config = {
+		'data_folders': data_folders,
+		'trello': {'board_id': 'fakeboard'},
+		'discovery': {'workers': workers},
+		'parse_cache': {'path': os.path.join(root, 'parse_cache.sqlite'), 'enabled': use_cache},
+	}
+	CONFIG.update(config)
+	PARSE_CACHE.configure(config)
+	results = {}
+	for run_name in ('cold', 'warm'):
+		monitor = FlowcellMonitor(config)
+		flowcells, discovered, errors = timed(results, '{}.discovery'.format(run_name), discover, monitor)
+		results['{}.discovery'.format(run_name)].update({'flowcells': len(discovered), 'errors': errors})
+
+		fake_trello = FakeTrello() if run_name == 'cold' else fake_trello
+		board = TrelloBoard(config, client=fake_trello)
+		requests_before = fake_trello.request_count
+		writer = timed(results, '{}.trello_update'.format(run_name), board.update, flowcells)
+		results['{}.trello_update'.format(run_name)].update({
+			'cards': len(flowcells), 'writes': writer.writes, 'skipped': writer.skipped,
+			'requests': fake_trello.request_count - requests_before,
+		})
+	return results
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--count', type=int, default=10, help='flowcells per instrument type and state')
+	parser.add_argument('--samples', type=int, default=None, help='rows of the sample sheets')
+	parser.add_argument('--workers', type=int, default=1, help='discovery workers')
+	parser.add_argument('--no-cache', action='store_true', help='disable the parse cache')
+	parser.add_argument('--output', help='write the results to this file instead of stdout')
+	args = parser.parse_args(argv)
+
+	root = tempfile.mkdtemp()
+	try:
+		results = run(root, args.count, args.samples, args.workers, not args.no_cache)
+	finally:
+		# the last access times are written to the parse cache before it is removed
+		PARSE_CACHE.flush()
+		shutil.rmtree(root)
+
+	report = json.dumps({
+		'benchmark': 'hugin',
+		'parameters': {'count': args.count, 'samples': args.samples, 'workers': args.workers, 'cache': not args.no_cache},
+		'results': results,
+	}, indent=2, sort_keys=True)
+	if args.output:
+		with open(args.output, 'w') as f:
+			f.write(report)
+	else:
+		print(report)
+
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -0,0 +1,86 @@
+""" Reading RunInfo.xml and runParameters.xml: the targeted readers of hugin (monitor_flowcells/flowcells/run_files.py)
+against the full parsers of flowcell_parser, on the real files of tests/test_data or of the given run folders.
+Fails if a field used by hugin has a different value.
+
+python -m benchmarks.run_files --repeat 200 [run folder ...]
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+from flowcell_parser.classes import RunInfoParser, RunParametersParser
+from monitor_flowcells.flowcells.run_files import read_run_info, read_run_parameters, RUN_INFO_FIELDS, RUN_PARAMETERS_FIELDS
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'test_data')
+
+
+def run_info_fields(data):
+	return dict((key, data.get(key)) for key in RUN_INFO_FIELDS + ('Reads', 'FlowcellLayout'))
+
+
+def run_parameters_fields(data):
+	root = list(data.values())[0] if data else {}
+	setup = root.get('Setup') or {}
+	return dict((key, setup.get(key)) for key in RUN_PARAMETERS_FIELDS)
+
+
+# file name -> (full parser, targeted reader, fields used by hugin)
+FILES = {
+	'RunInfo.xml': (lambda path: RunInfoParser(path).data, read_run_info, run_info_fields),
+	'runParameters.xml': (lambda path: RunParametersParser(path).data, read_run_parameters, run_parameters_fields),
+}
+
+
+def timed(function, path, repeat):
+	""" Return (microseconds per call, result) """
+	start = time.time()
+	for _ in range(repeat):
+		result = function(path)
+	return (time.time() - start) * 1e6 / repeat, result
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('folders', nargs='*', help='run folders, default: the flowcells of tests/test_data')
+	parser.add_argument('--repeat', type=int, default=200, help='reads of every file')
+	parser.add_argument('--output', help='write the results to this file instead of stdout')
+	args = parser.parse_args(argv)
+	folders = args.folders or sorted(glob.glob(os.path.join(TEST_DATA, '*', '*_*_*')))
+
+	results = {}
+	failures = []
+	for folder in folders:
+		for file_name, (full_parser, reader, fields) in sorted(FILES.items()):
+			path = os.path.join(folder, file_name)
+			if not os.path.exists(path):
+				continue
+			full_us, full_data = timed(full_parser, path, args.repeat)
+			reader_us, reader_data = timed(reader, path, args.repeat)
+			if fields(full_data) != fields(reader_data):
+				failures.append('{}: {} != {}'.format(path, fields(reader_data), fields(full_data)))
+			results['{}/{}'.format(os.path.basename(folder), file_name)] = {
+				'bytes': os.path.getsize(path),
+				'full_parser_us': round(full_us, 1),
+				'reader_us': round(reader_us, 1),
+				'speedup': round(full_us / reader_us, 1) if reader_us else None,
+			}
+
+	report = json.dumps({
+		'benchmark': 'run_files',
+		'parameters': {'repeat': args.repeat},
+		'results': results,
+		'failures': failures,
+	}, indent=2, sort_keys=True)
+	if args.output:
+		with open(args.output, 'w') as f:
+			f.write(report)
+	else:
+		print(report)
+	return 1 if failures else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,106 @@
+""" Startup time of the hugin CLI: every command runs in a new interpreter, which is what cron and
+short daemon restarts pay. Reports the median wall time and the heavy modules imported by each command.
+The subcommands are found through their entry points: install hugin first (pip install -e .).
+
+python -m benchmarks.startup --runs 10 --max-seconds 0.5
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+# modules which must not be imported before they are needed
+HEAVY_MODULES = ('trello', 'requests', 'oauth2', 'flowcell_parser', 'numpy', 'pkg_resources')
+
+# command line of each scenario, after `hugin`
+SCENARIOS = {
+	'help': ['--help'],
+	'state_help': ['state', '--help'],
+	'monitor_flowcells_help': ['monitor_flowcells', '--help'],
+}
+
+# runs the CLI in the new interpreter, then prints the heavy modules which have been imported
+DRIVER = """
+import sys, json
+import cli
+try:
+	cli.cli.main(sys.argv[1:], prog_name='hugin')
+except SystemExit:
+	pass
+sys.stdout.write('\\n' + json.dumps(sorted(name for name in {heavy!r} if name in sys.modules)) + '\\n')
+"""
+
+
+def run_command(arguments, env):
+	""" Return (seconds, heavy modules imported) of one run of the CLI in a new interpreter """
+	driver = DRIVER.format(heavy=HEAVY_MODULES)
+	start = time.time()
+	output = subprocess.check_output([sys.executable, '-c', driver] + arguments, env=env, universal_newlines=True)
+	seconds = time.time() - start
+	return seconds, json.loads(output.strip().splitlines()[-1])
+
+
+def median(values):
+	values = sorted(values)
+	middle = len(values) // 2
+	return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2.0
+
+
+def installed_subcommands():
+	output = subprocess.check_output([sys.executable, '-c', 'import cli; print(" ".join(cli.subcommand_entry_points()))'],
+									 universal_newlines=True)
+	return output.split()
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--runs', type=int, default=10, help='runs of every command, the median is reported')
+	parser.add_argument('--max-seconds', type=float, default=None, help='fail if the median of a command is slower')
+	parser.add_argument('--output', help='write the results to this file instead of stdout')
+	args = parser.parse_args(argv)
+
+	folder = tempfile.mkdtemp()
+	try:
+		config_path = os.path.join(folder, 'config.yaml')
+		with open(config_path, 'w') as f:
+			f.write('parse_cache:\n   enabled: false\n')
+		env = dict(os.environ, HUGIN_CONFIG=config_path)
+		subcommands = installed_subcommands()
+
+		results = {}
+		failures = []
+		for name, arguments in sorted(SCENARIOS.items()):
+			if arguments[0] != '--help' and arguments[0] not in subcommands:
+				sys.stderr.write("{}: '{}' is not installed, skipped\n".format(name, arguments[0]))
+				continue
+			runs = [run_command(arguments, env) for _ in range(args.runs)]
+			seconds = median([run[0] for run in runs])
+			heavy = runs[-1][1]
+			results[name] = {'seconds': round(seconds, 4), 'heavy_modules': heavy}
+			if args.max_seconds is not None and seconds > args.max_seconds:
+				failures.append('{} takes {:.3f}s, more than {}s'.format(name, seconds, args.max_seconds))
+			if heavy:
+				failures.append('{} imports {}'.format(name, ', '.join(heavy)))
+	finally:
+		shutil.rmtree(folder)
+
+	report = json.dumps({
+		'benchmark': 'startup',
+		'parameters': {'runs': args.runs, 'max_seconds': args.max_seconds},
+		'results': results,
+		'failures': failures,
+	}, indent=2, sort_keys=True)
+	if args.output:
+		with open(args.output, 'w') as f:
+			f.write(report)
+	else:
+		print(report)
+	return 1 if failures else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,133 @@
+""" Count the filesystem calls needed to get the state of a flowcell,
+with the per-marker calls used before FlowcellProbe and with FlowcellProbe.
+
+python -m benchmarks.state_probe [number of flowcells per state]
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+import monitor_flowcells.flowcells.state_probe as state_probe
+from monitor_flowcells.flowcells.state_probe import FlowcellProbe, RTA_COMPLETE, DEMUX_DIR, DEMUX_FILE
+
+# markers present in each state
+STATES = {
+	'sequencing': [],
+	'sequencing_done': [RTA_COMPLETE],
+	'demultiplexing': [RTA_COMPLETE, DEMUX_DIR],
+	'demultiplexing_done': [RTA_COMPLETE, DEMUX_DIR, DEMUX_FILE],
+}
+
+
+class CallCounter(object):
+	""" Replaces os.stat, os.lstat, os.listdir and scandir with counting wrappers """
+	FUNCTIONS = ('stat', 'lstat', 'listdir')
+
+	def __init__(self):
+		self.calls = 0
+
+	def __enter__(self):
+		self._originals = dict((name, getattr(os, name)) for name in self.FUNCTIONS)
+		self._scandir = state_probe.scandir
+		for name, function in self._originals.items():
+			setattr(os, name, self._counting(function))
+		state_probe.scandir = self._counting_scandir
+		return self
+
+	def __exit__(self, *args):
+		for name, function in self._originals.items():
+			setattr(os, name, function)
+		state_probe.scandir = self._scandir
+
+	def _counting(self, function):
+		def wrapper(*args, **kwargs):
+			self.calls += 1
+			return function(*args, **kwargs)
+		return wrapper
+
+	def _counting_scandir(self, path):
+		self.calls += 1
+		return [CountingEntry(entry, self) for entry in self._scandir(path)]
+
+
+class CountingEntry(object):
+	def __init__(self, entry, counter):
+		self._entry = entry
+		self._counter = counter
+		self.name = entry.name
+		self.path = entry.path
+
+	def is_dir(self):
+		# d_type, no system call
+		return self._entry.is_dir()
+
+	def stat(self):
+		self._counter.calls += 1
+		return self._entry.stat()
+
+
+def create_flowcells(root, count):
+	flowcells = []
+	for state, markers in sorted(STATES.items()):
+		for index in range(count):
+			path = os.path.join(root, '150424_ST-E00214_{:04d}_B{}'.format(index, state.upper()))
+			os.makedirs(os.path.join(path, 'Logs'))
+			for marker in markers:
+				marker_path = os.path.join(path, marker)
+				if marker == DEMUX_DIR:
+					os.makedirs(os.path.join(marker_path, 'Stats'))
+				else:
+					open(marker_path, 'w').close()
+			flowcells.append(path)
+	return flowcells
+
+
+def legacy_probe(path):
+	""" Calls done by BaseFlowcell and get_running_flowcells() before FlowcellProbe """
+	os.path.isdir(path)
+	os.path.getctime(path)
+	rta_file = os.path.join(path, RTA_COMPLETE)
+	if os.path.exists(rta_file):
+		os.path.getmtime(rta_file)
+	demux_dir = os.path.join(path, DEMUX_DIR)
+	if os.path.exists(demux_dir):
+		os.path.getctime(demux_dir)
+		demux_file = os.path.join(path, DEMUX_FILE)
+		if os.path.exists(demux_file):
+			os.path.getmtime(demux_file)
+
+
+def scandir_probe(path):
+	probe = FlowcellProbe(path)
+	probe.getctime()
+	if probe.exists(RTA_COMPLETE):
+		probe.getmtime(RTA_COMPLETE)
+	if probe.exists(DEMUX_DIR):
+		probe.getctime(DEMUX_DIR)
+		if probe.exists(DEMUX_FILE):
+			probe.getmtime(DEMUX_FILE)
+
+
+def main(count=25):
+	root = tempfile.mkdtemp()
+	try:
+		flowcells = create_flowcells(root, count)
+		results = {}
+		for name, probe in (('before', legacy_probe), ('after', scandir_probe)):
+			results[name] = {}
+			for state in sorted(STATES):
+				paths = [path for path in flowcells if path.endswith(state.upper())]
+				with CallCounter() as counter:
+					for path in paths:
+						probe(path)
+				results[name][state] = float(counter.calls) / len(paths)
+		print(json.dumps({'benchmark': 'state_probe', 'unit': 'filesystem calls per flowcell', 'results': results},
+						 indent=2, sort_keys=True))
+	finally:
+		shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+	main(*[int(arg) for arg in sys.argv[1:]])
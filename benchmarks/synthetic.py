@@ -0,0 +1,146 @@
+""" Generator of synthetic data folders with HiSeq, HiSeq X and MiSeq flowcells in mixed states.
+RunInfo.xml and runParameters.xml are copied from the flowcells in tests/test_data, with the names replaced,
+CycleTimes.txt and SampleSheet.csv are generated with realistic sizes.
+
+python -m benchmarks.synthetic <root folder> [flowcells per type and state]
+"""
+import os
+import sys
+import datetime
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'test_data')
+
+STATES = ('sequencing', 'demultiplexing', 'demultiplexed', 'nosync')
+
+# template flowcell, parts of its name, cycles and minutes per cycle of each type
+INSTRUMENTS = {
+	'hiseqx': {
+		'template': os.path.join('hiseqx', '150424_ST-E00214_0031_BH2WY7CCXX'),
+		'date': '150424', 'instrument': 'ST-E00214', 'number': '0031', 'position': 'B', 'flowcell': 'H2WY7CCXX',
+		'flowcell_format': 'H{:04d}CCXX',
+		'cycles': 310, 'cycle_minutes': 10, 'lanes': 8,
+	},
+	'hiseq': {
+		'template': os.path.join('hiseq', '151204_D00483_0115_BC81N5ANXX'),
+		'date': '151204', 'instrument': 'D00483', 'number': '0115', 'position': 'B', 'flowcell': 'C81N5ANXX',
+		'flowcell_format': 'C{:04d}ANXX',
+		'cycles': 268, 'cycle_minutes': 43, 'lanes': 8,
+	},
+	'miseq': {
+		'template': os.path.join('miseq', '150622_M01548_0013_000000000-AF87Y'),
+		'date': '150622', 'instrument': 'M01548', 'number': '0013', 'position': '', 'flowcell': '000000000-AF87Y',
+		'flowcell_format': '000000000-A{:04d}',
+		'cycles': 618, 'cycle_minutes': 6, 'lanes': 1,
+	},
+}
+
+# records written by the instrument for each cycle
+CYCLE_EVENTS = ('Start chemistry', 'End chemistry', 'Start Imaging', 'End Imaging')
+
+
+def flowcell_name(instrument, index, date):
+	params = INSTRUMENTS[instrument]
+	flowcell = params['flowcell_format'].format(index)
+	name = '{}_{}_{:04d}_{}{}'.format(date.strftime('%y%m%d'), params['instrument'], index, params['position'], flowcell)
+	return name, flowcell
+
+
+def write_template(instrument, file_name, flowcell_path, name, flowcell, date):
+	params = INSTRUMENTS[instrument]
+	template_name = '{}_{}_{}_{}{}'.format(params['date'], params['instrument'], params['number'], params['position'], params['flowcell'])
+	with open(os.path.join(TEST_DATA, params['template'], file_name)) as template:
+		content = template.read()
+	content = content.replace(template_name, name).replace(params['flowcell'], flowcell)
+	content = content.replace(params['date'], date.strftime('%y%m%d'))
+	with open(os.path.join(flowcell_path, file_name), 'w') as f:
+		f.write(content)
+
+
+def write_cycle_times(path, flowcell, start, cycles, cycle_minutes):
+	cycle_duration = datetime.timedelta(minutes=cycle_minutes)
+	event_duration = cycle_duration / len(CYCLE_EVENTS)
+	with open(path, 'w') as f:
+		f.write('Date\tTime\tBarcode\tCycle\tInfo\t\r\n')
+		for cycle in range(cycles):
+			for event_index, event in enumerate(CYCLE_EVENTS):
+				time = start + cycle * cycle_duration + event_index * event_duration
+				f.write('{}/{}/{}\t{}\t{}\t{}\t{}\t\r\n'.format(
+					time.month, time.day, time.year, time.strftime('%H:%M:%S.%f')[:-3], flowcell, cycle + 1, event))
+
+
+def write_sample_sheet(instrument, path, flowcell, date, samples):
+	lanes = INSTRUMENTS[instrument]['lanes']
+	with open(path, 'w') as f:
+		if instrument == 'hiseq':
+			f.write('FCID,Lane,SampleID,SampleRef,Index,Description,Control,Recipe,Operator,SampleProject\n')
+			for sample in range(samples):
+				project = 'P_Project_{:02d}'.format(sample % 7)
+				f.write('{},{},P{:04d}_{},hg19,ACGTACGT-TGCATGCA,{},N,,Operator,{}\n'.format(
+					flowcell, sample % lanes + 1, sample % 7, sample, project, project))
+		else:
+			f.write('[Header]\nInvestigator Name,Operator\nExperiment Name,{}\nDate,{}\n'.format(flowcell, date.strftime('%Y-%m-%d')))
+			f.write('[Data]\n')
+			if instrument == 'hiseqx':
+				f.write('Lane,SampleID,SampleName,SamplePlate,SampleWell,index,Project\n')
+				for sample in range(samples):
+					f.write('{},Sample_P{:04d}_{},P{:04d}_{},FCB_{},1:1,ACGTACGT,P_Project_{:02d}\n'.format(
+						sample % lanes + 1, sample % 7, sample, sample % 7, sample, date.strftime('%y%m%d'), sample % 7))
+			else:
+				f.write('Sample_ID,Sample_Name,Sample_Plate,Sample_Well,Sample_Project,index,I7_Index_ID,index2,I5_Index_ID,Description\n')
+				for sample in range(samples):
+					f.write('P{:04d}_{},P{:04d}_{},Plate,A1,P_Project_{:02d},ACGTACGT,D701,TGCATGCA,D501,Production\n'.format(
+						sample % 7, sample, sample % 7, sample, sample % 7))
+
+
+def create_flowcell(data_folder, instrument, state, index, samples, now):
+	params = INSTRUMENTS[instrument]
+	run_duration = datetime.timedelta(minutes=params['cycle_minutes'] * params['cycles'])
+	if state == 'sequencing':
+		# half of the cycles are done
+		start = now - run_duration / 2
+		cycles = params['cycles'] // 2
+	else:
+		start = now - run_duration - datetime.timedelta(hours=2 + index % 48)
+		cycles = params['cycles']
+
+	name, flowcell = flowcell_name(instrument, index, start)
+	parent = os.path.join(data_folder, 'nosync') if state == 'nosync' else data_folder
+	flowcell_path = os.path.join(parent, name)
+	os.makedirs(os.path.join(flowcell_path, 'Logs'))
+
+	write_template(instrument, 'RunInfo.xml', flowcell_path, name, flowcell, start)
+	write_template(instrument, 'runParameters.xml', flowcell_path, name, flowcell, start)
+	write_cycle_times(os.path.join(flowcell_path, 'Logs', 'CycleTimes.txt'), flowcell, start, cycles, params['cycle_minutes'])
+	write_sample_sheet(instrument, os.path.join(flowcell_path, 'SampleSheet.csv'), flowcell, start, samples)
+
+	if state != 'sequencing':
+		open(os.path.join(flowcell_path, 'RTAComplete.txt'), 'w').close()
+		os.makedirs(os.path.join(flowcell_path, 'Demultiplexing', 'Stats'))
+	if state in ('demultiplexed', 'nosync'):
+		open(os.path.join(flowcell_path, 'Demultiplexing', 'Stats', 'ConversionStats.xml'), 'w').close()
+	return flowcell_path
+
+
+def generate(root, count=10, samples=None, instruments=None):
+	""" Create one data folder per instrument type in root, with count flowcells in every state.
+	Returns the list of data folders.
+
+	:param int samples: Rows of the sample sheets, default: 16 per lane
+	"""
+	now = datetime.datetime.now()
+	data_folders = []
+	for instrument in sorted(instruments or INSTRUMENTS):
+		data_folder = os.path.join(root, instrument)
+		os.makedirs(os.path.join(data_folder, 'nosync'))
+		index = 0
+		for state in STATES:
+			for _ in range(count):
+				index += 1
+				create_flowcell(data_folder, instrument, state, index, samples or 16 * INSTRUMENTS[instrument]['lanes'], now)
+		data_folders.append(data_folder)
+	return data_folders
+
+
+if __name__ == '__main__':
+	for data_folder in generate(sys.argv[1], *[int(arg) for arg in sys.argv[2:]]):
+		print(data_folder)
@@ -2,8 +2,6 @@
 import logging
 import os
 
-from pkg_resources import iter_entry_points
-
 import click
 from utils import log
 from utils.config import config as conf
@@ -11,7 +9,67 @@ from utils.config import config as conf
 
 logger = logging.getLogger(__name__)
 
-@click.group()
+SUBCOMMANDS_GROUP = 'hugin.subcommands'
+
+# short help of the subcommands of setup.py, listed by `hugin --help` without importing them
+SUBCOMMAND_HELP = {
+	'monitor_flowcells': 'Collect information from the filesystem and update the trello board',
+	'state': 'Inspect and reset the state of the flowcells processed by the previous runs',
+	'prune_board': 'Close the old cards of the archived lists of the trello board',
+	'test': 'Run unittests with the default config file: tests/config.yaml.',
+}
+
+# names the subcommands had when they were registered with the names of their functions
+SUBCOMMAND_ALIASES = {
+	'test_flowcells': 'test',
+}
+
+
+def subcommand_entry_points(group=SUBCOMMANDS_GROUP):
+	""" Return the entry points of the subcommands by name, without importing them """
+	from utils.plugins.entry_points import entry_points_by_name
+	return entry_points_by_name(group)
+
+
+class LazyGroup(click.Group):
+	""" Group whose subcommands are entry points, only the module of the invoked subcommand is imported.
+	`hugin --help` lists the names of the subcommands without importing any of them.
+	"""
+	def __init__(self, *args, **kwargs):
+		self.entry_points_loader = kwargs.pop('entry_points_loader', subcommand_entry_points)
+		self.command_help = kwargs.pop('command_help', SUBCOMMAND_HELP)
+		self.aliases = kwargs.pop('aliases', SUBCOMMAND_ALIASES)
+		super(LazyGroup, self).__init__(*args, **kwargs)
+		self._entry_points = None
+
+	@property
+	def entry_points(self):
+		if self._entry_points is None:
+			self._entry_points = self.entry_points_loader()
+		return self._entry_points
+
+	def list_commands(self, ctx):
+		return sorted(set(self.commands) | set(self.entry_points))
+
+	def get_command(self, ctx, cmd_name):
+		if cmd_name not in self.commands and cmd_name not in self.entry_points:
+			cmd_name = self.aliases.get(cmd_name, cmd_name)
+		if cmd_name not in self.commands and cmd_name in self.entry_points:
+			self.add_command(self.entry_points[cmd_name].load(), cmd_name)
+		return self.commands.get(cmd_name)
+
+	def format_commands(self, ctx, formatter):
+		rows = []
+		for name in self.list_commands(ctx):
+			# the help of a subcommand is known once it is loaded, the declared one is used until then
+			command = self.commands.get(name)
+			rows.append((name, command.get_short_help_str() if command is not None else self.command_help.get(name, '')))
+		if rows:
+			with formatter.section('Commands'):
+				formatter.write_dl(rows)
+
+
+@click.group(cls=LazyGroup)
 # Priority for the configuration file is: environment variable > -c option > default
 @click.option('-c', '--config-file',
 			  default=os.path.join(os.environ['HOME'], '.hugin/config.yaml'),
@@ -22,20 +80,29 @@ logger = logging.getLogger(__name__)
               type=click.Choice(['DEBUG', 'INFO', 'WARNING', 'ERROR']),
               default='ERROR',
 			  help='Level of the logging')
+@click.option('--profile', is_flag=True,
+			  help='Profile the run with cProfile and print the slowest functions at exit')
 @click.pass_context
-def cli(ctx, config_file, log_level):
+def cli(ctx, config_file, log_level, profile):
 	""" Tool to monitor flowcell statuses and display the flowcells on the Trello board """
 
+	# imported when a subcommand runs, not for `hugin --help`
+	from utils.cache.parse_cache import PARSE_CACHE
+	from monitor_flowcells.flowcells.transfer_status import TRANSFER_STATUS
+
 	config = conf.load_yaml_config(config_file)
 	config.update({'config_path': config_file})
+	PARSE_CACHE.configure(config)
+	TRANSFER_STATUS.configure(config)
 
 	log_file = config.get('log', {}).get('file', None)
 	if log_file:
 		log.init_logger_file(log_file, log_level)
 
-	logger.debug('starting up CLI')
+	if profile:
+		from utils.profiling.profiler import start_profiler
+		# the profiler is stopped when the subcommand returns
+		ctx.call_on_close(start_profiler(config.get('profiling', {}).get('stats_file')))
 
+	logger.debug('starting up CLI')
 
-#Add subcommands dynamically to the CLI
-for entry_point in iter_entry_points('hugin.subcommands'):
-	cli.add_command(entry_point.load())
@@ -1,12 +1,20 @@
 import click
 import logging
 
-from monitor_flowcells.flowcell_monitor import FlowcellMonitor
+from monitor_flowcells.flowcell_monitor import FlowcellMonitor, DEFAULT_RETRY_INTERVAL
 from utils.config.config import CONFIG
+from utils.cache.parse_cache import PARSE_CACHE
+from monitor_flowcells.watcher import create_watcher
+from monitor_flowcells.state_store import FlowcellStateStore, format_state
+from monitor_flowcells.scheduler import PollScheduler
+from monitor_flowcells.trello_utils import retention
 
 # @click.group()
 @click.command()
-def monitor_flowcells():
+@click.option('--no-cache', is_flag=True, help='Parse all flowcell files, ignoring the parse cache')
+@click.option('--daemon', is_flag=True, help='Keep running and update the board when flowcells change')
+@click.option('--full', is_flag=True, help='Process all flowcells, including the ones which did not change since the previous run')
+def monitor_flowcells(no_cache, daemon, full):
 	""" Collect information from the filesystem and update the trello board"""
 	if not CONFIG.get('trello', ''):
 		logging.error("Config file missing required entries: 'trello'")
@@ -15,5 +23,65 @@ def monitor_flowcells():
 		logging.error("Config file missing required entries: 'data_folders'")
 		raise RuntimeError("Config file missing required entries: 'data_folders'")
 
+	if no_cache:
+		PARSE_CACHE.enabled = False
+
 	flowcell_monitor = FlowcellMonitor(CONFIG)
-	flowcell_monitor.update_trello_board()
\ No newline at end of file
+	if full:
+		flowcell_monitor.state_store.enabled = False
+	if daemon:
+		daemon_config = CONFIG.get('daemon') or {}
+		scheduler = PollScheduler.from_config(CONFIG)
+		watcher = create_watcher(flowcell_monitor.data_folders, poll_interval=daemon_config.get('poll_interval', 60),
+								 scheduler=scheduler if scheduler.enabled else None)
+		flowcell_monitor.run_daemon(watcher, full_sync_interval=daemon_config.get('full_sync_interval', 3600), scheduler=scheduler,
+									retry_interval=daemon_config.get('retry_interval', DEFAULT_RETRY_INTERVAL))
+	else:
+		flowcell_monitor.update_trello_board()
+		PARSE_CACHE.evict()
+
+
+@click.group()
+def state():
+	""" Inspect and reset the state of the flowcells processed by the previous runs """
+
+
+@state.command()
+@click.argument('names', nargs=-1)
+def show(names):
+	""" Show the stored state of the flowcells with the given names, or of all flowcells """
+	for flowcell_state in FlowcellStateStore.from_config(CONFIG).entries(names):
+		click.echo(format_state(flowcell_state))
+
+
+@state.command()
+@click.argument('names', nargs=-1)
+@click.option('--all', 'reset_all', is_flag=True, help='Reset all flowcells')
+def reset(names, reset_all):
+	""" Forget the flowcells with the given names: they are processed again by the next run """
+	if not names and not reset_all:
+		raise click.UsageError('Give the names of the flowcells to reset, or --all')
+	removed = FlowcellStateStore.from_config(CONFIG).reset(None if reset_all else names)
+	click.echo('{} flowcells reset'.format(removed))
+
+
+@click.command()
+@click.option('--dry-run', is_flag=True, help='List the cards which would be closed, without closing them')
+@click.option('--max-age-days', type=int, default=None, help='Close the cards without activity for more days, default: retention.max_age_days')
+@click.option('--max-cards', type=int, default=None, help='Keep at most this number of cards per list, default: retention.max_cards')
+def prune_board(dry_run, max_age_days, max_cards):
+	""" Close the old cards of the archived lists of the trello board """
+	if not CONFIG.get('trello', ''):
+		logging.error("Config file missing required entries: 'trello'")
+		raise RuntimeError("Config file missing required entries: 'trello'")
+	policy = retention.RetentionPolicy.from_config(CONFIG)
+	if max_age_days is not None:
+		policy.max_age_days = max_age_days
+	if max_cards is not None:
+		policy.max_cards = max_cards
+	if policy.max_age_days is None and policy.max_cards is None:
+		raise click.UsageError('Give --max-age-days or --max-cards, or set them in the retention section of the config file')
+	pruned = retention.prune_board(FlowcellMonitor(CONFIG).trello_board, policy, dry_run=dry_run)
+	for pruned_card in pruned:
+		click.echo(retention.format_pruned_card(pruned_card))
+	click.echo('{} cards {}'.format(len(pruned), 'would be closed' if dry_run else 'closed'))
@@ -2,11 +2,143 @@ import os
 import re
 import logging
 import socket
+import time
+import multiprocessing
+import multiprocessing.pool
+
+try:
+	from itertools import imap
+except ImportError:
+	# python 3
+	imap = map
 
 from monitor_flowcells.flowcells.base_flowcell import BaseFlowcell, FC_STATUSES
-from monitor_flowcells.trello_utils.trello_board import TrelloBoard
+from monitor_flowcells.flowcells.cycle_times import release_cycle_times
+from monitor_flowcells.flowcells.summary import FlowcellSummary
+from monitor_flowcells.flowcells.state_probe import scandir
+from monitor_flowcells.flowcells.transfer_status import TRANSFER_STATUS
+from monitor_flowcells.state_store import FlowcellStateStore
+from monitor_flowcells.trello_utils.retention import RetentionPolicy, prune_board
+from utils.cache.parse_cache import PARSE_CACHE
+from utils.profiling.phase_timer import PhaseTimer
 
 FC_NAME_RE = r'(\d{6})_([ST-]*\w+\d+)_\d+_([AB]?)([A-Z0-9\-]+)'
+FC_NAME_PATTERN = re.compile(FC_NAME_RE)
+
+# pools which can be used to discover flowcells, 'discovery.pool' in the config file
+DISCOVERY_POOLS = {
+	'thread': multiprocessing.pool.ThreadPool,
+	'process': multiprocessing.Pool,
+}
+
+# seconds before a failed iteration of the daemon is retried, doubled after each failure in a row
+DEFAULT_RETRY_INTERVAL = 60
+MAX_RETRY_INTERVAL = 900
+
+
+def iter_flowcell_paths(folder, dirs_only, ignore_cache=False):
+	""" Yield the paths of the flowcells in the folder while it is being listed.
+	Entries which are not flowcells are logged once: with ignore_cache, their names are stored
+	in the parse cache with the mtime of the folder, and skipped without a warning by the next runs.
+
+	:param bool dirs_only: Skip entries which are not directories, using d_type without a stat call
+	"""
+	known_names = frozenset()
+	folder_mtime = None
+	if ignore_cache:
+		folder_mtime = os.stat(folder).st_mtime
+		cached = PARSE_CACHE.load('ignored_entries', folder) or {}
+		known_names = cached.get('names', frozenset())
+		if cached.get('mtime') == folder_mtime:
+			folder_mtime = None
+	ignored_names = set()
+	for entry in scandir(folder):
+		if dirs_only and not entry.is_dir():
+			continue
+		fc_name = entry.name
+		if fc_name in known_names:
+			ignored_names.add(fc_name)
+			continue
+		# skip non-flowcell folders
+		if not FC_NAME_PATTERN.match(fc_name):
+			logging.warning("Flowcell name doesn't match regex: {}".format(os.path.join(folder, fc_name)))
+			ignored_names.add(fc_name)
+			continue
+		yield os.path.join(folder, fc_name)
+	# the folder changed since the names were stored
+	if folder_mtime is not None:
+		PARSE_CACHE.store('ignored_entries', folder, {'mtime': folder_mtime, 'names': frozenset(ignored_names)})
+
+
+# functions below are run by the discovery pool, they must be defined on module level to be picklable
+def _summarize(flowcell):
+	""" Return the FlowcellSummary of the flowcell, None if its status cannot be computed yet.
+	The flowcell and its parsed files are not referenced anymore and can be freed.
+	"""
+	try:
+		summary = FlowcellSummary.from_flowcell(flowcell)
+	except RuntimeError as e:
+		logging.warning("Cannot compute the status of flowcell {}: {}".format(flowcell.path, e))
+		return None
+	except Exception as e:
+		# e.g. an instrument type without the attributes of the status (MiseqFlowcell has no run_mode):
+		# the other flowcells are still summarized
+		logging.warning("Cannot compute the status of flowcell {}: {!r}".format(flowcell.path, e))
+		logging.debug("Status of flowcell {}".format(flowcell.path), exc_info=True)
+		return None
+	if flowcell.sequencing_done:
+		# CycleTimes.txt is complete, its reader doesn't need to stay in memory
+		release_cycle_times(os.path.join(flowcell.path, flowcell.cycle_times_file))
+	return summary
+
+
+def _init_flowcell(flowcell_path):
+	""" Return the FlowcellSummary of the flowcell, or the flowcell itself if its transfer must be checked:
+	the transfers are checked by the caller, for all flowcells at once (see summarize_flowcells)
+	"""
+	# depending on the type, return instance of related class (hiseq, hiseqx, miseq, etc)
+	flowcell = BaseFlowcell.init_flowcell(flowcell_path)
+	# parse the files in the worker: the caller gets a flowcell which doesn't need to wait for the filesystem
+	try:
+		flowcell.run_info
+		flowcell.run_parameters
+		flowcell.cycle_times
+		if hasattr(flowcell, 'sample_sheet_summary'):
+			flowcell.sample_sheet_summary
+	except RuntimeError as e:
+		# will be raised again when the flowcell is used
+		logging.debug("Cannot parse flowcell {}: {}".format(flowcell_path, e))
+	if flowcell.transfer_candidate:
+		return flowcell
+	return _summarize(flowcell)
+
+
+def _discover_flowcell(flowcell_path):
+	""" _init_flowcell in the discovery pool: a flowcell which cannot be initialized is logged and left out,
+	an exception raised by the pool would stop the discovery of all flowcells
+	"""
+	try:
+		return _init_flowcell(flowcell_path)
+	except Exception as e:
+		logging.warning("Cannot initialize flowcell {}: {}".format(flowcell_path, e))
+		return None
+
+
+def summarize_flowcells(flowcells):
+	""" Replace the flowcells returned by _init_flowcell by their summaries, in the same order.
+	The transfers are checked with one remote command per instrument type first.
+	The flowcells whose status cannot be computed yet are left out.
+	"""
+	candidates = [flowcell for flowcell in flowcells if not isinstance(flowcell, FlowcellSummary)]
+	if candidates:
+		TRANSFER_STATUS.prefetch_flowcells(candidates)
+	summaries = []
+	for flowcell in flowcells:
+		if not isinstance(flowcell, FlowcellSummary):
+			flowcell = _summarize(flowcell)
+		if flowcell is not None:
+			summaries.append(flowcell)
+	return summaries
 
 
 class FlowcellMonitor(object):
@@ -17,6 +149,9 @@ class FlowcellMonitor(object):
 		# initialize None values for @property functions
 		self._trello_board = None
 		self._data_folders = None
+		self.phase_timer = PhaseTimer()
+		self._state_store = None
+		self._retention_policy = None
 
 	@property
 	def config(self):
@@ -40,41 +175,101 @@ class FlowcellMonitor(object):
 	@property
 	def trello_board(self):
 		if self._trello_board is None:
+			# py-trello and requests are imported when the board is used, not on startup
+			from monitor_flowcells.trello_utils.trello_board import TrelloBoard
 			self._trello_board = TrelloBoard(self.config)
 		return self._trello_board
 
-	def get_running_flowcells(self):
-		flowcells = []
-		for data_folder in self.config.get('data_folders', []):
-			# go through subfolders
-			subfolders = filter(os.path.isdir, [os.path.join(data_folder, fc_path) for fc_path in os.listdir(data_folder)])
-			for flowcell_path in subfolders:
-				# skip non-flowcell foldersd
-				if not re.match(FC_NAME_RE, os.path.basename(flowcell_path)):
-					logging.warning("Flowcell name doesn't match regex: {}".format(flowcell_path))
-					continue
+	@property
+	def state_store(self):
+		if self._state_store is None:
+			self._state_store = FlowcellStateStore.from_config(self.config)
+		return self._state_store
 
-				# depending on the type, return instance of related class (hiseq, hiseqx, miseq, etc)
-				flowcell = BaseFlowcell.init_flowcell(path=flowcell_path)
-				flowcells.append(flowcell)
-		return flowcells
+	@property
+	def retention_policy(self):
+		if self._retention_policy is None:
+			self._retention_policy = RetentionPolicy.from_config(self.config)
+		return self._retention_policy
 
-	def get_nosync_flowcells(self):
-		flowcells = []
+	@property
+	def discovery_workers(self):
+		return int(self.config.get('discovery', {}).get('workers', 1))
+
+	@property
+	def discovery_ignore_cache(self):
+		return bool(self.config.get('discovery', {}).get('ignore_cache', True))
+
+	@property
+	def discovery_pool_type(self):
+		pool_type = self.config.get('discovery', {}).get('pool', 'thread')
+		if pool_type not in DISCOVERY_POOLS:
+			logging.error("Unknown discovery pool '{}', must be one of: {}".format(pool_type, ', '.join(DISCOVERY_POOLS)))
+			raise RuntimeError("Unknown discovery pool '{}', must be one of: {}".format(pool_type, ', '.join(DISCOVERY_POOLS)))
+		return pool_type
+
+	def get_running_flowcells(self, changed_only=False, scheduler=None):
+		data_folders = self.config.get('data_folders', [])
+		return self.init_flowcells([(data_folder, True) for data_folder in data_folders], changed_only=changed_only, scheduler=scheduler)
+
+	def get_nosync_flowcells(self, changed_only=False, scheduler=None):
 		# check nosync folder
+		nosync_folders = []
 		for data_folder in self.config.get('data_folders', []):
 			nosync_folder = os.path.join(data_folder, 'nosync')
 			if os.path.exists(nosync_folder):
-				# move flowcell to nosync list
-				for flowcell_name in os.listdir(nosync_folder):
-					flowcell_path = os.path.join(nosync_folder, flowcell_name)
-					# skip non-flowcell folders
-					if not re.match(FC_NAME_RE, os.path.basename(flowcell_path)):
-						logging.warning("Flowcell name doesn't match regex: {}".format(flowcell_path))
-						continue
-					flowcell = BaseFlowcell.init_flowcell(flowcell_path)
-					flowcells.append(flowcell)
-		return flowcells
+				nosync_folders.append((nosync_folder, False))
+		return self.init_flowcells(nosync_folders, changed_only=changed_only, scheduler=scheduler)
+
+	def init_flowcells(self, folders, changed_only=False, scheduler=None):
+		""" List flowcells in the folders and initialize them.
+		The listing is streamed: the first flowcells are initialized while the folders are still being listed.
+		With 'discovery.workers' > 1 the flowcells are initialized in a thread or process pool,
+		and returned in the same order as with a single worker.
+
+		:param list folders: tuples (folder, dirs_only)
+		:param bool changed_only: Only initialize the flowcells which changed since the previous run (state store)
+		:param PollScheduler scheduler: With changed_only, the files of the flowcells which are not due are not checked
+		"""
+		ignore_cache = self.discovery_ignore_cache
+		paths = (path for folder, dirs_only in folders for path in iter_flowcell_paths(folder, dirs_only, ignore_cache))
+		if changed_only:
+			paths = self.state_store.select(paths, self.trello_board.snapshot, scheduler=scheduler)
+
+		# folder of each flowcell, for the logs
+		folder_indexes = dict((os.path.dirname(os.path.join(folder, '_')), index) for index, (folder, _) in enumerate(folders))
+		folder_counts = [0] * len(folders)
+		pool = self._create_pool()
+		try:
+			# the flowcells are returned folder after folder: a folder starts when the previous flowcell is returned
+			previous_time = time.time()
+			folder_start_times = [previous_time] * len(folders)
+			folder_end_times = [previous_time] * len(folders)
+			imap_function = pool.imap if pool is not None else imap
+			flowcells = []
+			for flowcell in imap_function(_discover_flowcell, paths):
+				if flowcell is None:
+					continue
+				flowcells.append(flowcell)
+				index = folder_indexes[os.path.dirname(flowcell.path)]
+				if not folder_counts[index]:
+					folder_start_times[index] = previous_time
+				folder_counts[index] += 1
+				folder_end_times[index] = previous_time = time.time()
+		finally:
+			if pool is not None:
+				pool.close()
+				pool.join()
+
+		for (folder, _), count, start_time, end_time in zip(folders, folder_counts, folder_start_times, folder_end_times):
+			logging.info("Initialized {} flowcells from {} in {:.2f}s".format(count, folder, end_time - start_time))
+		return summarize_flowcells(flowcells)
+
+	def _create_pool(self):
+		workers = self.discovery_workers
+		if workers <= 1:
+			return None
+		return DISCOVERY_POOLS[self.discovery_pool_type](workers)
 
 	def archive_flowcells(self):
 		nosync_cards = self.trello_board.get_cards_by_list_name(FC_STATUSES['NOSYNC'])
@@ -91,9 +286,115 @@ class FlowcellMonitor(object):
 			if card.name not in nosync_flowcells:
 				self.trello_board.move_card(card, FC_STATUSES['ARCHIVED'])
 
-	def update_trello_board(self):
-		running_flowcells = self.get_running_flowcells()
-		self.trello_board.update(running_flowcells)
-		nosync_flowcells = self.get_nosync_flowcells()
-		self.trello_board.update(nosync_flowcells)
-		self.archive_flowcells()
+	def update_trello_board(self, scheduler=None):
+		""" Update the cards of the flowcells which changed since the previous run, or of all of them
+		if the state store is disabled. With a PollScheduler (daemon), the flowcells which are not due are skipped
+		unless their state can change without their files changing (transfers, due dates, cards moved)
+		"""
+		self.phase_timer.reset()
+		changed_only = self.state_store.enabled
+		with self.phase_timer.phase('running_discovery') as phase:
+			running_flowcells = self.get_running_flowcells(changed_only=changed_only, scheduler=scheduler)
+			phase.count = len(running_flowcells)
+		with self.phase_timer.phase('running_sync') as phase:
+			self.trello_board.update(running_flowcells)
+			self.state_store.record(running_flowcells, self.trello_board.snapshot)
+			phase.count = len(running_flowcells)
+		with self.phase_timer.phase('nosync_discovery') as phase:
+			nosync_flowcells = self.get_nosync_flowcells(changed_only=changed_only, scheduler=scheduler)
+			phase.count = len(nosync_flowcells)
+		with self.phase_timer.phase('nosync_sync') as phase:
+			self.trello_board.update(nosync_flowcells)
+			self.state_store.record(nosync_flowcells, self.trello_board.snapshot)
+			phase.count = len(nosync_flowcells)
+		with self.phase_timer.phase('archive'):
+			self.archive_flowcells()
+			self.state_store.prune()
+		# periodic pass, not run on the daemon events (sync_flowcells)
+		if self.retention_policy.enabled:
+			with self.phase_timer.phase('retention') as phase:
+				phase.count = len(prune_board(self.trello_board, self.retention_policy))
+		self.trello_board.report_metrics()
+		self.phase_timer.report(self.config.get('profiling', {}).get('file'))
+
+	def sync_flowcells(self, flowcell_paths):
+		""" Update the cards of the given flowcells only. Returns the paths which cannot be initialized yet,
+		e.g. a new flowcell folder without runParameters.xml or RunInfo.xml
+		"""
+		flowcells = []
+		pending = set()
+		removed = False
+		for flowcell_path in sorted(flowcell_paths):
+			if not FC_NAME_PATTERN.match(os.path.basename(flowcell_path)):
+				continue
+			if not os.path.exists(flowcell_path):
+				removed = True
+				continue
+			try:
+				flowcell = _init_flowcell(flowcell_path)
+			except Exception as e:
+				logging.debug("Flowcell {} cannot be initialized yet: {}".format(flowcell_path, e))
+				flowcell = None
+			if flowcell is None:
+				pending.add(flowcell_path)
+			else:
+				flowcells.append(flowcell)
+		summaries = summarize_flowcells(flowcells)
+		# flowcells kept for the transfer check whose status cannot be computed yet
+		pending.update(set(flowcell.path for flowcell in flowcells) - set(summary.path for summary in summaries))
+		if summaries:
+			self.trello_board.update(summaries)
+			self.state_store.record(summaries, self.trello_board.snapshot)
+		# flowcell removed from nosync folder
+		if removed:
+			self.archive_flowcells()
+			self.state_store.prune()
+		return pending
+
+	def run_daemon(self, watcher, full_sync_interval=3600, scheduler=None, retry_interval=DEFAULT_RETRY_INTERVAL):
+		""" Keep the board up to date: update the cards of the flowcells reported by the watcher,
+		and do a full update every full_sync_interval seconds (due dates depend on the current time).
+		With an enabled PollScheduler, the flowcells are also updated when they are due, close to their
+		predicted transitions, and the full updates can be rare.
+		An iteration which fails, e.g. trello cannot be reached, is retried after retry_interval seconds,
+		doubled after each failure in a row up to MAX_RETRY_INTERVAL.
+		"""
+		if scheduler is not None and scheduler.enabled and not self.state_store.enabled:
+			logging.warning("The scheduler needs the state store, flowcells are only updated when they change")
+			scheduler = None
+		elif scheduler is not None and not scheduler.enabled:
+			scheduler = None
+		pending = set()
+		last_full_sync = None
+		failures = 0
+		while True:
+			try:
+				if last_full_sync is None or time.time() - last_full_sync >= full_sync_interval:
+					logging.info("Full update of the trello board")
+					self.trello_board.snapshot.refresh()
+					self.update_trello_board(scheduler=scheduler)
+					PARSE_CACHE.evict()
+					last_full_sync = time.time()
+					pending = set()
+				timeout = last_full_sync + full_sync_interval - time.time()
+				if scheduler is not None:
+					scheduler.refresh(self.state_store.entries())
+					next_poll = scheduler.next_poll()
+					if next_poll is not None:
+						timeout = min(timeout, next_poll - time.time())
+				changed = watcher.wait(max(0, timeout))
+				due = scheduler.due() if scheduler is not None else set()
+				if changed or pending:
+					logging.info("Flowcells changed: {}".format(', '.join(sorted(changed | pending))))
+				if due - changed - pending:
+					logging.info("Flowcells due: {}".format(', '.join(sorted(due - changed - pending))))
+				# kept pending if the update fails
+				pending = pending | changed | due
+				if pending:
+					pending = self.sync_flowcells(pending)
+				failures = 0
+			except Exception:
+				failures += 1
+				delay = min(retry_interval * 2 ** (failures - 1), MAX_RETRY_INTERVAL)
+				logging.exception("Update of the trello board failed ({} in a row), retrying in {} seconds".format(failures, delay))
+				time.sleep(delay)
@@ -5,13 +5,18 @@ import socket
 import subprocess
 
 from utils.config.config import CONFIG as config
+from utils.cache.parse_cache import PARSE_CACHE
 
 # from monitor_flowcells.wrappers.run_info import RunInfoWrapper
 # from monitor_flowcells.wrappers.run_parameters import RunParametersWrapper
 # from monitor_flowcells.wrappers.cycle_times import CycleTimesWrapper
 # from monitor_flowcells.wrappers.sample_sheet import SampleSheetWrapper
 
-from flowcell_parser.classes import RunInfoParser, RunParametersParser, CycleTimesParser, SampleSheetParser
+from monitor_flowcells.flowcells.cycle_times import read_cycle_times
+from monitor_flowcells.flowcells.state_probe import FlowcellProbe
+from monitor_flowcells.flowcells.transfer_status import TRANSFER_STATUS
+from monitor_flowcells.flowcells.registry import INSTRUMENTS, detect_runtype
+from monitor_flowcells.flowcells.run_files import read_run_info, read_run_parameters
 
 # flowcell statuses
 FC_STATUSES =  {
@@ -38,7 +43,25 @@ DURATIONS = {
 }
 
 
+# flowcell_parser is imported when a file must be parsed, not when the parse cache has it or on startup
+def _read_sample_sheet(path):
+	from flowcell_parser.classes import SampleSheetParser
+	return SampleSheetParser(path).data
+
+
+def parse_run_parameters(path):
+	# only the fields used by hugin, see run_files
+	return PARSE_CACHE.get('run_parameters', path, read_run_parameters)
+
+
+def parse_sample_sheet(path):
+	return PARSE_CACHE.get('sample_sheet', path, _read_sample_sheet)
+
+
 class BaseFlowcell(object):
+	# key of the instrument type in the config file: sample_sheet_path, transfering
+	config_key = None
+
 	def __init__(self, path):
 		self._path = path
 
@@ -46,7 +69,10 @@ class BaseFlowcell(object):
 		self._run_parameters = None
 		self._run_info = None
 		self._cycle_times = None
+		self._cycle_times_reader = None
 		self._sample_sheet = None
+		self._sample_sheet_summary = None
+		self._probe = None
 
 		# flowcell statuses: timestamp or None
 		self._sequencing_started = None
@@ -76,23 +102,29 @@ class BaseFlowcell(object):
 	def path(self):
 		return self._path
 
+	@property
+	def probe(self):
+		if self._probe is None:
+			self._probe = FlowcellProbe(self.path)
+		return self._probe
+
 	@property
 	def run_info(self):
 		if self._run_info is None:
 			run_info_path = os.path.join(self.path, 'RunInfo.xml')
-			if not os.path.exists(run_info_path):
+			if not self.probe.exists('RunInfo.xml'):
 				raise RuntimeError('RunInfo.xml cannot be found in {}'.format(self.path))
 
-			self._run_info = RunInfoParser(run_info_path).data
+			self._run_info = PARSE_CACHE.get('run_info', run_info_path, read_run_info)
 		return self._run_info
 
 	@property
 	def run_parameters(self):
 		if self._run_parameters is None:
 			run_parameters_path = os.path.join(self.path, 'runParameters.xml')
-			if not os.path.exists(run_parameters_path):
+			if not self.probe.exists('runParameters.xml'):
 				raise RuntimeError('runParameters.xml cannot be found in {}'.format(self.path))
-			self._run_parameters = RunParametersParser(run_parameters_path).data['RunParameters']['Setup']
+			self._run_parameters = parse_run_parameters(run_parameters_path)['RunParameters']['Setup']
 		return  self._run_parameters
 
 	@property
@@ -100,11 +132,33 @@ class BaseFlowcell(object):
 		if self._cycle_times is None:
 			cycle_times_path = os.path.join(self.path, 'Logs', 'CycleTimes.txt')
 			if os.path.exists(cycle_times_path):
-				self._cycle_times = CycleTimesParser(cycle_times_path).cycles
+				self._cycle_times_reader = read_cycle_times(cycle_times_path)
+				self._cycle_times = self._cycle_times_reader.cycles
 			else:
 				logging.warning("CycleTimes.txt does not exist at {}".format(cycle_times_path))
 		return self._cycle_times
 
+	@property
+	def cycle_times_reader(self):
+		# initialized together with cycle_times
+		self.cycle_times
+		return self._cycle_times_reader
+
+	@property
+	def cycle_stats(self):
+		# CycleTimeStats, kept by the reader until CycleTimes.txt changes
+		if self.cycle_times_reader is not None:
+			return self.cycle_times_reader.stats
+		return None
+
+	@property
+	def planned_cycles(self):
+		# number of cycles of all reads and indexes, None if RunInfo.xml doesn't tell it
+		try:
+			return sum(int(read['NumCycles']) for read in self.run_info['Reads'])
+		except (KeyError, TypeError, ValueError):
+			return None
+
 	@property
 	def sample_sheet(self):
 		return NotImplementedError('sample_sheet @property must be implemented in the class {}'.format(self.__class__.__name__))
@@ -157,16 +211,19 @@ class BaseFlowcell(object):
 						self.transferring_end_time or self.demultiplexing_end_time,	now
 					)
 				elif self._status == FC_STATUSES['SEQUENCING']:
-					if self.cycle_times:
+					if self.cycle_times and self.sequencing_late(now):
 						self._check_status = "STATUS: {}, started: {}, expected end time: {}, current time: {}, current cycle: {}".format(
 							self._status, self.sequencing_started, self.sequencing_end_time, now, self.last_cycle_number
 						)
+						# like the current time and cycle, the confidence is left out of the comparison of the comments
+						if self.cycle_stats is not None and self.cycle_stats.enough_cycles:
+							self._check_status += ", confidence: {:.2f}".format(self.cycle_stats.confidence)
 		return self._check_status
 
 	@property
 	def sequencing_started(self):
 		if self._sequencing_started is None:
-			self._sequencing_started = datetime.datetime.fromtimestamp(os.path.getctime(self.path))
+			self._sequencing_started = datetime.datetime.fromtimestamp(self.probe.getctime())
 		return self._sequencing_started
 
 	@property
@@ -174,29 +231,38 @@ class BaseFlowcell(object):
 		if self._sequencing_done is None:
 			# todo: check how many cycles left
 			# if RTAComplete.txt is present, sequencing is done
-			rta_file = os.path.join(self.path, 'RTAComplete.txt')
-			if os.path.exists(rta_file):
-				self._sequencing_done = datetime.datetime.fromtimestamp(os.path.getmtime(rta_file))
+			if self.probe.exists('RTAComplete.txt'):
+				self._sequencing_done = datetime.datetime.fromtimestamp(self.probe.getmtime('RTAComplete.txt'))
 		return self._sequencing_done
 
 	@property
 	def demultiplexing_started(self):
 		if self._demultiplexing_started is None:
-			demux_dir = os.path.join(self.path, self.demux_dir)
-			if os.path.exists(demux_dir):
-				self._demultiplexing_started = datetime.datetime.fromtimestamp(os.path.getctime(demux_dir))
+			if self.probe.exists(self.demux_dir):
+				self._demultiplexing_started = datetime.datetime.fromtimestamp(self.probe.getctime(self.demux_dir))
 		return self._demultiplexing_started
 
 	@property
 	def demultiplexing_done(self):
 		if self._demultiplexing_done is None:
 			if self.demultiplexing_started:
-				demux_file = os.path.join(self.path, self.demux_file)
-				if os.path.exists(demux_file):
-					self._demultiplexing_done = datetime.datetime.fromtimestamp(os.path.getmtime(demux_file))
+				if self.probe.exists(self.demux_file):
+					self._demultiplexing_done = datetime.datetime.fromtimestamp(self.probe.getmtime(self.demux_file))
 		return self._demultiplexing_done
 
 
+	@property
+	def transfer_candidate(self):
+		# data is transferred once it is demultiplexed, nosync flowcells are done
+		return os.path.basename(os.path.dirname(self.path)) != 'nosync' and self.demultiplexing_started is not None
+
+	@property
+	def transfering_started(self):
+		if self._transfering_started is None:
+			if self.config_key is not None and self.transfer_candidate:
+				self._transfering_started = TRANSFER_STATUS.transfer_started(self.config_key, self.name)
+		return self._transfering_started
+
 	@property
 	def transfering_done(self):
 		if self._transfering_done is None:
@@ -220,32 +286,20 @@ class BaseFlowcell(object):
 
 	@classmethod
 	def init_flowcell(cls, path):
+		""" Return the flowcell of the instrument type of the run, e.g. HiseqxFlowcell.
+		The type is read from the beginning of runParameters.xml, the whole file is parsed by run_parameters.
+		"""
 		try:
-			parser = RunParametersParser(os.path.join(path, 'runParameters.xml'))
-
-		except OSError:
+			runtype = detect_runtype(os.path.join(path, 'runParameters.xml'))
+		except (IOError, OSError):
 			logging.error("Cannot find the runParameters.xml file at {}. This is quite unexpected.".format(path))
 			raise RuntimeError("Cannot find the runParameters.xml file at {}. This is quite unexpected.".format(path))
-		else:
-			try:
-				runtype = parser.data['RunParameters']["Setup"]["Flowcell"]
-			except KeyError:
-				# logger.warn("Parsing runParameters to fecth instrument type, not found Flowcell information in it. Using ApplicaiotnName")
-				runtype = parser.data['RunParameters']['Setup'].get("ApplicationName", '')
-
-			# depending on the type of flowcell, return instance of related class
-			if "HiSeq X" in runtype:
-				# import has to be here to avoid ImportError (python modules cannot import each other)
-				import monitor_flowcells.flowcells.hiseqx as hiseqx
-				return hiseqx.HiseqxFlowcell(path)
-			elif "MiSeq" in runtype:
-				import monitor_flowcells.flowcells.miseq as miseq
-				return miseq.MiseqFlowcell(path)
-			elif "HiSeq" in runtype or "TruSeq" in runtype:
-				import monitor_flowcells.flowcells.hiseq as hiseq
-				return hiseq.HiseqFlowcell(path)
-			else:
-				raise RuntimeError("Unrecognized runtype {} of run {}. Someone as likely bought a new sequencer without telling it to the bioinfo team".format(runtype, path))
+
+		# depending on the type of flowcell, return instance of related class
+		flowcell_class = INSTRUMENTS.flowcell_class(runtype)
+		if flowcell_class is None:
+			raise RuntimeError("Unrecognized runtype {} of run {}. Someone as likely bought a new sequencer without telling it to the bioinfo team".format(runtype, path))
+		return flowcell_class(path)
 
 	@property
 	def demultiplexing_end_time(self):
@@ -261,10 +315,20 @@ class BaseFlowcell(object):
 				self._transfering_end_time = self.transfering_started + DURATIONS['TRANSFERING']
 		return self._transfering_end_time
 
+	def sequencing_late(self, now):
+		# late only once the end predicted from the cycle times is past by more than its uncertainty
+		stats = self.cycle_stats
+		if stats is None or not stats.enough_cycles or not self.planned_cycles:
+			return self.sequencing_end_time < now
+		return self.sequencing_end_time + stats.eta_margin(self.planned_cycles) < now
+
 	@property
 	def sequencing_end_time(self):
 		if self._sequencing_end_time is None:
-			if self.cycle_times is None:
+			stats = self.cycle_stats
+			if stats is not None and stats.enough_cycles and self.planned_cycles:
+				self._sequencing_end_time = stats.eta(self.planned_cycles)
+			elif self.cycle_times is None:
 				start_time = self.sequencing_started
 				run_mode = self.run_mode
 				duration = CYCLE_DURATION[run_mode] * self.number_of_cycles # todo: das ist None
@@ -308,7 +372,7 @@ class BaseFlowcell(object):
                 reads=formatted_reads(self.reads),
                 index=formatted_reads(self.indexes),
                 chemistry=self.chemistry,
-				projects=";\n\t\t".join(project for project in set(self.projects)),
+				projects=";\n\t\t".join(self.projects),
         )
 		return description
 
@@ -0,0 +1,137 @@
+""" Statistics of the cycle times of a run and the predicted end of sequencing
+"""
+import math
+import datetime
+
+import numpy
+
+# the first cycles are slower (template generation, first imaging), they are not used for the predictions
+WARMUP_CYCLES = 3
+# a cycle longer than this factor times the median contains a pause of the instrument
+PAUSE_FACTOR = 3.0
+# proportion of the shortest and of the longest cycles left out of the trimmed mean
+TRIM_PROPORTION = 0.1
+# number of cycles of the trend
+WINDOW = 11
+# below this number of usable cycles, the predictions are not made: the caller falls back to CYCLE_DURATION
+MIN_CYCLES = 5
+# the predicted cycle times stay within these factors of the trimmed mean
+TREND_BOUNDS = (0.5, 2.0)
+# width of the interval of the predicted end, in robust standard deviations
+MARGIN_SIGMAS = 3.0
+# scales the median absolute deviation to the standard deviation of a normal distribution
+MAD_SCALE = 1.4826
+
+
+def _to_seconds(times):
+	""" Seconds since the epoch of naive datetimes, converted in a single call """
+	return numpy.array(times, dtype='datetime64[us]').astype(numpy.int64) / 1e6
+
+
+def _to_datetime(seconds):
+	return numpy.datetime64(int(round(seconds * 1e6)), 'us').astype(datetime.datetime)
+
+
+class CycleTimeStats(object):
+	""" Cycle times of a run as numpy arrays. The time of a cycle is the time between its start and the start of
+	the next cycle, so pauses between cycles are included. The last cycle is still running and has no time yet.
+
+	:param numpy.ndarray starts: Start of every cycle, in seconds since the epoch
+	:param numpy.ndarray ends: Last record of every cycle, in seconds since the epoch
+	"""
+	def __init__(self, starts, ends):
+		self.starts = starts
+		self.ends = ends
+		self.durations = numpy.diff(starts)
+		self._usable = None
+
+	@classmethod
+	def from_cycles(cls, cycles):
+		""" Create the statistics from the cycles of a CycleTimesReader """
+		return cls(_to_seconds([cycle['start'] for cycle in cycles]), _to_seconds([cycle['end'] for cycle in cycles]))
+
+	@property
+	def count(self):
+		""" Number of cycles started """
+		return len(self.starts)
+
+	@property
+	def usable(self):
+		""" Times of the completed cycles after the warmup, without the cycles which contain a pause """
+		if self._usable is None:
+			durations = self.durations[WARMUP_CYCLES:]
+			if len(durations):
+				durations = durations[durations <= PAUSE_FACTOR * numpy.median(durations)]
+			self._usable = durations
+		return self._usable
+
+	@property
+	def enough_cycles(self):
+		return len(self.usable) >= MIN_CYCLES
+
+	def trimmed_mean(self, proportion=TRIM_PROPORTION):
+		""" Mean of the usable cycle times without the shortest and the longest ones, None without usable cycles """
+		durations = numpy.sort(self.usable)
+		cut = int(len(durations) * proportion)
+		if cut:
+			durations = durations[cut:-cut]
+		return float(durations.mean()) if len(durations) else None
+
+	@property
+	def cycle_time(self):
+		""" Robust cycle time in seconds, None if there are not enough cycles """
+		if not self.enough_cycles:
+			return None
+		return self.trimmed_mean()
+
+	@property
+	def spread(self):
+		""" Robust standard deviation of the cycle times, in seconds """
+		usable = self.usable
+		if not len(usable):
+			return None
+		return float(MAD_SCALE * numpy.median(numpy.abs(usable - numpy.median(usable))))
+
+	@property
+	def confidence(self):
+		""" Confidence in the predictions, from 0 to 1: grows with the number of cycles, falls with their spread """
+		if not self.enough_cycles:
+			return 0.0
+		relative_spread = self.spread / self.cycle_time if self.cycle_time else 1.0
+		return float(len(self.usable) / float(len(self.usable) + MIN_CYCLES) * max(0.0, 1.0 - relative_spread))
+
+	def trend(self, window=WINDOW):
+		""" (intercept, slope) of the cycle times of the last usable cycles, as a function of the cycle index """
+		usable = self.usable[-2 * window:]
+		if len(usable) < MIN_CYCLES:
+			return None
+		slope, intercept = numpy.polyfit(numpy.arange(len(usable)), usable, 1)
+		# index 0 of the prediction is the running cycle
+		return float(intercept + slope * len(usable)), float(slope)
+
+	def predicted_durations(self, planned_cycles):
+		""" Predicted times of the running cycle and of the cycles which are not started, from the trend """
+		remaining = max(0, planned_cycles - self.count + 1)
+		cycle_time = self.cycle_time
+		trend = self.trend()
+		if trend is None:
+			return numpy.full(remaining, cycle_time)
+		intercept, slope = trend
+		return numpy.clip(intercept + slope * numpy.arange(remaining),
+						  TREND_BOUNDS[0] * cycle_time, TREND_BOUNDS[1] * cycle_time)
+
+	def eta(self, planned_cycles):
+		""" Predicted end of sequencing (datetime), None if there are not enough cycles
+
+		:param int planned_cycles: Number of cycles of the run, reads and indexes
+		"""
+		if not self.enough_cycles:
+			return None
+		return _to_datetime(self.starts[-1] + self.predicted_durations(planned_cycles).sum())
+
+	def eta_margin(self, planned_cycles):
+		""" Uncertainty of the predicted end (timedelta): the spread of the cycles adds up over the remaining ones """
+		if not self.enough_cycles:
+			return None
+		remaining = max(1, planned_cycles - self.count + 1)
+		return datetime.timedelta(seconds=MARGIN_SIGMAS * self.spread * math.sqrt(remaining))
@@ -0,0 +1,116 @@
+import os
+import datetime
+import logging
+
+from utils.cache.parse_cache import PARSE_CACHE
+
+DATE_FORMAT = '%m/%d/%Y-%H:%M:%S.%f'
+
+# readers of the flowcells seen by this process, reused on the next poll
+READERS = {}
+
+
+class CycleTimesReader(object):
+	""" Incremental reader of Logs/CycleTimes.txt
+	CycleTimes.txt contains records: <date> <time> <barcode> <cycle> <info>
+	one cycle contains a few records, the first one is the start of the cycle and the last one is the end.
+	The reader remembers the byte offset of the last poll and parses only the lines appended since then.
+	"""
+	# statistics of the cycles read so far, computed again when new lines are read. Not stored in the parse cache
+	_stats = None
+
+	def __init__(self, path):
+		self.path = path
+		self.reset()
+
+	def reset(self):
+		self.offset = 0
+		self.inode = None
+		# incomplete last line, the instrument may be writing it
+		self.partial_line = b''
+		self.cycles = []
+		self._stats = None
+		# sum of the durations of all cycles
+		self.total_duration = datetime.timedelta(0)
+
+	@property
+	def last_cycle_number(self):
+		if self.cycles:
+			return self.cycles[-1]['cycle_number']
+		return None
+
+	@property
+	def average_cycle_time(self):
+		if self.cycles:
+			return self.total_duration / len(self.cycles)
+		return None
+
+	@property
+	def stats(self):
+		if self._stats is None and self.cycles:
+			# numpy is imported when the statistics are used
+			from monitor_flowcells.flowcells.cycle_stats import CycleTimeStats
+			self._stats = CycleTimeStats.from_cycles(self.cycles)
+		return self._stats
+
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state.pop('_stats', None)
+		return state
+
+	def read(self):
+		""" Parse the lines appended since the last call. Returns True if new lines have been read """
+		stat = os.stat(self.path)
+		# the file has been replaced or truncated: start from scratch
+		if stat.st_ino != self.inode or stat.st_size < self.offset:
+			if self.inode is not None:
+				logging.debug("CycleTimes.txt has been rewritten, reading it again: {}".format(self.path))
+			self.reset()
+			self.inode = stat.st_ino
+		if stat.st_size == self.offset:
+			return False
+
+		with open(self.path, 'rb') as cycle_times_file:
+			cycle_times_file.seek(self.offset)
+			data = cycle_times_file.read()
+		self.offset += len(data)
+		self._stats = None
+
+		lines = (self.partial_line + data).split(b'\n')
+		self.partial_line = lines.pop()
+		for line in lines:
+			self._parse_line(line.decode('utf-8', 'replace'))
+		return True
+
+	def _parse_line(self, line):
+		fields = line.split()
+		try:
+			cycle_number = int(fields[3])
+			time = datetime.datetime.strptime('{}-{}'.format(fields[0], fields[1]), DATE_FORMAT)
+		except (IndexError, ValueError):
+			# header or broken line
+			return
+
+		if self.cycles and self.cycles[-1]['cycle_number'] == cycle_number:
+			cycle = self.cycles[-1]
+			self.total_duration += time - cycle['end']
+			cycle['end'] = time
+		else:
+			self.cycles.append({'cycle_number': cycle_number, 'start': time, 'end': time})
+
+
+def read_cycle_times(path):
+	""" Return the up to date CycleTimesReader of the file.
+	The state of the reader is kept in memory and in the parse cache, to continue from the last poll
+	"""
+	path = os.path.abspath(path)
+	reader = READERS.get(path) or PARSE_CACHE.load('cycle_times_reader', path) or CycleTimesReader(path)
+	if reader.read():
+		PARSE_CACHE.store('cycle_times_reader', path, reader)
+	READERS[path] = reader
+	return reader
+
+
+def release_cycle_times(path):
+	""" Forget the reader of a complete CycleTimes.txt: it doesn't grow anymore, and the parse cache still has it """
+	READERS.pop(os.path.abspath(path), None)
@@ -2,48 +2,48 @@ import logging
 import os
 import datetime
 
-from flowcell_parser.classes import SampleSheetParser
 
 from utils.config.config import CONFIG as config
-from monitor_flowcells.flowcells.base_flowcell import BaseFlowcell, CYCLE_DURATION
+from monitor_flowcells.flowcells.base_flowcell import BaseFlowcell, CYCLE_DURATION, parse_sample_sheet
+from monitor_flowcells.flowcells.sample_sheet import read_sample_sheet_summary
 
 
 class HiseqFlowcell(BaseFlowcell):
+	config_key = 'hiseq'
+
+	@property
+	def sample_sheet_path(self):
+		sample_sheet_path = os.path.join(self.path, 'SampleSheet.csv')
+		if os.path.exists(sample_sheet_path):
+			return sample_sheet_path
+		logging.warning("SampleSheet.csv does not exist: {}".format(sample_sheet_path))
+		path = config.get('sample_sheet_path', {}).get('hiseq')
+		if path is None:
+			logging.error("'sample_sheet_path' missing in the config file")
+			raise RuntimeError("'sample_sheet_path' missing in the config file: {}".format(config.get('config_path')))
+		sample_sheet_path = os.path.join(path, self.name, 'SampleSheet.csv')
+		if not os.path.exists(sample_sheet_path):
+			logging.error("SampleSheet.csv does not exist at {}".format(os.path.join(path, self.name)))
+			raise RuntimeError("SampleSheet.csv does not exist at {}".format(os.path.join(path, self.name)))
+		return sample_sheet_path
+
 	@property
 	def sample_sheet(self):
 		if self._sample_sheet is None:
-			sample_sheet_path = os.path.join(self.path, 'SampleSheet.csv')
-			if os.path.exists(sample_sheet_path):
-				self._sample_sheet = SampleSheetParser(sample_sheet_path).data
-			else:
-				logging.warning("SampleSheet.csv does not exist: {}".format(sample_sheet_path))
-				path = config.get('sample_sheet_path', {}).get('hiseq')
-				if path is None:
-					logging.error("'sample_sheet_path' missing in the config file")
-					raise RuntimeError("'sample_sheet_path' missing in the config file: {}".format(config.get('config_path')))
-				else:
-					sample_sheet_path = os.path.join(path, self.name, 'SampleSheet.csv')
-					if os.path.exists(sample_sheet_path):
-						self._sample_sheet = SampleSheetParser(os.path.join(sample_sheet_path, 'SampleSheet.csv')).data
-					else:
-						logging.error("SampleSheet.csv does not exist at {}".format(os.path.join(path, self.name)))
-						raise RuntimeError("SampleSheet.csv does not exist at {}".format(os.path.join(path, self.name)))
+			self._sample_sheet = parse_sample_sheet(self.sample_sheet_path)
 		return self._sample_sheet
 
 	@property
-	def transfering_started(self):
-		return self._transfering_started
+	def sample_sheet_summary(self):
+		if self._sample_sheet_summary is None:
+			self._sample_sheet_summary = read_sample_sheet_summary(self.sample_sheet_path)
+		return self._sample_sheet_summary
 
 	@property
 	def average_cycle_time(self):
-		if self.cycle_times:
-			sum_duration = datetime.timedelta(0)
-			for cycle in self.cycle_times:
-				duration = cycle['end'] - cycle['start']
-				sum_duration += duration
-
-			if len(self.cycle_times) > 10:
-				return sum_duration / len(self.cycle_times)
+		# robust to the slow first cycles and to pauses, see CycleTimeStats
+		if self.cycle_stats is not None and self.cycle_stats.cycle_time is not None:
+			return datetime.timedelta(seconds=self.cycle_stats.cycle_time)
 
 		return CYCLE_DURATION[self.run_mode]
 
@@ -68,7 +68,7 @@ class HiseqFlowcell(BaseFlowcell):
 	@property
 	def last_cycle_number(self):
 		if self.cycle_times:
-			return self.cycle_times[-1]['cycle_number']
+			return self.cycle_times_reader.last_cycle_number
 		return None
 
 	@property
@@ -105,9 +105,4 @@ class HiseqFlowcell(BaseFlowcell):
 
 	@property
 	def projects(self):
-		projects = []
-		for sample in self.sample_sheet:
-			project = sample['SampleProject']
-			if project not in projects:
-				projects.append(project)
-		return projects
\ No newline at end of file
+		return list(self.sample_sheet_summary.projects)
\ No newline at end of file
@@ -2,16 +2,17 @@ import datetime
 import time
 import os
 import logging
-import subprocess
 
-from flowcell_parser.classes import SampleSheetParser
 
-from monitor_flowcells.flowcells.base_flowcell import BaseFlowcell
+from monitor_flowcells.flowcells.base_flowcell import BaseFlowcell, parse_sample_sheet
 from monitor_flowcells.flowcells.base_flowcell import CYCLE_DURATION
+from monitor_flowcells.flowcells.sample_sheet import read_sample_sheet_summary
 
 from utils.config.config import CONFIG as config
 
 class HiseqxFlowcell(BaseFlowcell):
+	config_key = 'hiseqx'
+
 	@property
 	def chemistry(self):
 		return self.run_parameters['ChemistryVersion']
@@ -55,14 +56,9 @@ class HiseqxFlowcell(BaseFlowcell):
 	
 	@property
 	def average_cycle_time(self):
-		if self.cycle_times:
-			sum_duration = datetime.timedelta(0)
-			for cycle in self.cycle_times:
-				duration = cycle['end'] - cycle['start']
-				sum_duration += duration
-
-			if len(self.cycle_times) > 10:
-				return sum_duration / len(self.cycle_times)
+		# robust to the slow first cycles and to pauses, see CycleTimeStats
+		if self.cycle_stats is not None and self.cycle_stats.cycle_time is not None:
+			return datetime.timedelta(seconds=self.cycle_stats.cycle_time)
 
 		return CYCLE_DURATION[self.run_mode]
 
@@ -75,7 +71,7 @@ class HiseqxFlowcell(BaseFlowcell):
 	@property
 	def last_cycle_number(self):
 		if self.cycle_times:
-			return self.cycle_times[-1]['cycle_number']
+			return self.cycle_times_reader.last_cycle_number
 		return None
 
 	@property
@@ -90,77 +86,36 @@ class HiseqxFlowcell(BaseFlowcell):
 
 	@property
 	def projects(self):
-		projects = []
-		for lane in self.sample_sheet:
-			project = lane['Project']
-			if project not in projects:
-				projects.append(project)
-		return projects
+		return list(self.sample_sheet_summary.projects)
 
+	@property
+	def sample_sheet_path(self):
+		sample_sheet_path = os.path.join(self.path, 'SampleSheet.csv')
+		if os.path.exists(sample_sheet_path):
+			return sample_sheet_path
+		logging.warning("SampleSheet.csv does not exist: {}".format(os.path.abspath(sample_sheet_path)))
+		path = config.get('sample_sheet_path', {}).get('hiseqx')
+		if path is None:
+			logging.error("'sample_sheet_path' missing in the config file")
+			raise RuntimeError("'sample_sheet_path' missing in the config file: {}".format(config.get('config_path')))
+		sample_sheet_path = os.path.join(path, self.name, 'SampleSheet.csv')
+		if not os.path.exists(sample_sheet_path):
+			logging.error("SampleSheet.csv does not exist at {}".format(sample_sheet_path))
+			raise RuntimeError("SampleSheet.csv does not exist at {}".format(sample_sheet_path))
+		return sample_sheet_path
 
 	@property
 	def sample_sheet(self):
 		if self._sample_sheet is None:
-			sample_sheet_path = os.path.join(self.path, 'SampleSheet.csv')
-			if os.path.exists(sample_sheet_path):
-				self._sample_sheet = SampleSheetParser(sample_sheet_path).data
-			else:
-				logging.warning("SampleSheet.csv does not exist: {}".format(os.path.abspath(sample_sheet_path)))
-				path = config.get('sample_sheet_path', {}).get('hiseqx')
-				if path is None:
-					logging.error("'sample_sheet_path' missing in the config file")
-					raise RuntimeError("'sample_sheet_path' missing in the config file: {}".format(config.get('config_path')))
-				else:
-					sample_sheet_path = os.path.join(path, self.name, 'SampleSheet.csv')
-					if os.path.exists(sample_sheet_path):
-						self._sample_sheet = SampleSheetParser(sample_sheet_path).data
-					else:
-						logging.error("SampleSheet.csv does not exist at {}".format(sample_sheet_path))
-						raise RuntimeError("SampleSheet.csv does not exist at {}".format(sample_sheet_path))
+			self._sample_sheet = parse_sample_sheet(self.sample_sheet_path)
 		return self._sample_sheet
 
+	@property
+	def sample_sheet_summary(self):
+		if self._sample_sheet_summary is None:
+			self._sample_sheet_summary = read_sample_sheet_summary(self.sample_sheet_path)
+		return self._sample_sheet_summary
 
 	@property
 	def number_of_samples(self):
-		return len(self.sample_sheet)
-
-	@property
-	def transfering_started(self):
-		# if self._transfering_started is None:
-		# 	transfering= config.get('transfering')
-		# 	if transfering is None:
-		# 		logging.error("'transferring is missing in the config file: {}".format(config['config_path']))
-		# 		raise RuntimeError("'transferring is missing in the config file: {}".format(config['config_path']))
-		# 	hiseq = transfering.get('hiseqx')
-		# 	if hiseq is None:
-		# 		logging.error("'transferring configuration contains no 'hiseq' parameter: {}".format(config['config_path']))
-		# 		raise RuntimeError("'transferring configuration contains no 'hiseq' parameter: {}".format(config['config_path']))
-		# 	url = hiseq.get('url')
-		# 	username = hiseq.get('username')
-		# 	path = hiseq.get('path')
-		# 	if any((url is None, username is None, path is None)):
-		# 		logging.error("config.transfering.hiseq must specify url, username and password. Config file: {}".format(config['config_path']))
-		# 		raise RuntimeError("config.transfering.hiseq must specify url, username and password. Config file: {}".format(config['config_path']))
-		# 	path = os.path.join(path, self.name)
-		#
-		# 	# path = "/home/ekat"
-		# 	exist = "Transfering has been started at: "
-		# 	doesnt = "Transfering has not been started'"
-		# 	command = "python -c \"import os; print '{exists}' + str(os.path.getctime('{path}')) if os.path.exists('{path}') else '{doesnt}\"".format(path=path, exists=exist, doesnt=doesnt)
-		#
-		# 	try:
-		# 		ssh = subprocess.Popen(['ssh', '-t', '{}@{}'.format(username, url), command],
-	     #                   stdout=subprocess.PIPE,
-	     #                   stderr=subprocess.PIPE)
-		# 		result = ssh.communicate()
-		# 		output = result[0]
-		# 		if exist in result[0]:
-		# 			started = float(output.strip().strip(exist))
-		# 		self._transfering_started = datetime.datetime.fromtimestamp(started)
-		# 	except Exception as e:
-		# 		logging.error("Could not connect to ssh: {}@{}".format(username, url))
-		# 		logging.error(e)
-		#
-		# 	# todo: optimize! Now each flowcell connects to ssh to define due_time -> no need if status is sequencing
-
-		return self._transfering_started
\ No newline at end of file
+		return self.sample_sheet_summary.samples
@@ -2,17 +2,18 @@ import logging
 import os
 from utils.config.config import CONFIG as config
 
-from monitor_flowcells.flowcells.base_flowcell import BaseFlowcell
-from flowcell_parser.classes import SampleSheetParser
+from monitor_flowcells.flowcells.base_flowcell import BaseFlowcell, parse_sample_sheet
 
 
 class MiseqFlowcell(BaseFlowcell):
+	config_key = 'miseq'
+
 	@property
 	def sample_sheet(self):
 		if self._sample_sheet is None:
 			sample_sheet_path = os.path.join(self.path, 'SampleSheet.csv')
 			if os.path.exists(sample_sheet_path):
-				self._sample_sheet = SampleSheetParser(sample_sheet_path).data
+				self._sample_sheet = parse_sample_sheet(sample_sheet_path)
 			else:
 				logging.warning("SampleSheet.csv does not exist: {}".format(sample_sheet_path))
 				path = config.get('sample_sheet_path', {}).get('hiseqx')
@@ -27,7 +28,7 @@ class MiseqFlowcell(BaseFlowcell):
 						sample_sheet_path = os.path.join(self.path, path, 'SampleSheet.csv')
 
 					if os.path.exists(sample_sheet_path):
-						self._sample_sheet = SampleSheetParser(os.path.join(sample_sheet_path, 'SampleSheet.csv')).data
+						self._sample_sheet = parse_sample_sheet(os.path.join(sample_sheet_path, 'SampleSheet.csv'))
 					else:
 						logging.error("SampleSheet.csv does not exist at {}".format(os.path.join(path, self.name)))
 						raise RuntimeError("SampleSheet.csv does not exist at {}".format(os.path.join(path, self.name)))
@@ -0,0 +1,116 @@
+""" Instrument types: the flowcell class of every runtype found in runParameters.xml.
+Plugins add instrument types with entry points of the 'hugin.instruments' group, named after the runtype
+they match, e.g. in the setup.py of the plugin:
+
+	entry_points={'hugin.instruments': ['NovaSeq = hugin_novaseq.flowcell:NovaseqFlowcell']}
+"""
+import logging
+import importlib
+
+from utils.cache.parse_cache import PARSE_CACHE
+from monitor_flowcells.flowcells.run_files import ElementTree, iter_xml_events
+from utils.plugins.entry_points import entry_points_by_name
+
+INSTRUMENTS_GROUP = 'hugin.instruments'
+
+# runtype substring -> flowcell class. The longest substring found in the runtype wins: 'HiSeq X' before 'HiSeq'
+BUILTIN_INSTRUMENTS = {
+	'HiSeq X': 'monitor_flowcells.flowcells.hiseqx:HiseqxFlowcell',
+	'MiSeq': 'monitor_flowcells.flowcells.miseq:MiseqFlowcell',
+	'HiSeq': 'monitor_flowcells.flowcells.hiseq:HiseqFlowcell',
+	'TruSeq': 'monitor_flowcells.flowcells.hiseq:HiseqFlowcell',
+}
+
+
+def read_runtype(path):
+	""" Return Setup/Flowcell of runParameters.xml, or Setup/ApplicationName if there is no Flowcell element,
+	or the top level ApplicationName if there is no Setup. The file is read only up to the element which is found.
+	"""
+	application_name = ''
+	depth = 0
+	in_setup = False
+	for event, element in iter_xml_events(path):
+		if event == 'start':
+			depth += 1
+			if depth == 2:
+				in_setup = element.tag == 'Setup'
+			continue
+		if depth == 3 and in_setup:
+			if element.tag == 'Flowcell':
+				return element.text or ''
+			if element.tag == 'ApplicationName':
+				application_name = element.text or ''
+		elif depth == 2:
+			if in_setup:
+				return application_name
+			if element.tag == 'ApplicationName':
+				application_name = element.text or ''
+		depth -= 1
+		element.clear()
+	return application_name
+
+
+def detect_runtype(path):
+	""" Runtype of runParameters.xml, from the parse cache while the file doesn't change """
+	try:
+		return PARSE_CACHE.get('runtype', path, read_runtype)
+	except ElementTree.ParseError as e:
+		# e.g. the instrument is still writing the file
+		logging.error("Cannot parse {}: {}".format(path, e))
+		raise RuntimeError("Cannot parse {}: {}".format(path, e))
+
+
+def _load(target):
+	""" Class of a 'module:attribute' string, an entry point or the class itself """
+	if hasattr(target, 'load'):
+		return target.load()
+	if isinstance(target, type):
+		return target
+	module_name, _, attribute = target.partition(':')
+	return getattr(importlib.import_module(module_name), attribute)
+
+
+class InstrumentRegistry(object):
+	""" Maps the runtypes to the flowcell classes. The plugins are found on first use, and neither the plugins
+	nor the built-in flowcell modules are imported before a flowcell of their type is created.
+
+	:param dict instruments: runtype substring -> flowcell class, 'module:Class' string or entry point
+	:param str group: Entry point group of the plugins, None to disable the plugins
+	"""
+	def __init__(self, instruments=None, group=INSTRUMENTS_GROUP):
+		self._instruments = dict(BUILTIN_INSTRUMENTS if instruments is None else instruments)
+		self._group = group
+		self._plugins_loaded = group is None
+		self._classes = {}
+
+	def register(self, runtype, flowcell_class):
+		""" Add or replace the flowcell class of the runtypes containing the given substring """
+		self._instruments[runtype] = flowcell_class
+		self._classes.pop(runtype, None)
+
+	@property
+	def instruments(self):
+		if not self._plugins_loaded:
+			self._plugins_loaded = True
+			for runtype, entry_point in entry_points_by_name(self._group).items():
+				if runtype in self._instruments:
+					logging.info("Instrument type '{}' is replaced by the plugin {}".format(runtype, entry_point.value))
+				self.register(runtype, entry_point)
+		return self._instruments
+
+	def match(self, runtype):
+		""" Return the longest registered substring of the runtype, None if the instrument is unknown """
+		matches = [name for name in self.instruments if name in runtype]
+		return max(matches, key=len) if matches else None
+
+	def flowcell_class(self, runtype):
+		""" Return the flowcell class of the runtype, None if the instrument is unknown """
+		name = self.match(runtype)
+		if name is None:
+			return None
+		if name not in self._classes:
+			self._classes[name] = _load(self._instruments[name])
+		return self._classes[name]
+
+
+INSTRUMENTS = InstrumentRegistry()
@@ -0,0 +1,101 @@
+""" Targeted readers of RunInfo.xml and runParameters.xml: only the fields used by hugin are extracted,
+with the same values as RunInfoParser and RunParametersParser of flowcell_parser, and the files are read
+only up to the last of these fields (the list of tiles of a HiSeq X RunInfo.xml is never read).
+"""
+try:
+	import xml.etree.cElementTree as ElementTree
+except ImportError:
+	# python 3.9+: the C implementation is used by default
+	import xml.etree.ElementTree as ElementTree
+
+# bytes given to the parser at once: the fields are found in the first kilobytes of the files
+CHUNK_SIZE = 2048
+
+# children of Run in RunInfo.xml, read as text
+RUN_INFO_FIELDS = ('Flowcell', 'Instrument', 'Date')
+# children of Setup in runParameters.xml, read as text
+RUN_PARAMETERS_FIELDS = ('Flowcell', 'ApplicationName', 'RunMode', 'ChemistryVersion')
+
+
+def iter_xml_events(path):
+	""" Yield the start and end events of the XML file like iterparse, reading the file in small chunks:
+	the rest of the file is neither read nor parsed once the caller stops iterating
+	"""
+	if not hasattr(ElementTree, 'XMLPullParser'):
+		# python 2
+		for event, element in ElementTree.iterparse(path, events=('start', 'end')):
+			yield event, element
+		return
+	parser = ElementTree.XMLPullParser(events=('start', 'end'))
+	with open(path, 'rb') as xml_file:
+		while True:
+			chunk = xml_file.read(CHUNK_SIZE)
+			if not chunk:
+				break
+			parser.feed(chunk)
+			for event, element in parser.read_events():
+				yield event, element
+	# raises ParseError if the file is incomplete
+	parser.close()
+
+
+def read_run_info(path):
+	""" Return the fields of RunInfo.xml used by hugin, as RunInfoParser(path).data would:
+	Id and Number of the run, Flowcell, Instrument, Date, the attributes of the Reads and of the FlowcellLayout
+	"""
+	data = {}
+	reads = None
+	depth = 0
+	for event, element in iter_xml_events(path):
+		if event == 'start':
+			depth += 1
+			# attributes are known on start, the text only on end
+			if depth == 2 and element.tag == 'Run':
+				data['Id'] = element.get('Id')
+				data['Number'] = element.get('Number')
+			elif depth == 3 and element.tag == 'Reads':
+				reads = []
+			elif depth == 4 and reads is not None and element.tag == 'Read':
+				reads.append(dict(element.attrib))
+			elif depth == 3 and element.tag == 'FlowcellLayout':
+				data['FlowcellLayout'] = dict(element.attrib)
+			else:
+				continue
+		else:
+			depth -= 1
+			if depth == 2 and element.tag in RUN_INFO_FIELDS:
+				data[element.tag] = element.text
+			elif depth == 2 and element.tag == 'Reads':
+				data['Reads'] = reads
+				reads = None
+			element.clear()
+		if all(key in data for key in RUN_INFO_FIELDS + ('Reads', 'FlowcellLayout')):
+			break
+	return data
+
+
+def read_run_parameters(path):
+	""" Return the fields of Setup in runParameters.xml used by hugin, as RunParametersParser(path).data would:
+	{'RunParameters': {'Setup': {'Flowcell': ..., 'ApplicationName': ..., 'RunMode': ..., 'ChemistryVersion': ...}}}
+	A field missing from the file is missing from Setup. Without Setup, the root element is empty.
+	"""
+	root_tag = None
+	setup = None
+	depth = 0
+	for event, element in iter_xml_events(path):
+		if event == 'start':
+			depth += 1
+			if depth == 1:
+				root_tag = element.tag
+			elif depth == 2 and element.tag == 'Setup':
+				setup = {}
+			continue
+		depth -= 1
+		if depth == 2 and setup is not None and element.tag in RUN_PARAMETERS_FIELDS:
+			setup[element.tag] = element.text
+			if len(setup) == len(RUN_PARAMETERS_FIELDS):
+				break
+		elif depth == 1 and element.tag == 'Setup':
+			break
+		element.clear()
+	return {root_tag: {} if setup is None else {'Setup': setup}}
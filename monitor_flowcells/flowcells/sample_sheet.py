@@ -0,0 +1,75 @@
+import io
+import csv
+import sys
+import collections
+
+from utils.cache.parse_cache import PARSE_CACHE
+
+# columns of the project and lane in the sample sheets of the different instruments
+PROJECT_COLUMNS = ('Project', 'SampleProject', 'Sample_Project')
+LANE_COLUMNS = ('Lane',)
+
+# what hugin needs from a sample sheet, much smaller than the parsed sheet:
+# projects in the order of their first sample, number of samples (rows), sorted lanes
+SampleSheetSummary = collections.namedtuple('SampleSheetSummary', ['projects', 'samples', 'lanes'])
+
+
+def _column(header, names):
+	for name in names:
+		if name in header:
+			return header.index(name)
+	return None
+
+
+def _lane_key(lane):
+	return (0, int(lane), lane) if lane.isdigit() else (1, 0, lane)
+
+
+def _open_csv(path):
+	if sys.version_info[0] < 3:
+		return open(path, 'rb')
+	return io.open(path, newline='', encoding='utf-8-sig', errors='replace')
+
+
+def summarize_sample_sheet(path):
+	""" Read the sample sheet line by line and return its SampleSheetSummary.
+	Both the plain csv sheets (HiSeq) and the sheets with [Header] and [Data] sections (HiSeq X, MiSeq) are supported.
+	"""
+	projects = []
+	seen_projects = set()
+	lanes = set()
+	samples = 0
+	with _open_csv(path) as f:
+		rows = csv.reader(f)
+		header = next(rows, None)
+		if header and header[0].startswith('['):
+			# [Header], [Reads] and [Settings] sections come first, the header of the samples follows [Data]
+			header = None
+			for row in rows:
+				if row and row[0].strip().startswith('[Data]'):
+					header = next(rows, None)
+					break
+		if not header:
+			return SampleSheetSummary(projects=(), samples=0, lanes=())
+
+		header = [column.strip() for column in header]
+		project_column = _column(header, PROJECT_COLUMNS)
+		lane_column = _column(header, LANE_COLUMNS)
+		for row in rows:
+			if not any(value.strip() for value in row):
+				continue
+			samples += 1
+			if project_column is not None and project_column < len(row):
+				project = row[project_column]
+				if project not in seen_projects:
+					seen_projects.add(project)
+					projects.append(project)
+			if lane_column is not None and lane_column < len(row):
+				lanes.add(row[lane_column])
+	return SampleSheetSummary(projects=tuple(projects), samples=samples, lanes=tuple(sorted(lanes, key=_lane_key)))
+
+
+def read_sample_sheet_summary(path):
+	""" SampleSheetSummary of the file, from the parse cache while the file doesn't change """
+	return PARSE_CACHE.get('sample_sheet_summary', path, summarize_sample_sheet)
+
@@ -0,0 +1,106 @@
+import os
+
+try:
+	from os import scandir
+except ImportError:
+	# python < 3.5
+	from scandir import scandir
+
+# markers of the flowcell state machine, relative to the flowcell folder.
+# the folders are listed once, only the markers whose timestamps are used are stat'ed
+RTA_COMPLETE = 'RTAComplete.txt'
+DEMUX_DIR = 'Demultiplexing'
+DEMUX_STATS_DIR = os.path.join(DEMUX_DIR, 'Stats')
+DEMUX_FILE = os.path.join(DEMUX_STATS_DIR, 'ConversionStats.xml')
+
+# folders to list, each of them only if it has been found in the listing of its parent
+PROBED_FOLDERS = ('', DEMUX_DIR, DEMUX_STATS_DIR)
+
+# files whose changes can change the status, due date or description of the flowcell
+FINGERPRINT_FILES = ('RunInfo.xml', 'runParameters.xml', 'SampleSheet.csv', os.path.join('Logs', 'CycleTimes.txt'),
+					 RTA_COMPLETE, DEMUX_DIR, DEMUX_STATS_DIR, DEMUX_FILE)
+
+
+class FlowcellProbe(object):
+	""" Collects the state of the flowcell folder with one scandir per folder,
+	instead of an exists/getctime/getmtime call for every marker.
+	"""
+	def __init__(self, path):
+		self._path = path
+		self._entries = None
+		self._stats = {}
+
+	def __getstate__(self):
+		# DirEntry objects cannot be pickled (flowcells returned by a discovery process), the folders are listed again if needed
+		state = dict(self.__dict__)
+		state['_entries'] = None
+		return state
+
+	@property
+	def path(self):
+		return self._path
+
+	@property
+	def entries(self):
+		""" Dict: path relative to the flowcell -> DirEntry, for the content of the probed folders """
+		if self._entries is None:
+			self._entries = {}
+			for folder in PROBED_FOLDERS:
+				if folder and not self.is_dir(folder):
+					break
+				try:
+					for entry in scandir(os.path.join(self.path, folder)):
+						self._entries[os.path.join(folder, entry.name)] = entry
+				except OSError:
+					break
+		return self._entries
+
+	def _relative(self, relative_path):
+		relative_path = os.path.normpath(relative_path)
+		return '' if relative_path == '.' else relative_path
+
+	def exists(self, relative_path):
+		relative_path = self._relative(relative_path)
+		return relative_path == '' or relative_path in self.entries
+
+	def is_dir(self, relative_path):
+		entry = self.entries.get(self._relative(relative_path))
+		# is_dir() uses d_type, no system call on most filesystems
+		return entry is not None and entry.is_dir()
+
+	def stat(self, relative_path):
+		""" Return the stat of the file, or None if it doesn't exist """
+		relative_path = self._relative(relative_path)
+		if relative_path not in self._stats:
+			if relative_path == '':
+				self._stats[relative_path] = os.stat(self.path)
+			elif relative_path in self.entries:
+				self._stats[relative_path] = self.entries[relative_path].stat()
+			else:
+				self._stats[relative_path] = None
+		return self._stats[relative_path]
+
+	def fingerprint(self):
+		""" String which changes when one of FINGERPRINT_FILES is created, removed or modified """
+		values = []
+		for relative_path in FINGERPRINT_FILES:
+			if os.path.dirname(relative_path) in PROBED_FOLDERS:
+				stat = self.stat(relative_path)
+			else:
+				try:
+					stat = os.stat(os.path.join(self.path, relative_path))
+				except OSError:
+					stat = None
+			if stat is None:
+				values.append('{}:-'.format(relative_path))
+			else:
+				values.append('{}:{}:{}'.format(relative_path, stat.st_mtime, stat.st_size))
+		return ';'.join(values)
+
+	def getctime(self, relative_path=''):
+		stat = self.stat(relative_path)
+		return stat.st_ctime if stat is not None else None
+
+	def getmtime(self, relative_path=''):
+		stat = self.stat(relative_path)
+		return stat.st_mtime if stat is not None else None
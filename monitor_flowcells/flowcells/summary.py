@@ -0,0 +1,53 @@
+import socket
+import logging
+
+
+class FlowcellSummary(object):
+	""" What the trello board and the state store need of a flowcell, computed once.
+	The flowcell with its parsed RunInfo, runParameters, sample sheet and cycle times can be freed
+	as soon as the summary is built: large nosync folders are kept in memory as summaries only.
+	"""
+	__slots__ = ('path', 'name', 'status', 'due_date', 'description', 'check_status', 'host', 'transfer_candidate')
+
+	def __init__(self, path, name, status, due_date=None, description=None, check_status=None, host=None, transfer_candidate=False):
+		self.path = path
+		self.name = name
+		self.status = status
+		self.due_date = due_date
+		# None if it cannot be built, e.g. the sample sheet is missing: the card description is then not updated
+		self.description = description
+		self.check_status = check_status
+		# preprocessing server which built the summary
+		self.host = host
+		# its transfer can start without any local file changing: it is processed by every run
+		self.transfer_candidate = transfer_candidate
+
+	@classmethod
+	def from_flowcell(cls, flowcell):
+		# status is computed before check_status, which depends on it
+		status = flowcell.status
+		try:
+			description = flowcell.description
+		except (RuntimeError, AttributeError) as e:
+			# e.g. the sample sheet is missing, or the instrument type has no date (MiseqFlowcell)
+			logging.warning("Cannot build description of the flowcell {}: {}".format(flowcell.name, e))
+			description = None
+		return cls(flowcell.path, flowcell.name, status, due_date=flowcell.due_date, description=description,
+				   check_status=flowcell.check_status, host=socket.gethostname(), transfer_candidate=flowcell.transfer_candidate)
+
+	def __getstate__(self):
+		# objects with __slots__ and without __dict__ cannot be pickled with protocols 0 and 1
+		return tuple(getattr(self, name) for name in self.__slots__)
+
+	def __setstate__(self, state):
+		for name, value in zip(self.__slots__, state):
+			setattr(self, name, value)
+
+	def __eq__(self, other):
+		return self.name == other.name
+
+	def __ne__(self, other):
+		return not self == other
+
+	def __repr__(self):
+		return '<FlowcellSummary {} {}>'.format(self.name, self.status)
@@ -0,0 +1,158 @@
+""" Transfer status of the flowcells, checked on the destination servers of the 'transfering' config section
+"""
+import os
+import time
+import shlex
+import logging
+import datetime
+import subprocess
+import collections
+
+try:
+	from shlex import quote
+except ImportError:
+	# python 2
+	from pipes import quote
+
+from utils.config.config import CONFIG as config
+
+DEFAULT_TTL = 600
+DEFAULT_CONTROL_PERSIST = 600
+DEFAULT_CONNECT_TIMEOUT = 10
+
+# prints '<path>\t<ctime>' or '<path>\t-' for every path given as argument, runs with python 2 and 3
+REMOTE_SCRIPT = """import os, sys
+for path in sys.argv[1:]:
+    try:
+        sys.stdout.write('%s\\t%r\\n' % (path, os.stat(path).st_ctime))
+    except OSError:
+        sys.stdout.write('%s\\t-\\n' % path)
+"""
+
+Destination = collections.namedtuple('Destination', ['url', 'username', 'path'])
+
+
+class TransferStatus(object):
+	""" Checks if the transfer of flowcells has started: the flowcell folder exists on the destination server.
+	All flowcells of one destination are checked with a single remote command, sent through one multiplexed
+	ssh connection per host (ControlMaster), and the results are kept for ttl seconds.
+
+	:param dict destinations: instrument -> url, username, path; default: the 'transfering' section of the config file
+	:param str ssh_command: Command used instead of 'ssh', e.g. a local stand-in for tests
+	:param int ttl: Results are reused for this number of seconds
+	:param str control_dir: Folder of the ssh control sockets
+	:param str remote_python: Python interpreter on the destination servers
+	"""
+	def __init__(self, destinations=None, ssh_command='ssh', ttl=DEFAULT_TTL, control_dir=None,
+				 control_persist=DEFAULT_CONTROL_PERSIST, remote_python='python'):
+		self.destinations = destinations
+		self.ssh_command = ssh_command
+		self.ttl = ttl
+		self.control_dir = control_dir or os.path.join(os.path.expanduser('~'), '.hugin', 'ssh')
+		self.control_persist = control_persist
+		self.remote_python = remote_python
+		# (instrument, flowcell name) -> (time of the check, transfer start or None)
+		self._cache = {}
+		self.remote_calls = 0
+		self._warned = set()
+
+	def configure(self, config_file):
+		""" Apply the 'transfer_status' section of the config file
+
+		:param dict config_file: The parsed config file
+		"""
+		status_config = config_file.get('transfer_status', {}) or {}
+		self.ssh_command = status_config.get('ssh_command', self.ssh_command)
+		self.ttl = status_config.get('ttl', self.ttl)
+		self.control_dir = os.path.expanduser(status_config.get('control_dir', self.control_dir))
+		self.control_persist = status_config.get('control_persist', self.control_persist)
+		self.remote_python = status_config.get('remote_python', self.remote_python)
+		self._cache = {}
+
+	def destination(self, instrument):
+		""" Destination of the flowcells of the instrument type, None if it is not configured """
+		if instrument is None:
+			return None
+		destinations = self.destinations if self.destinations is not None else config.get('transfering')
+		settings = (destinations or {}).get(instrument)
+		if settings is None:
+			# the transfer status is optional
+			logging.debug("No 'transfering.{}' in the config file, the transfer status is not checked".format(instrument))
+			return None
+		if not isinstance(settings, dict) or any(settings.get(key) is None for key in Destination._fields):
+			if instrument not in self._warned:
+				logging.warning("'transfering.{}' must specify url, username and path in the config file, "
+								"the transfer status is not checked".format(instrument))
+				self._warned.add(instrument)
+			return None
+		return Destination(url=settings['url'], username=settings['username'], path=settings['path'])
+
+	def ssh_arguments(self, destination):
+		""" ssh command line up to the remote command, the connection is shared by all commands sent to the host """
+		if not os.path.exists(self.control_dir):
+			os.makedirs(self.control_dir)
+		return shlex.split(self.ssh_command) + [
+			'-o', 'BatchMode=yes',
+			'-o', 'ConnectTimeout={}'.format(DEFAULT_CONNECT_TIMEOUT),
+			'-o', 'ControlMaster=auto',
+			'-o', 'ControlPath={}'.format(os.path.join(self.control_dir, '%r@%h:%p')),
+			'-o', 'ControlPersist={}'.format(self.control_persist),
+			'{}@{}'.format(destination.username, destination.url),
+		]
+
+	def _check(self, destination, names):
+		""" Return flowcell name -> transfer start (datetime) or None, with one remote command """
+		paths = dict((os.path.join(destination.path, name), name) for name in names)
+		remote_command = ' '.join(quote(argument) for argument in [self.remote_python, '-c', REMOTE_SCRIPT] + sorted(paths))
+		self.remote_calls += 1
+		try:
+			process = subprocess.Popen(self.ssh_arguments(destination) + [remote_command],
+									   stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+			output, error = process.communicate()
+		except OSError as e:
+			logging.error("Cannot run {}: {}".format(self.ssh_command, e))
+			return dict.fromkeys(names)
+		if process.returncode != 0:
+			logging.error("Could not check the transfers on {}@{}: {}".format(destination.username, destination.url, error.strip()))
+			return dict.fromkeys(names)
+
+		results = dict.fromkeys(names)
+		for line in output.splitlines():
+			path, _, ctime = line.rpartition('\t')
+			if path in paths and ctime != '-':
+				results[paths[path]] = datetime.datetime.fromtimestamp(float(ctime))
+		return results
+
+	def prefetch(self, instrument, names):
+		""" Check the flowcells which are not cached yet with a single remote command """
+		destination = self.destination(instrument)
+		if destination is None:
+			return
+		now = time.time()
+		names = [name for name in set(names) if not self._is_fresh((instrument, name), now)]
+		if names:
+			# failures are cached as well, not to retry the connection for every flowcell
+			for name, started in self._check(destination, names).items():
+				self._cache[(instrument, name)] = (now, started)
+
+	def _is_fresh(self, key, now):
+		return key in self._cache and now - self._cache[key][0] < self.ttl
+
+	def transfer_started(self, instrument, name):
+		""" Return the time the transfer of the flowcell started, None if it didn't start or cannot be checked """
+		if not self._is_fresh((instrument, name), time.time()):
+			self.prefetch(instrument, [name])
+		return self._cache.get((instrument, name), (None, None))[1]
+
+	def prefetch_flowcells(self, flowcells):
+		""" Check the transfers of all flowcells which can be transferring, one remote command per instrument type """
+		candidates = collections.defaultdict(list)
+		for flowcell in flowcells:
+			if flowcell.transfer_candidate:
+				candidates[flowcell.config_key].append(flowcell.name)
+		for instrument, names in candidates.items():
+			self.prefetch(instrument, names)
+
+
+# shared by all flowcells, configured by the CLI
+TRANSFER_STATUS = TransferStatus()
@@ -0,0 +1,100 @@
+""" Adaptive polling of the flowcells, driven by their predicted due dates
+"""
+import time
+import logging
+
+from monitor_flowcells.flowcells.base_flowcell import FC_STATUSES
+
+DEFAULT_MIN_INTERVAL = 60
+DEFAULT_MAX_INTERVAL = 6 * 3600
+DEFAULT_NOSYNC_INTERVAL = 24 * 3600
+DEFAULT_FRACTION = 0.25
+
+# statuses which don't change by themselves, only through a new marker file or the flowcell folder being moved
+IDLE_STATUSES = (FC_STATUSES['ABORTED'], FC_STATUSES['CHECKSTATUS'])
+
+
+class PollScheduler(object):
+	""" Decides when every flowcell is processed again, from the state recorded by the FlowcellStateStore.
+	A flowcell is polled after a fraction of the time left until its due date (the predicted end of sequencing,
+	demultiplexing or transferring), between min_interval and max_interval seconds: often close to its
+	next transition, rarely in the middle of a long run. Nosync flowcells are polled every nosync_interval seconds.
+
+	:param int min_interval: Shortest time between two polls of a flowcell, in seconds
+	:param int max_interval: Longest time between two polls of a flowcell, in seconds
+	:param int nosync_interval: Time between two polls of a nosync flowcell, in seconds
+	:param float fraction: Fraction of the time left until the due date to wait before the next poll
+	:param bool enabled: If False, the daemon only relies on the watcher and the full updates
+	"""
+	def __init__(self, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+				 nosync_interval=DEFAULT_NOSYNC_INTERVAL, fraction=DEFAULT_FRACTION, enabled=False):
+		self.min_interval = min_interval
+		self.max_interval = max_interval
+		self.nosync_interval = nosync_interval
+		self.fraction = fraction
+		self.enabled = enabled
+		# flowcell path -> time of the next poll
+		self._next_poll = {}
+		# flowcell path -> time it was last reported due
+		self._polled = {}
+
+	@classmethod
+	def from_config(cls, config):
+		""" Create the scheduler from the 'scheduler' section of the config file """
+		scheduler_config = config.get('scheduler', {}) or {}
+		return cls(
+			min_interval=scheduler_config.get('min_interval', DEFAULT_MIN_INTERVAL),
+			max_interval=scheduler_config.get('max_interval', DEFAULT_MAX_INTERVAL),
+			nosync_interval=scheduler_config.get('nosync_interval', DEFAULT_NOSYNC_INTERVAL),
+			fraction=scheduler_config.get('fraction', DEFAULT_FRACTION),
+			enabled=scheduler_config.get('enabled', False),
+		)
+
+	def interval(self, state):
+		""" Seconds between the last update of the flowcell and its next poll
+
+		:param dict state: The state stored by the FlowcellStateStore
+		"""
+		if state['status'] == FC_STATUSES['NOSYNC']:
+			return self.nosync_interval
+		if state['due_date'] is None or state['status'] in IDLE_STATUSES:
+			return self.max_interval
+		time_left = state['due_date'] - state['updated']
+		if time_left <= 0:
+			# overdue: poll often until the card shows it, then the flowcell waits for a new marker
+			return self.max_interval if state['check_status'] else self.min_interval
+		interval = min(max(time_left * self.fraction, self.min_interval), self.max_interval)
+		# the due date passing changes the card, poll right after it
+		return min(interval, max(time_left, self.min_interval))
+
+	def refresh(self, states):
+		""" Compute the next poll of the flowcells from their stored states """
+		self._next_poll = {}
+		for state in states:
+			next_poll = state['updated'] + self.interval(state)
+			polled = self._polled.get(state['path'])
+			if polled is not None and state['updated'] < polled:
+				# polled but not recorded, e.g. the flowcell cannot be initialized: don't poll it in a loop
+				next_poll = max(next_poll, polled + self.min_interval)
+			self._next_poll[state['path']] = next_poll
+		self._polled = dict((path, polled) for path, polled in self._polled.items() if path in self._next_poll)
+
+	def is_due(self, path, now=None):
+		""" True if the flowcell must be polled, flowcells without a stored state are always due """
+		next_poll = self._next_poll.get(path)
+		return next_poll is None or next_poll <= (now or time.time())
+
+	def due(self, now=None):
+		""" Return the set of flowcell paths which must be polled """
+		now = now or time.time()
+		due = set(path for path, next_poll in self._next_poll.items() if next_poll <= now)
+		for path in due:
+			self._polled[path] = now
+			self._next_poll[path] = now + self.min_interval
+		if due:
+			logging.debug("Scheduler: {} of {} flowcells due".format(len(due), len(self._next_poll)))
+		return due
+
+	def next_poll(self):
+		""" Time of the next scheduled poll, None if no flowcell is scheduled """
+		return min(self._next_poll.values()) if self._next_poll else None
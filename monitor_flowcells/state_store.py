@@ -0,0 +1,211 @@
+""" Persistent state of the flowcells processed by the previous runs
+"""
+import os
+import time
+import datetime
+import logging
+import sqlite3
+
+from monitor_flowcells.flowcells.base_flowcell import FC_STATUSES
+from monitor_flowcells.flowcells.state_probe import FlowcellProbe
+from monitor_flowcells.trello_utils.card_state import description_hash
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.hugin', 'state.sqlite')
+DEFAULT_MAX_AGE_HOURS = 24
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS flowcell_state (
+	path TEXT PRIMARY KEY,
+	name TEXT NOT NULL,
+	fingerprint TEXT NOT NULL,
+	status TEXT,
+	due_date REAL,
+	check_status TEXT,
+	description_hash TEXT,
+	card_id TEXT,
+	list_id TEXT,
+	updated REAL NOT NULL,
+	transfer_candidate INTEGER
+)
+"""
+
+COLUMNS = ('path', 'name', 'fingerprint', 'status', 'due_date', 'check_status', 'description_hash', 'card_id', 'list_id',
+		   'updated', 'transfer_candidate')
+
+# the state of a transferring flowcell is on the remote server, it can change without any local file changing
+ALWAYS_PROCESSED_STATUSES = (FC_STATUSES['TRANFERRING'],)
+
+
+def _timestamp(date):
+	if date is None:
+		return None
+	return time.mktime(date.timetuple()) + date.microsecond / 1e6
+
+
+class FlowcellStateStore(object):
+	""" Records the last computed state of every flowcell and the trello card it maps to.
+	A flowcell is processed again only if its files changed (FlowcellProbe.fingerprint), its due date passed,
+	its card was moved, or it has not been processed for max_age_hours.
+
+	:param str path: Path to the database file
+	:param int max_age_hours: Unchanged flowcells are processed again after this number of hours
+	:param bool enabled: If False, every flowcell is processed
+	"""
+	def __init__(self, path=DEFAULT_PATH, max_age_hours=DEFAULT_MAX_AGE_HOURS, enabled=True):
+		self.path = path
+		self.max_age_hours = max_age_hours
+		self.enabled = enabled
+		self._connection = None
+		# fingerprints computed when the flowcells were selected, recorded once they are processed
+		self._fingerprints = {}
+
+	@classmethod
+	def from_config(cls, config):
+		""" Create the store from the 'state_store' section of the config file """
+		store_config = config.get('state_store', {}) or {}
+		return cls(
+			path=os.path.expanduser(store_config.get('path', DEFAULT_PATH)),
+			max_age_hours=store_config.get('max_age_hours', DEFAULT_MAX_AGE_HOURS),
+			enabled=store_config.get('enabled', True),
+		)
+
+	@property
+	def connection(self):
+		if self._connection is None:
+			directory = os.path.dirname(self.path)
+			if directory and not os.path.exists(directory):
+				os.makedirs(directory)
+			# flowcells are selected in the thread which feeds the discovery pool, never concurrently
+			self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+			self._connection.execute(SCHEMA)
+			columns = [row[1] for row in self._connection.execute('PRAGMA table_info(flowcell_state)')]
+			if 'transfer_candidate' not in columns:
+				# database written by a previous version
+				self._connection.execute('ALTER TABLE flowcell_state ADD COLUMN transfer_candidate INTEGER')
+			self._connection.commit()
+		return self._connection
+
+	def get(self, path):
+		row = self.connection.execute(
+			'SELECT {} FROM flowcell_state WHERE path=?'.format(', '.join(COLUMNS)), (os.path.abspath(path),)).fetchone()
+		return dict(zip(COLUMNS, row)) if row is not None else None
+
+	def entries(self, names=None):
+		""" Return the stored states, of the flowcells with the given names or of all of them """
+		query = 'SELECT {} FROM flowcell_state'.format(', '.join(COLUMNS))
+		if names:
+			query += ' WHERE name IN ({})'.format(', '.join('?' * len(names)))
+		rows = self.connection.execute(query + ' ORDER BY name', tuple(names or ()))
+		return [dict(zip(COLUMNS, row)) for row in rows]
+
+	def needs_update(self, state, fingerprint, snapshot, now=None):
+		""" Return the reason why the flowcell must be processed again, None if it can be skipped
+
+		:param dict state: The stored state, or None
+		:param str fingerprint: The current fingerprint of the flowcell, None if its files are not checked
+		:param BoardSnapshot snapshot: The trello board, to check that the card is still where it was put
+		"""
+		now = now or time.time()
+		if state is None:
+			return 'new flowcell'
+		if fingerprint is not None:
+			if state['fingerprint'] != fingerprint:
+				return 'files changed'
+			if now - state['updated'] > self.max_age_hours * 3600:
+				return 'not processed for {} hours'.format(self.max_age_hours)
+		if state['status'] in ALWAYS_PROCESSED_STATUSES:
+			return 'status {}'.format(state['status'])
+		if state['transfer_candidate']:
+			# the transfer of a demultiplexed flowcell starts on the remote server, no local file changes
+			return 'transfer can start'
+		if state['due_date'] is not None and state['due_date'] < now and not state['check_status'] \
+				and state['status'] != FC_STATUSES['NOSYNC']:
+			return 'due date passed'
+		card = snapshot.get_card_by_id(state['card_id']) if state['card_id'] else None
+		if card is None or card.list_id != state['list_id']:
+			return 'card changed on the board'
+		return None
+
+	def select(self, paths, snapshot, scheduler=None):
+		""" Yield the paths of the flowcells which must be processed again.
+		With a PollScheduler, the files of the flowcells which are not due are not checked: the scheduler
+		polls them when they can have changed, e.g. the cycles of a long sequencing run are not followed.
+		"""
+		if not self.enabled:
+			for path in paths:
+				yield path
+			return
+		selected = 0
+		total = 0
+		not_due = 0
+		now = time.time()
+		for path in paths:
+			total += 1
+			fingerprint = None
+			try:
+				state = self.get(path)
+				if scheduler is not None and state is not None and not scheduler.is_due(state['path'], now):
+					not_due += 1
+				else:
+					fingerprint = FlowcellProbe(path).fingerprint()
+				reason = self.needs_update(state, fingerprint, snapshot, now)
+			except sqlite3.Error as e:
+				logging.warning("State store {} cannot be read: {}".format(self.path, e))
+				reason = 'state store error'
+			if reason is not None:
+				logging.debug("Processing flowcell {}: {}".format(path, reason))
+				if fingerprint is not None:
+					self._fingerprints[os.path.abspath(path)] = fingerprint
+				selected += 1
+				yield path
+		logging.info("State store: {} of {} flowcells changed{}".format(
+			selected, total, ' ({} not due, files not checked)'.format(not_due) if scheduler is not None else ''))
+
+	def record(self, flowcells, snapshot):
+		""" Store the state of processed flowcells and of their cards """
+		if not self.enabled:
+			return
+		rows = []
+		for flowcell in flowcells:
+			path = os.path.abspath(flowcell.path)
+			fingerprint = self._fingerprints.pop(path, None) or FlowcellProbe(path).fingerprint()
+			description = description_hash(flowcell.description)
+			card = snapshot.get_card_by_name(flowcell.name)
+			rows.append((path, flowcell.name, fingerprint, flowcell.status, _timestamp(flowcell.due_date),
+						 flowcell.check_status, description, card.id if card is not None else None,
+						 card.list_id if card is not None else None, time.time(), int(bool(flowcell.transfer_candidate))))
+		try:
+			self.connection.executemany('INSERT OR REPLACE INTO flowcell_state ({}) VALUES ({})'.format(
+				', '.join(COLUMNS), ', '.join('?' * len(COLUMNS))), rows)
+			self.connection.commit()
+		except sqlite3.Error as e:
+			logging.warning("State store {} cannot be written: {}".format(self.path, e))
+
+	def prune(self):
+		""" Remove the flowcells whose folder does not exist anymore, e.g. moved to nosync """
+		if not self.enabled:
+			return 0
+		removed = [state['path'] for state in self.entries() if not os.path.exists(state['path'])]
+		self.connection.executemany('DELETE FROM flowcell_state WHERE path=?', [(path,) for path in removed])
+		self.connection.commit()
+		return len(removed)
+
+	def reset(self, names=None):
+		""" Forget the flowcells with the given names, or all of them. They are processed by the next run """
+		if names:
+			removed = self.connection.execute('DELETE FROM flowcell_state WHERE name IN ({})'.format(
+				', '.join('?' * len(names))), tuple(names)).rowcount
+		else:
+			removed = self.connection.execute('DELETE FROM flowcell_state').rowcount
+		self.connection.commit()
+		return removed
+
+
+def format_state(state):
+	""" One line description of a stored state, for `hugin state show` """
+	def format_time(timestamp):
+		return datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M') if timestamp else '-'
+	return '{name}\t{status}\tdue: {due}\tupdated: {updated}\tcard: {card}{check}'.format(
+		name=state['name'], status=state['status'], due=format_time(state['due_date']),
+		updated=format_time(state['updated']), card=state['card_id'] or '-',
+		check='\t{}'.format(state['check_status']) if state['check_status'] else '')
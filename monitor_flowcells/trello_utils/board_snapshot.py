@@ -0,0 +1,263 @@
+import logging
+
+from monitor_flowcells.trello_utils.rest_client import RestCard
+
+# maximum number of actions trello returns in one request
+COMMENT_ACTIONS_LIMIT = 1000
+
+# card fields used by hugin, requested in the 'fields' fetch mode
+CARD_FIELDS = ('name', 'idList', 'idLabels', 'due', 'desc')
+
+# attributes of the cards used by hugin which are read-only properties of a py-trello Card,
+# backed by the attribute of the json field: they are set through the json field
+PY_TRELLO_CARD_FIELDS = {'list_id': 'idList', 'description': 'desc'}
+
+# 'all': every card of the board with all its fields (board.all_cards()),
+# 'fields': only the open cards and CARD_FIELDS, per list when the whole board is not needed
+CARD_FETCH_MODES = ('all', 'fields')
+
+
+def set_card_attribute(card, name, value):
+	""" Set list_id or description of a RestCard or of a py-trello Card """
+	if isinstance(getattr(type(card), name, None), property):
+		setattr(card, PY_TRELLO_CARD_FIELDS[name], value)
+	else:
+		setattr(card, name, value)
+
+
+class BoardSnapshot(object):
+	""" In-memory copy of the Trello board: lists, cards and labels are fetched once
+	and indexed by name and id. Every read of TrelloBoard goes through the snapshot,
+	so one hugin run costs a constant number of board reads.
+	Writes done by hugin are registered back into the snapshot to keep it consistent.
+	With a card_filter, only the cards it accepts are kept, e.g. the cards of this host.
+	"""
+	def __init__(self, trello_board, card_fetch='all', card_filter=None):
+		if card_fetch not in CARD_FETCH_MODES:
+			logging.error("Unknown card fetch mode '{}', must be one of: {}".format(card_fetch, ', '.join(CARD_FETCH_MODES)))
+			raise RuntimeError("Unknown card fetch mode '{}', must be one of: {}".format(card_fetch, ', '.join(CARD_FETCH_MODES)))
+		self._trello_board = trello_board
+		self._card_fetch = card_fetch
+		self._card_filter = card_filter
+		self._lists = None
+		self._cards = None
+		# cards of single lists, fetched before the cards of the whole board are needed
+		self._list_cards = {}
+		self._labels = None
+		self._last_comments = None
+		# the board actions returned COMMENT_ACTIONS_LIMIT comments: older ones are read per card
+		self._comments_truncated = False
+		# indexes
+		self._lists_by_name = {}
+		self._lists_by_id = {}
+		self._cards_by_name = {}
+		self._cards_by_id = {}
+		self._cards_by_label = {}
+		self._labels_by_name = {}
+
+	@property
+	def trello_board(self):
+		return self._trello_board
+
+	def refresh(self):
+		""" Drop everything fetched so far, next access will read the board again """
+		self._lists = None
+		self._cards = None
+		self._list_cards = {}
+		self._labels = None
+		self._last_comments = None
+		# the board actions returned COMMENT_ACTIONS_LIMIT comments: older ones are read per card
+		self._comments_truncated = False
+
+	def refresh_lists(self):
+		""" Read the lists again on next access, e.g. another host may have created one """
+		self._lists = None
+
+	def refresh_labels(self):
+		""" Read the labels again on next access, e.g. another host may have created one """
+		self._labels = None
+
+	def _keep(self, cards):
+		if self._card_filter is None:
+			return cards
+		return [card for card in cards if self._card_filter(card)]
+
+	def _fetch_cards(self, uri_path, fields=CARD_FIELDS):
+		""" Open cards with the fields used by hugin only, for both py-trello and rest clients """
+		client = self.trello_board.client
+		cards_json = client.fetch_json(uri_path, query_params={'filter': 'open', 'fields': ','.join(fields)})
+		return self._keep([RestCard(client, card_json) for card_json in cards_json])
+
+	def fetch_cards_by_list_id(self, list_id, extra_fields=()):
+		""" Open cards of the list with more fields than CARD_FIELDS, read from the board and not kept in the snapshot """
+		return self._fetch_cards('/lists/{}/cards'.format(list_id), CARD_FIELDS + tuple(extra_fields))
+
+	@property
+	def lists(self):
+		if self._lists is None:
+			self._lists = list(self.trello_board.all_lists())
+			self._lists_by_name = {}
+			self._lists_by_id = {}
+			for trello_list in self._lists:
+				self._index_list(trello_list)
+			logging.debug("Board snapshot: fetched {} lists".format(len(self._lists)))
+		return self._lists
+
+	@property
+	def cards(self):
+		if self._cards is None:
+			if self._card_fetch == 'fields':
+				self._cards = self._fetch_cards('/boards/{}/cards'.format(self.trello_board.id))
+			else:
+				self._cards = self._keep(list(self.trello_board.all_cards()))
+			self._list_cards = {}
+			self._index_cards()
+			logging.debug("Board snapshot: fetched {} cards".format(len(self._cards)))
+		return self._cards
+
+	@property
+	def labels(self):
+		if self._labels is None:
+			self._labels = list(self.trello_board.get_labels())
+			self._labels_by_name = {}
+			for label in self._labels:
+				self._index_label(label)
+			logging.debug("Board snapshot: fetched {} labels".format(len(self._labels)))
+		return self._labels
+
+	@property
+	def last_comments(self):
+		""" Text of the last comment of each card, fetched with a single request for the whole board """
+		if self._last_comments is None:
+			self._last_comments = {}
+			actions = self.trello_board.client.fetch_json(
+				'/boards/{}/actions'.format(self.trello_board.id),
+				query_params={'filter': 'commentCard', 'fields': 'data', 'limit': COMMENT_ACTIONS_LIMIT})
+			# actions are sorted from the newest to the oldest
+			for action in actions:
+				data = action.get('data', {})
+				card_id = data.get('card', {}).get('id')
+				if card_id is not None:
+					self._last_comments.setdefault(card_id, data.get('text'))
+			self._comments_truncated = len(actions) >= COMMENT_ACTIONS_LIMIT
+			logging.debug("Board snapshot: fetched {} comments".format(len(actions)))
+		return self._last_comments
+
+	def _fetch_last_comment(self, card_id):
+		""" Text of the last comment of the card, None if it has no comment """
+		actions = self.trello_board.client.fetch_json(
+			'/cards/{}/actions'.format(card_id), query_params={'filter': 'commentCard', 'fields': 'data', 'limit': 1})
+		return actions[0].get('data', {}).get('text') if actions else None
+
+	def _index_list(self, trello_list):
+		# keep the first list if several lists have the same name, same as the linear scan did
+		self._lists_by_name.setdefault(trello_list.name, trello_list)
+		self._lists_by_id[trello_list.id] = trello_list
+
+	def _index_cards(self):
+		self._cards_by_name = {}
+		self._cards_by_id = {}
+		self._cards_by_label = {}
+		for card in self._cards:
+			self._index_card(card)
+
+	def _index_card(self, card):
+		self._cards_by_name.setdefault(card.name, card)
+		self._cards_by_id[card.id] = card
+		for label_id in getattr(card, 'label_ids', None) or []:
+			self._cards_by_label.setdefault(label_id, []).append(card)
+
+	def _index_label(self, label):
+		if label.name:
+			self._labels_by_name.setdefault(label.name, label)
+
+	def get_list_by_name(self, list_name):
+		self.lists
+		return self._lists_by_name.get(list_name)
+
+	def get_list_by_id(self, list_id):
+		self.lists
+		return self._lists_by_id.get(list_id)
+
+	def get_card_by_name(self, card_name):
+		self.cards
+		return self._cards_by_name.get(card_name)
+
+	def get_card_by_id(self, card_id):
+		self.cards
+		return self._cards_by_id.get(card_id)
+
+	def get_cards_by_list_id(self, list_id):
+		if self._cards is None and self._card_fetch == 'fields':
+			# one list is much smaller than the whole board
+			if list_id not in self._list_cards:
+				self._list_cards[list_id] = self._fetch_cards('/lists/{}/cards'.format(list_id))
+			return list(self._list_cards[list_id])
+		return [card for card in self.cards if card.list_id == list_id]
+
+	def get_cards_by_label_id(self, label_id):
+		self.cards
+		return list(self._cards_by_label.get(label_id, []))
+
+	def get_label_by_name(self, label_name):
+		self.labels
+		return self._labels_by_name.get(label_name)
+
+	def get_last_comment(self, card_id):
+		last_comments = self.last_comments
+		if card_id not in last_comments and self._comments_truncated:
+			# commented before the newest COMMENT_ACTIONS_LIMIT comments of the board, or never commented
+			last_comments[card_id] = self._fetch_last_comment(card_id)
+		return last_comments.get(card_id)
+
+	def set_last_comment(self, card_id, text):
+		if self._last_comments is not None:
+			self._last_comments[card_id] = text
+
+	def add_card(self, card):
+		""" Register a card created by hugin """
+		if self._cards is not None:
+			self._cards.append(card)
+			self._index_card(card)
+
+	def remove_cards(self, card_ids):
+		""" Unregister the cards closed by hugin """
+		card_ids = set(card_ids)
+		for list_id, cards in self._list_cards.items():
+			self._list_cards[list_id] = [card for card in cards if card.id not in card_ids]
+		if self._cards is not None:
+			self._cards = [card for card in self._cards if card.id not in card_ids]
+			self._index_cards()
+
+	def set_card_list(self, card, list_id):
+		""" Register a card moved by hugin """
+		old_list_id = card.list_id
+		set_card_attribute(card, 'list_id', list_id)
+		# lists fetched on their own hold their own copy of the card
+		if old_list_id in self._list_cards:
+			self._list_cards[old_list_id] = [list_card for list_card in self._list_cards[old_list_id] if list_card.id != card.id]
+		if list_id in self._list_cards and all(list_card.id != card.id for list_card in self._list_cards[list_id]):
+			self._list_cards[list_id].append(card)
+
+	def set_card_description(self, card, description):
+		""" Register a description written by hugin """
+		set_card_attribute(card, 'description', description)
+
+	def add_card_label(self, card, label_id):
+		""" Register a label added to a card by hugin """
+		if label_id not in card.label_ids:
+			card.label_ids.append(label_id)
+			if self._cards is not None:
+				self._cards_by_label.setdefault(label_id, []).append(card)
+
+	def add_list(self, trello_list):
+		""" Register a list created by hugin """
+		if self._lists is not None:
+			self._lists.append(trello_list)
+			self._index_list(trello_list)
+
+	def add_label(self, label):
+		""" Register a label created by hugin """
+		if self._labels is not None:
+			self._labels.append(label)
+			self._index_label(label)
@@ -0,0 +1,183 @@
+import re
+import hashlib
+import logging
+import collections
+import multiprocessing.pool
+
+# due dates are compared with a precision of minutes: trello returns them with seconds and timezone
+DUE_FORMAT = '%Y-%m-%dT%H:%M'
+DUE_LENGTH = len('2015-04-24T10:00')
+
+# fields of check_status which change at every run without a change of status: they are not taken into account
+# when comparing comments, the expected end time is followed by the due date of the card
+VOLATILE_FIELDS = ('expected end time', 'current time', 'current cycle', 'confidence')
+VOLATILE_FIELDS_RE = re.compile(r',?\s*(?:{}): [^,]*'.format('|'.join(VOLATILE_FIELDS)))
+
+CardMutation = collections.namedtuple('CardMutation', ['card', 'field', 'value'])
+
+
+def format_due(due_date):
+	if due_date is None:
+		return None
+	return due_date.strftime(DUE_FORMAT)
+
+
+def description_hash(description):
+	if description is None:
+		return None
+	if not isinstance(description, bytes):
+		description = description.encode('utf-8')
+	return hashlib.md5(description).hexdigest()
+
+
+def comment_key(comment):
+	if not comment:
+		return None
+	return VOLATILE_FIELDS_RE.sub('', comment).strip()
+
+
+class CardState(object):
+	""" State of a flowcell card: list, due date, labels, description and last comment.
+	The desired state is built from the flowcell, the current state from the board snapshot.
+	None means 'do not care' for the desired state.
+	"""
+	def __init__(self, list_id=None, due=None, labels=None, description=None, comment=None):
+		self.list_id = list_id
+		self.due = due
+		# label objects for the desired state, label ids for the current one
+		self.labels = labels or []
+		self.description = description
+		self.comment = comment
+
+	@classmethod
+	def from_card(cls, card, last_comment=None):
+		due = getattr(card, 'due', None) or None
+		return cls(
+			list_id=card.list_id,
+			due=due[:DUE_LENGTH] if due else None,
+			labels=list(getattr(card, 'label_ids', None) or []),
+			description=card.description,
+			comment=last_comment,
+		)
+
+	@property
+	def description_hash(self):
+		return description_hash(self.description)
+
+	def diff(self, card, current):
+		""" Return the list of CardMutation needed to bring the card from current state to this one,
+		and the number of fields which are already up to date
+		"""
+		mutations = []
+		skipped = 0
+
+		if self.due is not None:
+			if format_due(self.due) != current.due:
+				mutations.append(CardMutation(card, 'due', self.due))
+			else:
+				skipped += 1
+
+		if self.list_id is not None:
+			if self.list_id != current.list_id:
+				mutations.append(CardMutation(card, 'list_id', self.list_id))
+			else:
+				skipped += 1
+
+		for label in self.labels:
+			if label.id not in current.labels:
+				mutations.append(CardMutation(card, 'label', label))
+			else:
+				skipped += 1
+
+		if self.description is not None:
+			if self.description_hash != current.description_hash:
+				mutations.append(CardMutation(card, 'description', self.description))
+			else:
+				skipped += 1
+
+		if self.comment is not None:
+			if comment_key(self.comment) != comment_key(current.comment):
+				mutations.append(CardMutation(card, 'comment', self.comment))
+			else:
+				skipped += 1
+
+		return mutations, skipped
+
+
+class CardWriter(object):
+	""" Collects the card mutations of one update and sends them to trello in one batch
+	"""
+	def __init__(self, snapshot, concurrency=1, metrics=None):
+		self._snapshot = snapshot
+		# ApiMetrics counting the requests per flowcell
+		self._metrics = metrics
+		self._mutations = []
+		self.concurrency = concurrency
+		self.writes = 0
+		self.skipped = 0
+
+	@property
+	def mutations(self):
+		return self._mutations
+
+	def add(self, card, desired, current):
+		mutations, skipped = desired.diff(card, current)
+		self._mutations += mutations
+		self.skipped += skipped
+
+	def close(self, card):
+		""" Close (archive in the trello UI) the card """
+		self._mutations.append(CardMutation(card, 'closed', True))
+
+	def apply(self):
+		# mutations of one card are sent in order, different cards are independent
+		card_mutations = collections.OrderedDict()
+		for mutation in self._mutations:
+			card_mutations.setdefault(mutation.card.id, []).append(mutation)
+
+		if self.concurrency > 1 and len(card_mutations) > 1:
+			pool = multiprocessing.pool.ThreadPool(min(self.concurrency, len(card_mutations)))
+			try:
+				pool.map(self._apply_all, card_mutations.values())
+			finally:
+				pool.close()
+				pool.join()
+		else:
+			for mutations in card_mutations.values():
+				self._apply_all(mutations)
+		self.writes += len(self._mutations)
+		self._mutations = []
+		logging.info("Trello update: {} writes, {} skipped".format(self.writes, self.skipped))
+
+	def _apply_all(self, mutations):
+		if self._metrics is None:
+			for mutation in mutations:
+				self._apply(mutation)
+			return
+		with self._metrics.flowcell(mutations[0].card.name):
+			for mutation in mutations:
+				self._apply(mutation)
+
+	def _apply(self, mutation):
+		card, field, value = mutation
+		# every write is also applied to the local card, so that the snapshot stays up to date
+		if field == 'due':
+			card.set_due(value)
+			card.due = format_due(value)
+		elif field == 'list_id':
+			card.change_list(value)
+			self._snapshot.set_card_list(card, value)
+		elif field == 'label':
+			card.add_label(value)
+			self._snapshot.add_card_label(card, value.id)
+		elif field == 'description':
+			card.set_description(value)
+			self._snapshot.set_card_description(card, value)
+		elif field == 'comment':
+			card.comment(value)
+			self._snapshot.set_last_comment(card.id, value)
+		elif field == 'closed':
+			card.set_closed(value)
+			card.closed = value
+		else:
+			raise RuntimeError("Unknown card field: {}".format(field))
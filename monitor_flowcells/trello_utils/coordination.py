@@ -0,0 +1,86 @@
+""" Coordination of the hugin instances of several hosts sharing one trello board
+"""
+import os
+import time
+import json
+import errno
+import socket
+import logging
+
+DEFAULT_LEASE_SECONDS = 60
+DEFAULT_LEASE_TIMEOUT = 30
+LEASE_POLL_INTERVAL = 0.2
+
+
+class BoardLease(object):
+	""" Lease file shared by the hosts (e.g. on a shared filesystem), taken while a host creates labels or lists,
+	so two hosts don't create the same one. The file is created exclusively (O_EXCL) and contains the host
+	and the pid of the holder. A lease older than ttl seconds is left by a crashed holder and is broken.
+	Without a path, the lease is always granted: only the instances of one host are coordinated.
+
+	:param str path: Path of the lease file, shared by all hosts
+	:param int ttl: Seconds after which a lease is considered stale
+	:param int timeout: Seconds to wait for the lease before raising RuntimeError
+	"""
+	def __init__(self, path=None, ttl=DEFAULT_LEASE_SECONDS, timeout=DEFAULT_LEASE_TIMEOUT):
+		self.path = os.path.expanduser(path) if path else None
+		self.ttl = ttl
+		self.timeout = timeout
+		self._held = False
+
+	def _stale(self):
+		try:
+			return time.time() - os.stat(self.path).st_mtime > self.ttl
+		except OSError:
+			# released meanwhile
+			return False
+
+	def _break(self):
+		# only one host can rename the stale lease, the others see it gone and retry
+		stale_path = '{}.stale.{}.{}'.format(self.path, socket.gethostname(), os.getpid())
+		try:
+			os.rename(self.path, stale_path)
+		except OSError:
+			return
+		logging.warning("Breaking stale lease {}".format(self.path))
+		os.remove(stale_path)
+
+	def acquire(self):
+		if self.path is None:
+			return
+		deadline = time.time() + self.timeout
+		while True:
+			try:
+				fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+			except OSError as e:
+				if e.errno != errno.EEXIST:
+					raise
+				if self._stale():
+					self._break()
+					continue
+				if time.time() >= deadline:
+					logging.error("Lease {} is held by another host for more than {} seconds".format(self.path, self.timeout))
+					raise RuntimeError("Lease {} is held by another host for more than {} seconds".format(self.path, self.timeout))
+				time.sleep(LEASE_POLL_INTERVAL)
+			else:
+				try:
+					os.write(fd, json.dumps({'host': socket.gethostname(), 'pid': os.getpid()}).encode('utf-8'))
+				finally:
+					os.close(fd)
+				self._held = True
+				return
+
+	def release(self):
+		if self._held:
+			self._held = False
+			try:
+				os.remove(self.path)
+			except OSError as e:
+				logging.warning("Cannot release lease {}: {}".format(self.path, e))
+
+	def __enter__(self):
+		self.acquire()
+		return self
+
+	def __exit__(self, *args):
+		self.release()
@@ -0,0 +1,143 @@
+import re
+import json
+import time
+import logging
+import functools
+import threading
+import traceback
+import contextlib
+import collections
+
+# upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+
+# trello ids in the request paths are replaced, to count requests per endpoint
+TRELLO_ID_RE = re.compile(r'/[0-9a-f]{24}(?=/|$)')
+
+
+def endpoint_name(http_method, uri_path):
+	return '{} {}'.format(http_method, TRELLO_ID_RE.sub('/:id', uri_path))
+
+
+def instrumented(method):
+	""" Decorator of TrelloBoard methods: records the number of calls and the time spent """
+	@functools.wraps(method)
+	def wrapper(self, *args, **kwargs):
+		start = time.time()
+		try:
+			return method(self, *args, **kwargs)
+		finally:
+			self.metrics.record_method(method.__name__, time.time() - start)
+	return wrapper
+
+
+class ApiMetrics(object):
+	""" Trello requests of one run: count and latency histogram per endpoint, count per flowcell,
+	calls of the TrelloBoard methods and requests slower than slow_call_threshold seconds.
+	"""
+	def __init__(self, slow_call_threshold=None):
+		self.slow_call_threshold = slow_call_threshold
+		self._lock = threading.Lock()
+		# flowcell being processed by the current thread
+		self._local = threading.local()
+		self.reset()
+
+	def reset(self):
+		with self._lock:
+			self.start_time = time.time()
+			self.requests = collections.Counter()
+			self.request_time = collections.Counter()
+			self.histograms = collections.defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+			self.flowcell_requests = collections.Counter()
+			self.method_calls = collections.Counter()
+			self.method_time = collections.Counter()
+			self.slow_calls = []
+
+	@property
+	def current_flowcell(self):
+		return getattr(self._local, 'flowcell', None)
+
+	@contextlib.contextmanager
+	def flowcell(self, name):
+		""" Requests sent in this context are counted for the flowcell """
+		previous = self.current_flowcell
+		self._local.flowcell = name
+		try:
+			yield
+		finally:
+			self._local.flowcell = previous
+
+	def wrap_client(self, client):
+		""" Record every request sent through client.fetch_json (py-trello, rest or fake client) """
+		fetch_json = client.fetch_json
+
+		@functools.wraps(fetch_json)
+		def wrapper(uri_path, *args, **kwargs):
+			http_method = kwargs.get('http_method', args[0] if args else 'GET')
+			start = time.time()
+			try:
+				return fetch_json(uri_path, *args, **kwargs)
+			finally:
+				self.record_request(endpoint_name(http_method, uri_path), time.time() - start)
+		client.fetch_json = wrapper
+		return client
+
+	def record_request(self, endpoint, seconds):
+		flowcell = self.current_flowcell
+		with self._lock:
+			self.requests[endpoint] += 1
+			self.request_time[endpoint] += seconds
+			histogram = self.histograms[endpoint]
+			for index, bound in enumerate(LATENCY_BUCKETS):
+				if seconds <= bound:
+					histogram[index] += 1
+					break
+			if flowcell is not None:
+				self.flowcell_requests[flowcell] += 1
+		if self.slow_call_threshold is not None and seconds > self.slow_call_threshold:
+			stack = ''.join(traceback.format_stack()[:-1])
+			logging.warning("Slow trello request: {} took {:.2f}s (flowcell: {})\n{}".format(endpoint, seconds, flowcell, stack))
+			with self._lock:
+				self.slow_calls.append({'endpoint': endpoint, 'seconds': round(seconds, 3), 'flowcell': flowcell, 'stack': stack})
+
+	def record_method(self, name, seconds):
+		with self._lock:
+			self.method_calls[name] += 1
+			self.method_time[name] += seconds
+
+	@property
+	def total_requests(self):
+		return sum(self.requests.values())
+
+	def summary(self):
+		with self._lock:
+			return {
+				'duration': round(time.time() - self.start_time, 3),
+				'total_requests': sum(self.requests.values()),
+				'total_request_time': round(sum(self.request_time.values()), 3),
+				'endpoints': dict((endpoint, {
+					'requests': count,
+					'seconds': round(self.request_time[endpoint], 3),
+					'histogram': dict(('le_{}'.format(bound), bucket_count)
+									  for bound, bucket_count in zip(LATENCY_BUCKETS, self.histograms[endpoint])),
+				}) for endpoint, count in self.requests.items()),
+				'flowcells': dict(self.flowcell_requests),
+				'methods': dict((name, {'calls': count, 'seconds': round(self.method_time[name], 3)})
+								for name, count in self.method_calls.items()),
+				'slow_calls': list(self.slow_calls),
+			}
+
+	def log_summary(self):
+		summary = self.summary()
+		logging.info("Trello: {} requests in {}s".format(summary['total_requests'], summary['total_request_time']))
+		for endpoint, stats in sorted(summary['endpoints'].items(), key=lambda item: -item[1]['requests']):
+			logging.info("Trello: {:>6} x {} ({}s)".format(stats['requests'], endpoint, stats['seconds']))
+		for flowcell, count in self.flowcell_requests.most_common(5):
+			logging.debug("Trello: {} requests for the flowcell {}".format(count, flowcell))
+		if summary['slow_calls']:
+			logging.warning("Trello: {} requests slower than {}s".format(len(summary['slow_calls']), self.slow_call_threshold))
+		return summary
+
+	def write_json(self, path):
+		with open(path, 'w') as f:
+			json.dump(self.summary(), f, indent=2, sort_keys=True)
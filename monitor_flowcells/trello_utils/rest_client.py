@@ -0,0 +1,158 @@
+import time
+import logging
+import threading
+
+import requests
+import requests.adapters
+
+TRELLO_API_URL = 'https://api.trello.com/1'
+
+# py-trello sends due dates in this format
+DUE_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+class TrelloRestClient(object):
+	""" Trello client with a pooled keep-alive HTTP session, safe to use from several threads.
+	Requests answered with 429 are retried after the delay given by trello (Retry-After header)
+	or with an exponential backoff; all threads wait until the rate limit is over.
+	The objects returned by get_board() have the same interface as the py-trello ones used by hugin.
+
+	:param str api_key: Trello API key
+	:param str token: Trello token
+	:param str api_url: Base URL of the API
+	:param int pool_size: Number of connections kept open
+	:param int max_retries: Number of retries of a rate limited request
+	:param float backoff: Delay before the first retry if trello doesn't specify it, in seconds
+	"""
+	def __init__(self, api_key, token, api_url=TRELLO_API_URL, pool_size=10, max_retries=5, backoff=1.0):
+		self._auth = {'key': api_key, 'token': token}
+		self._api_url = api_url.rstrip('/')
+		self.max_retries = max_retries
+		self.backoff = backoff
+		self._session = requests.Session()
+		adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+		self._session.mount('https://', adapter)
+		self._session.mount('http://', adapter)
+		# time until which no request must be sent, shared by all threads
+		self._retry_at = 0
+		self._lock = threading.Lock()
+
+	def _wait_rate_limit(self):
+		with self._lock:
+			delay = self._retry_at - time.time()
+		if delay > 0:
+			time.sleep(delay)
+
+	def _rate_limited(self, response, attempt):
+		retry_after = response.headers.get('Retry-After')
+		try:
+			delay = float(retry_after)
+		except (TypeError, ValueError):
+			delay = self.backoff * 2 ** attempt
+		logging.warning("Trello rate limit reached, retrying in {:.1f}s".format(delay))
+		with self._lock:
+			self._retry_at = max(self._retry_at, time.time() + delay)
+
+	def fetch_json(self, uri_path, http_method='GET', query_params=None, post_args=None):
+		""" Send a request to the API and return the decoded response, same signature as py-trello's """
+		params = dict(self._auth)
+		params.update(query_params or {})
+		url = self._api_url + uri_path
+		for attempt in range(self.max_retries + 1):
+			self._wait_rate_limit()
+			response = self._session.request(http_method, url, params=params, data=post_args)
+			if response.status_code != 429:
+				break
+			self._rate_limited(response, attempt)
+		response.raise_for_status()
+		return response.json()
+
+	def get_board(self, board_id):
+		board_json = self.fetch_json('/boards/{}'.format(board_id), query_params={'fields': 'name'})
+		return RestBoard(self, board_json)
+
+
+class RestBoard(object):
+	def __init__(self, client, board_json):
+		self.client = client
+		self.id = board_json['id']
+		self.name = board_json.get('name')
+
+	def all_lists(self):
+		lists_json = self.client.fetch_json('/boards/{}/lists'.format(self.id), query_params={'filter': 'all'})
+		return [RestList(self, list_json) for list_json in lists_json]
+
+	def all_cards(self):
+		cards_json = self.client.fetch_json('/boards/{}/cards/all'.format(self.id))
+		return [RestCard(self.client, card_json) for card_json in cards_json]
+
+	def get_labels(self):
+		labels_json = self.client.fetch_json('/boards/{}/labels'.format(self.id), query_params={'limit': 1000})
+		return [RestLabel(label_json) for label_json in labels_json]
+
+	def add_label(self, name, color):
+		label_json = self.client.fetch_json('/boards/{}/labels'.format(self.id), http_method='POST',
+											post_args={'name': name, 'color': color})
+		return RestLabel(label_json)
+
+	def add_list(self, name, pos=None):
+		post_args = {'name': name, 'idBoard': self.id}
+		if pos is not None:
+			post_args['pos'] = pos
+		list_json = self.client.fetch_json('/lists', http_method='POST', post_args=post_args)
+		return RestList(self, list_json)
+
+
+class RestList(object):
+	def __init__(self, board, list_json):
+		self.board = board
+		self.id = list_json['id']
+		self.name = list_json['name']
+		self.closed = list_json.get('closed', False)
+
+	def add_card(self, name, desc=None):
+		card_json = self.board.client.fetch_json('/cards', http_method='POST',
+												 post_args={'idList': self.id, 'name': name, 'desc': desc or ''})
+		return RestCard(self.board.client, card_json)
+
+
+class RestLabel(object):
+	def __init__(self, label_json):
+		self.id = label_json['id']
+		self.name = label_json.get('name', '')
+		self.color = label_json.get('color')
+
+
+class RestCard(object):
+	def __init__(self, client, card_json):
+		self.client = client
+		self.id = card_json['id']
+		self.name = card_json.get('name')
+		self.list_id = card_json.get('idList')
+		self.description = card_json.get('desc', '')
+		self.label_ids = list(card_json.get('idLabels', []))
+		self.due = card_json.get('due')
+		self.closed = card_json.get('closed', False)
+		# e.g. '2016-01-01T10:00:00.000Z', only if the field has been requested
+		self.last_activity = card_json.get('dateLastActivity')
+
+	def _update(self, **fields):
+		self.client.fetch_json('/cards/{}'.format(self.id), http_method='PUT', post_args=fields)
+
+	def set_due(self, due):
+		self._update(due=due.strftime(DUE_FORMAT))
+
+	def change_list(self, list_id):
+		self._update(idList=list_id)
+
+	def set_description(self, description):
+		self._update(desc=description)
+
+	def set_closed(self, closed):
+		self._update(closed='true' if closed else 'false')
+
+	def add_label(self, label):
+		self.client.fetch_json('/cards/{}/idLabels'.format(self.id), http_method='POST', post_args={'value': label.id})
+
+	def comment(self, text):
+		self.client.fetch_json('/cards/{}/actions/comments'.format(self.id), http_method='POST', post_args={'text': text})
@@ -0,0 +1,105 @@
+""" Retention of the cards of the board: the old cards of the archived lists are closed, so that the lists
+read by hugin on every update stay small. Closed cards are kept by trello and can be found in the archived
+items of the board menu.
+"""
+import logging
+import datetime
+import collections
+
+from monitor_flowcells.flowcells.base_flowcell import FC_STATUSES
+
+DEFAULT_BATCH_SIZE = 50
+# dateLastActivity of the trello cards, e.g. 2016-01-01T10:00:00.000Z
+ACTIVITY_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+# card selected by the retention policy, with the reason why it is closed
+PrunedCard = collections.namedtuple('PrunedCard', ['list_name', 'card', 'last_activity', 'reason'])
+
+
+def last_activity(card):
+	""" Time of the last activity on the card in UTC, None if unknown """
+	if not getattr(card, 'last_activity', None):
+		return None
+	try:
+		return datetime.datetime.strptime(card.last_activity[:19], ACTIVITY_FORMAT)
+	except ValueError:
+		logging.warning("Unknown activity date of card {}: {}".format(card.name, card.last_activity))
+		return None
+
+
+class RetentionPolicy(object):
+	""" Cards closed by the retention: in the given lists, the cards without activity for more than max_age_days,
+	and the oldest cards beyond the max_cards most recent ones.
+
+	:param list lists: names of the lists to prune, only lists whose cards are not recreated by hugin
+	:param int max_age_days: close the cards without activity for more days, None to keep them
+	:param int max_cards: keep at most this number of cards in each list, None for no limit
+	:param int batch_size: cards closed at once, the board snapshot is updated after every batch
+	:param bool enabled: prune the board at the end of every full update
+	"""
+	def __init__(self, lists=(FC_STATUSES['ARCHIVED'],), max_age_days=None, max_cards=None, batch_size=DEFAULT_BATCH_SIZE, enabled=False):
+		# the cards of the flowcells still on disk would be created again at the next update
+		recreated = [name for name in lists if name in FC_STATUSES.values() and name != FC_STATUSES['ARCHIVED']]
+		if recreated:
+			logging.error("The cards of the lists {} are updated by hugin and cannot be pruned".format(', '.join(recreated)))
+			raise RuntimeError("The cards of the lists {} are updated by hugin and cannot be pruned".format(', '.join(recreated)))
+		self.lists = list(lists)
+		self.max_age_days = max_age_days
+		self.max_cards = max_cards
+		self.batch_size = max(int(batch_size), 1)
+		self.enabled = enabled
+
+	@classmethod
+	def from_config(cls, config):
+		""" Create the policy from the 'retention' section of the config file """
+		retention_config = config.get('retention', {}) or {}
+		return cls(
+			lists=retention_config.get('lists', [FC_STATUSES['ARCHIVED']]),
+			max_age_days=retention_config.get('max_age_days'),
+			max_cards=retention_config.get('max_cards'),
+			batch_size=retention_config.get('batch_size', DEFAULT_BATCH_SIZE),
+			enabled=retention_config.get('enabled', False),
+		)
+
+	def select(self, list_name, cards, now=None):
+		""" Return the PrunedCard of the cards of the list to close, the most recent first """
+		now = now or datetime.datetime.utcnow()
+		# cards without activity date are the oldest ones
+		cards = sorted(cards, key=lambda card: last_activity(card) or datetime.datetime.min, reverse=True)
+		pruned = []
+		for index, card in enumerate(cards):
+			activity = last_activity(card)
+			if self.max_age_days is not None and activity is not None and now - activity > datetime.timedelta(days=self.max_age_days):
+				reason = "no activity for {} days".format((now - activity).days)
+			elif self.max_cards is not None and index >= self.max_cards:
+				reason = "more than {} cards in the list".format(self.max_cards)
+			else:
+				continue
+			pruned.append(PrunedCard(list_name, card, activity, reason))
+		return pruned
+
+
+def prune_board(trello_board, policy, dry_run=False, now=None):
+	""" Close the cards of this host selected by the policy.
+	Returns the PrunedCard of the closed cards, or of the cards which would be closed with dry_run
+	"""
+	pruned = []
+	for list_name in policy.lists:
+		# the archived lists are never created for the retention
+		trello_list = trello_board.snapshot.get_list_by_name(list_name)
+		if trello_list is None:
+			logging.debug("Retention: no list {} on the board".format(list_name))
+			continue
+		cards = trello_board.snapshot.fetch_cards_by_list_id(trello_list.id, extra_fields=('dateLastActivity',))
+		pruned += policy.select(list_name, [card for card in cards if trello_board.is_host_card(card)], now=now)
+	if dry_run:
+		logging.info("Retention: {} cards would be closed".format(len(pruned)))
+	elif pruned:
+		trello_board.close_cards([pruned_card.card for pruned_card in pruned], batch_size=policy.batch_size)
+	return pruned
+
+
+def format_pruned_card(pruned_card):
+	""" One line of the retention report """
+	return "{}\t{}\t{}\t{}".format(pruned_card.list_name, pruned_card.card.name,
+									 pruned_card.last_activity.strftime('%Y-%m-%d') if pruned_card.last_activity else '-', pruned_card.reason)
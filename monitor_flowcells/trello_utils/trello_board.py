@@ -3,66 +3,167 @@ import logging
 import socket
 
 from monitor_flowcells.flowcells.base_flowcell import FC_STATUSES
+from monitor_flowcells.trello_utils.board_snapshot import BoardSnapshot
+from monitor_flowcells.trello_utils.card_state import CardState, CardWriter
+from monitor_flowcells.trello_utils.rest_client import TrelloRestClient, RestLabel, TRELLO_API_URL
+from monitor_flowcells.trello_utils.coordination import BoardLease, DEFAULT_LEASE_SECONDS, DEFAULT_LEASE_TIMEOUT
+from monitor_flowcells.trello_utils.instrumentation import ApiMetrics, instrumented
 
 class TrelloBoard(object):
 	""" Wrapper class to work with Trello objects
 	"""
-	def __init__(self, config):
+	def __init__(self, config, client=None):
+			""" client: trello client to use instead of the one defined by the config, e.g. a fake trello """
 			trello_args = config.get('trello')
 			# todo check if board exist
-			api_key = trello_args.get('api_key')
-			token = trello_args.get('token')
-			api_secret = trello_args.get('api_secret')
 			board_id = trello_args.get('board_id')
+			# number of cards updated in parallel
+			self._concurrency = int(trello_args.get('concurrency', 1))
+			metrics_config = config.get('metrics') or {}
+			self._metrics_file = metrics_config.get('file')
+			slow_call_threshold = metrics_config.get('slow_call_threshold')
+			self._metrics = ApiMetrics(slow_call_threshold=float(slow_call_threshold) if slow_call_threshold is not None else None)
+			# several hosts sharing the board: each host keeps only its own cards, labels and lists are created under a lease
+			coordination = config.get('coordination') or {}
+			self._coordinated = bool(coordination.get('enabled', False))
+			self._host_label_id = coordination.get('label_id')
+			self._host_label = None
+			self._lease = BoardLease(coordination.get('lease_file'), ttl=coordination.get('lease_seconds', DEFAULT_LEASE_SECONDS),
+									 timeout=coordination.get('lease_timeout', DEFAULT_LEASE_TIMEOUT))
 			try:
-				client = trello.TrelloClient(api_key=api_key, token=token, api_secret=api_secret)
+				if client is None:
+					client = self._create_client(trello_args)
+				self._metrics.wrap_client(client)
 				self._trello_board  = client.get_board(board_id)
 			except Exception as e:
 				logging.error(e)
 				logging.error("Can't connect to the board: {}".format(board_id))
 				logging.debug("Trello configuration: {}".format(trello_args))
 				raise e
+			self._snapshot = BoardSnapshot(self._trello_board, card_fetch=trello_args.get('card_fetch', 'fields'),
+										   card_filter=self.is_host_card if self._coordinated else None)
+
+	def _create_client(self, trello_args):
+		api_key = trello_args.get('api_key')
+		token = trello_args.get('token')
+		api_secret = trello_args.get('api_secret')
+		backend = trello_args.get('backend', 'py-trello')
+		api_url = trello_args.get('api_url')
+		if backend == 'rest':
+			return TrelloRestClient(api_key=api_key, token=token, api_url=api_url or TRELLO_API_URL,
+									pool_size=max(self._concurrency, 1))
+		elif backend == 'py-trello':
+			if api_url:
+				raise RuntimeError("'trello.api_url' can only be used with 'trello.backend: rest'")
+			return trello.TrelloClient(api_key=api_key, token=token, api_secret=api_secret)
+		raise RuntimeError("Unknown trello backend '{}', must be 'py-trello' or 'rest'".format(backend))
 
 	@property
 	def trello_board(self):
 		return self._trello_board
 
+	@property
+	def snapshot(self):
+		return self._snapshot
+
+	@property
+	def metrics(self):
+		return self._metrics
+
+	def report_metrics(self):
+		""" Log the trello requests sent since the last report, write them to metrics.file if configured """
+		summary = self.metrics.log_summary()
+		if self._metrics_file:
+			try:
+				self.metrics.write_json(self._metrics_file)
+			except (IOError, OSError) as e:
+				logging.warning("Cannot write trello metrics to {}: {}".format(self._metrics_file, e))
+		self.metrics.reset()
+		return summary
+
+	def is_host_card(self, card):
+		""" True if the card belongs to this host: with the host label, or the hostname in the description """
+		if self._coordinated:
+			# cards of the other hosts have their own label, only the cards created before the labels need the description
+			return self.get_host_label().id in card.label_ids or (not card.label_ids and socket.gethostname() in card.description)
+		host_label = self.get_label_by_name(socket.gethostname())
+		return (host_label is not None and host_label.id in card.label_ids) or socket.gethostname() in card.description
+
+	@instrumented
 	def get_cards_by_list_name(self, list_name):
+		""" Cards of the list which belong to this host """
 		trello_list = self.get_list_by_name(list_name)
-		result = []
-		localhost = socket.gethostname()
-		for card in self.trello_board.all_cards():
-			if card.list_id == trello_list.id and localhost in card.description:
-				result.append(card)
-		return result
-	
+		return [card for card in self.snapshot.get_cards_by_list_id(trello_list.id) if self.is_host_card(card)]
+
 	def get_list_by_name(self, list_name):
-		for trello_list in self.trello_board.all_lists():
-			if trello_list.name == list_name:
-				return trello_list
-		return None
+		trello_list = self.snapshot.get_list_by_name(list_name)
+		if trello_list is None and list_name in FC_STATUSES.values():
+			trello_list = self._create_list(list_name)
+		return trello_list
+
+	@instrumented
+	def _create_list(self, list_name):
+		with self._lease:
+			# another host may have created it while waiting for the lease
+			self.snapshot.refresh_lists()
+			trello_list = self.snapshot.get_list_by_name(list_name)
+			if trello_list is None:
+				logging.info("Creating the list {}".format(list_name))
+				trello_list = self.trello_board.add_list(list_name)
+				self.snapshot.add_list(trello_list)
+		return trello_list
 
 	def get_card_by_name(self, card_name):
-		for card in self.trello_board.all_cards():
-			if card.name == card_name:
-				return card
+		return self.snapshot.get_card_by_name(card_name)
 
+	@instrumented
 	def update(self, flowcells):
+		writer = CardWriter(self.snapshot, concurrency=self._concurrency, metrics=self.metrics)
 		for flowcell in flowcells:
-			card = self.get_card_by_name(flowcell.name) or self.create_card(flowcell)
-			if not self.flowcell_aborted(card):
-				if flowcell.due_date:
-					card.set_due(flowcell.due_date)
-				self.move_card(card, flowcell.status)
-				self.add_label(card)
-				if flowcell.check_status:
-					card.comment(flowcell.check_status)
-
+			with self.metrics.flowcell(flowcell.name):
+				card = self.get_card_by_name(flowcell.name) or self.create_card(flowcell)
+				if not self.flowcell_aborted(card):
+					desired = self.desired_state(flowcell)
+					last_comment = self.snapshot.get_last_comment(card.id) if desired.comment else None
+					writer.add(card, desired, CardState.from_card(card, last_comment=last_comment))
+		writer.apply()
+		return writer
+
+	@instrumented
+	def close_cards(self, cards, batch_size=50):
+		""" Close the cards, batch_size cards at a time: the cards of a batch are closed concurrently,
+		and removed from the snapshot once the batch is done
+		"""
+		closed = 0
+		for start in range(0, len(cards), batch_size):
+			batch = cards[start:start + batch_size]
+			writer = CardWriter(self.snapshot, concurrency=self._concurrency, metrics=self.metrics)
+			for card in batch:
+				writer.close(card)
+			writer.apply()
+			self.snapshot.remove_cards(card.id for card in batch)
+			closed += len(batch)
+			logging.info("Closed {} of {} cards".format(closed, len(cards)))
+		return closed
+
+	def desired_state(self, flowcell):
+		# FlowcellSummary: the description is None if it cannot be built, it is then not updated
+		return CardState(
+			list_id=self.get_list_by_name(flowcell.status).id,
+			due=flowcell.due_date,
+			labels=[self.get_host_label()],
+			description=flowcell.description,
+			comment=flowcell.check_status,
+		)
+
+	@instrumented
 	def create_card(self, flowcell):
 		trello_list = self.get_list_by_name(flowcell.status)
-		trello_card = trello_list.add_card(name=flowcell.name, desc=flowcell.description)
+		trello_card = trello_list.add_card(name=flowcell.name, desc=flowcell.description or '')
+		self.snapshot.add_card(trello_card)
 		return trello_card
 
+	@instrumented
 	def archive_nosync_cards(self, nosync_flowcells):
 		nosync_cards = self.get_cards_by_list_name(FC_STATUSES['NOSYNC'])
 		nosync_flowcell_names = [flowcell.name for flowcell in nosync_flowcells]
@@ -71,34 +172,52 @@ class TrelloBoard(object):
 				self.move_card(card, FC_STATUSES['ARCHIVED'])
 
 	def get_label_by_name(self, name):
-		labels = self.trello_board.get_labels()
-		for label in labels:
-			if label.name == name:
-				return label
-		return None
-
+		return self.snapshot.get_label_by_name(name)
+
+	@instrumented
+	def get_host_label(self):
+		# resolved once, kept when the snapshot is refreshed
+		if self._host_label is None:
+			label_name = socket.gethostname()
+			if self._host_label_id:
+				# configured: the labels of the board are not read at all
+				self._host_label = RestLabel({'id': self._host_label_id, 'name': label_name})
+				return self._host_label
+			label = self.get_label_by_name(label_name)
+			# if doesn't exist, create it
+			if label is None:
+				with self._lease:
+					# another host may have created labels while waiting for the lease: the color must be chosen again
+					self.snapshot.refresh_labels()
+					label = self.get_label_by_name(label_name)
+					if label is None:
+						color = self._next_color()
+						label = self.trello_board.add_label(name=label_name, color=color)
+						self.snapshot.add_label(label)
+			if self._coordinated:
+				logging.info("Host label {} has the id {}, set 'coordination.label_id' to skip the lookup".format(label_name, label.id))
+			self._host_label = label
+		return self._host_label
+
+	@instrumented
 	def add_label(self, card):
-		label_name = socket.gethostname()
-		label = self.get_label_by_name(label_name)
-		# if label exists
-		if label is not None:
-			# add label if it's not on the card, otherwise do nothing
-			if label.id not in card.label_ids:
-				card.add_label(label)
-		else:
-			# if doesn't exist, create and add to the card
-			color = self._next_color()
-			label = self.trello_board.add_label(name=label_name, color=color)
+		label = self.get_host_label()
+		# add label if it's not on the card, otherwise do nothing
+		if label.id not in card.label_ids:
 			card.add_label(label)
+			self.snapshot.add_card_label(card, label.id)
 
 
+	@instrumented
 	def move_card(self, card, new_list_name):
 		new_list = self.get_list_by_name(new_list_name)
 		card.change_list(new_list.id)
+		# keep the snapshot in sync without re-reading the board
+		self.snapshot.set_card_list(card, new_list.id)
 
 
 	def _next_color(self):
-		labels = self.trello_board.get_labels()
+		labels = self.snapshot.labels
 		all_colors = [label.color for label in labels]
 		used_colors = [label.color if label.name else '' for label in labels]
 
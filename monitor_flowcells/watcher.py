@@ -0,0 +1,173 @@
+import os
+import time
+import logging
+
+try:
+	import pyinotify
+except ImportError:
+	pyinotify = None
+
+NOSYNC = 'nosync'
+
+# files and folders of a flowcell which change its status, relative to the flowcell folder
+MARKERS = (
+	'runParameters.xml',
+	'RunInfo.xml',
+	'RTAComplete.txt',
+	'Demultiplexing',
+	os.path.join('Demultiplexing', 'Stats'),
+	os.path.join('Demultiplexing', 'Stats', 'ConversionStats.xml'),
+)
+# folders of a flowcell which must be watched to see the markers appear
+WATCHED_SUBFOLDERS = (
+	'Demultiplexing',
+	os.path.join('Demultiplexing', 'Stats'),
+)
+
+
+def create_watcher(data_folders, poll_interval=60, scheduler=None):
+	""" Return an inotify watcher if pyinotify is installed, otherwise a polling one """
+	if pyinotify is None:
+		logging.info("pyinotify is not installed, polling data folders every {} seconds".format(poll_interval))
+		return PollingWatcher(data_folders, poll_interval, scheduler=scheduler)
+	return InotifyWatcher(data_folders, poll_interval)
+
+
+class FlowcellWatcher(object):
+	""" Detects flowcells whose status may have changed: new flowcell folders, markers (RTAComplete.txt,
+	Demultiplexing/Stats/ConversionStats.xml, ...) appearing, flowcells moved to or removed from nosync.
+	"""
+	def __init__(self, data_folders, poll_interval=60):
+		self._data_folders = [os.path.abspath(folder) for folder in data_folders]
+		self.poll_interval = poll_interval
+
+	@property
+	def data_folders(self):
+		return self._data_folders
+
+	@property
+	def parent_folders(self):
+		""" Folders which contain flowcells: data folders and their nosync subfolders """
+		folders = []
+		for data_folder in self.data_folders:
+			folders += [data_folder, os.path.join(data_folder, NOSYNC)]
+		return folders
+
+	def flowcell_of(self, path):
+		""" Return (flowcell path, path relative to the flowcell) for a path inside a flowcell, or (None, None) """
+		for folder in self.parent_folders:
+			if path.startswith(folder + os.sep):
+				relative_path = os.path.relpath(path, folder).split(os.sep)
+				if relative_path[0] == NOSYNC:
+					continue
+				return os.path.join(folder, relative_path[0]), os.path.join(*relative_path[1:]) if len(relative_path) > 1 else ''
+		return None, None
+
+	def wait(self, timeout):
+		""" Wait at most timeout seconds for changes, return the set of flowcell paths which have changed """
+		raise NotImplementedError('wait() must be implemented in the class {}'.format(self.__class__.__name__))
+
+
+class PollingWatcher(FlowcellWatcher):
+	""" Lists the data folders every poll_interval seconds and compares the markers of each flowcell.
+	With a PollScheduler, the markers of a known flowcell are only checked when the flowcell is due.
+	"""
+	def __init__(self, data_folders, poll_interval=60, scheduler=None):
+		super(PollingWatcher, self).__init__(data_folders, poll_interval)
+		self.scheduler = scheduler
+		self._state = {}
+		self._state = self._scan()
+
+	def _scan(self):
+		state = {}
+		now = time.time()
+		for folder in self.parent_folders:
+			if not os.path.isdir(folder):
+				continue
+			for name in os.listdir(folder):
+				if name == NOSYNC:
+					continue
+				flowcell_path = os.path.join(folder, name)
+				if self.scheduler is not None and flowcell_path in self._state and not self.scheduler.is_due(flowcell_path, now):
+					state[flowcell_path] = self._state[flowcell_path]
+					continue
+				state[flowcell_path] = tuple(os.path.exists(os.path.join(flowcell_path, marker)) for marker in MARKERS)
+		return state
+
+	def wait(self, timeout):
+		time.sleep(min(timeout, self.poll_interval))
+		state = self._scan()
+		changed = set(path for path in set(state) | set(self._state) if state.get(path) != self._state.get(path))
+		self._state = state
+		return changed
+
+
+class InotifyWatcher(FlowcellWatcher):
+	""" Receives the filesystem events of the data folders, nosync folders, flowcell folders
+	and the folders where the markers appear. Flowcell subfolders are not watched recursively.
+	"""
+	MASK = 0
+	if pyinotify is not None:
+		MASK = pyinotify.IN_CREATE | pyinotify.IN_MOVED_TO | pyinotify.IN_MOVED_FROM | pyinotify.IN_DELETE | pyinotify.IN_CLOSE_WRITE
+
+	def __init__(self, data_folders, poll_interval=60):
+		super(InotifyWatcher, self).__init__(data_folders, poll_interval)
+		self._changed = set()
+		self._watch_manager = pyinotify.WatchManager()
+		self._notifier = pyinotify.Notifier(self._watch_manager, default_proc_fun=self._process_event)
+		for folder in self.parent_folders:
+			if os.path.isdir(folder):
+				self._watch_parent_folder(folder)
+
+	def _watch(self, path):
+		if os.path.isdir(path) and self._watch_manager.get_wd(path) is None:
+			self._watch_manager.add_watch(path, self.MASK)
+
+	def _watch_parent_folder(self, folder):
+		self._watch(folder)
+		for name in os.listdir(folder):
+			if name != NOSYNC:
+				self._watch_flowcell(os.path.join(folder, name))
+
+	def _watch_flowcell(self, flowcell_path):
+		self._watch(flowcell_path)
+		for subfolder in WATCHED_SUBFOLDERS:
+			self._watch(os.path.join(flowcell_path, subfolder))
+
+	def _unwatch(self, path):
+		wd = self._watch_manager.get_wd(path)
+		if wd is not None:
+			self._watch_manager.rm_watch(wd, rec=True, quiet=True)
+
+	def _process_event(self, event):
+		path = event.pathname
+		if os.path.dirname(path) in self.data_folders and os.path.basename(path) == NOSYNC:
+			# nosync folder has been created
+			if os.path.isdir(path):
+				self._watch_parent_folder(path)
+				self._changed.update(os.path.join(path, name) for name in os.listdir(path))
+			return
+
+		flowcell_path, marker = self.flowcell_of(path)
+		if flowcell_path is None:
+			return
+		if marker == '':
+			# flowcell folder created, moved or removed
+			if event.mask & (pyinotify.IN_MOVED_FROM | pyinotify.IN_DELETE):
+				self._unwatch(flowcell_path)
+			else:
+				self._watch_flowcell(flowcell_path)
+		elif marker in WATCHED_SUBFOLDERS:
+			self._watch(path)
+		if marker == '' or marker in MARKERS:
+			logging.debug("Flowcell changed: {} {}".format(event.maskname, path))
+			self._changed.add(flowcell_path)
+
+	def wait(self, timeout):
+		# pyinotify timeout is in milliseconds
+		if self._notifier.check_events(timeout=int(timeout * 1000)):
+			self._notifier.read_events()
+			self._notifier.process_events()
+		changed = self._changed
+		self._changed = set()
+		return changed
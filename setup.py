@@ -24,8 +24,11 @@ setup(name = "hugin",
       license = "MIT",
       entry_points={
             'console_scripts': ['hugin = cli:cli'],
+            # short help of the subcommands: cli.SUBCOMMAND_HELP
             'hugin.subcommands': [
                 'monitor_flowcells=monitor_flowcells.cli:monitor_flowcells',
+                'state=monitor_flowcells.cli:state',
+                'prune_board=monitor_flowcells.cli:prune_board',
                 'test=tests.cli:test_flowcells',
                 # 'server_status = taca.server_status.cli:server_status',
             ]
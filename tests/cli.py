@@ -7,21 +7,28 @@ from utils.config.config import load_yaml_config, CONFIG as config
 from tests.test_hiseqx import TestHiseqX
 from tests.test_hiseq import TestHiseq
 from tests.test_miseq import TestMiseq
+from tests.fake_trello_server import FakeTrelloServer
 
 @click.command()
 @click.option("--hiseqx", is_flag=True)
 @click.option("--hiseq", is_flag=True)
 @click.option("--miseq", is_flag=True)
 @click.option("--all", is_flag=True)
+@click.option("--fake-trello", is_flag=True, help="Use a local fake trello server instead of the board of the config file")
 # @click.option('-c', '--config-file',
 # 			  default="tests/config.yaml",
 # 			  envvar='HUGIN_CONFIG',
 # 			  type=click.File('r'),
 # 			  help='Path to hugin configuration file')
-def test_flowcells(hiseqx, hiseq, miseq, all):
+def test_flowcells(hiseqx, hiseq, miseq, all, fake_trello):
 	""" Run unittests with the default config file: tests/config.yaml. To change it, edit tests/test_<fc-type>.py file"""
 	# load_yaml_config(config_file)
 
+	if fake_trello:
+		server = FakeTrelloServer().start()
+		config.update({'trello': {'backend': 'rest', 'api_url': server.url, 'board_id': server.trello.board['id']}})
+		logging.info("Using fake trello: {}".format(server.url))
+
 	if not config.get('trello', ''):
 		logging.error("Config file missing required entries: 'trello'")
 		raise RuntimeError("Config file missing required entries: 'trello'")
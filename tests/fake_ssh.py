@@ -0,0 +1,9 @@
+""" Stand-in for ssh in the tests: ignores the options and the destination, runs the remote command locally.
+
+python tests/fake_ssh.py -o BatchMode=yes user@host 'remote command'
+"""
+import sys
+import subprocess
+
+if __name__ == '__main__':
+    sys.exit(subprocess.call(['sh', '-c', sys.argv[-1]]))
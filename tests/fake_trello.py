@@ -0,0 +1,177 @@
+""" In-memory stand-in for the Trello REST API.
+It can be used in-process as the client of TrelloBoard (same fetch_json() as TrelloRestClient),
+and counts the requests it receives.
+"""
+import re
+import datetime
+import itertools
+import collections
+
+from monitor_flowcells.flowcells.base_flowcell import FC_STATUSES
+from monitor_flowcells.trello_utils.rest_client import RestBoard
+
+LABEL_COLORS = ['green', 'yellow', 'orange', 'red', 'purple', 'blue']
+
+
+class FakeTrelloError(Exception):
+    def __init__(self, status_code, message):
+        super(FakeTrelloError, self).__init__(message)
+        self.status_code = status_code
+
+
+class FakeTrello(object):
+    """ One board with lists named after the flowcell statuses and the default unnamed labels """
+
+    def __init__(self, board_id='fakeboard', list_names=None):
+        self._ids = itertools.count(1)
+        self.board = {'id': board_id, 'name': 'FlowCell tracking'}
+        self.lists = collections.OrderedDict()
+        self.cards = collections.OrderedDict()
+        self.labels = collections.OrderedDict()
+        # comment actions, the newest first
+        self.actions = []
+        # number of requests per 'METHOD route'
+        self.requests = collections.Counter()
+        for name in list_names or sorted(FC_STATUSES.values()):
+            self._create('lists', {'name': name, 'closed': False, 'idBoard': board_id})
+        for color in LABEL_COLORS:
+            self._create('labels', {'name': '', 'color': color, 'idBoard': board_id})
+        self.routes = [
+            ('GET', r'/boards/([^/]+)', self.get_board_json),
+            ('GET', r'/boards/([^/]+)/lists', self.get_lists),
+            ('GET', r'/boards/([^/]+)/cards(?:/(\w+))?', self.get_cards),
+            ('GET', r'/boards/([^/]+)/labels', self.get_labels),
+            ('POST', r'/boards/([^/]+)/labels', self.create_label),
+            ('GET', r'/boards/([^/]+)/actions', self.get_actions),
+            ('GET', r'/lists/([^/]+)/cards', self.get_list_cards),
+            ('POST', r'/lists', self.create_list),
+            ('POST', r'/cards', self.create_card),
+            ('PUT', r'/cards/([^/]+)', self.update_card),
+            # py-trello Card.change_list, set_description, ...
+            ('PUT', r'/cards/([^/]+)/(\w+)', self.update_card_field),
+            ('POST', r'/cards/([^/]+)/idLabels', self.add_card_label),
+            ('GET', r'/cards/([^/]+)/actions', self.get_card_actions),
+            ('POST', r'/cards/([^/]+)/actions/comments', self.add_comment),
+        ]
+
+    def _create(self, collection, values):
+        item_id = '{:024x}'.format(next(self._ids))
+        item = dict(values, id=item_id)
+        getattr(self, collection)[item_id] = item
+        return item
+
+    def _get(self, collection, item_id):
+        try:
+            return getattr(self, collection)[item_id]
+        except KeyError:
+            raise FakeTrelloError(404, 'invalid id')
+
+    def _check_board(self, board_id):
+        if board_id != self.board['id']:
+            raise FakeTrelloError(404, 'board not found')
+
+    def fetch_json(self, uri_path, http_method='GET', query_params=None, post_args=None):
+        """ Same signature as TrelloRestClient.fetch_json """
+        params = dict(query_params or {})
+        params.update(post_args or {})
+        for method, pattern, handler in self.routes:
+            match = re.match(pattern + '$', uri_path)
+            if method == http_method and match:
+                self.requests['{} {}'.format(method, pattern)] += 1
+                return handler(params, *[group for group in match.groups() if group is not None])
+        raise FakeTrelloError(404, 'unknown route: {} {}'.format(http_method, uri_path))
+
+    def get_board(self, board_id):
+        return RestBoard(self, self.fetch_json('/boards/{}'.format(board_id)))
+
+    @property
+    def request_count(self):
+        return sum(self.requests.values())
+
+    # handlers: take the request parameters and the groups of the route
+    def get_board_json(self, params, board_id):
+        self._check_board(board_id)
+        return dict(self.board)
+
+    def get_lists(self, params, board_id):
+        self._check_board(board_id)
+        return [dict(trello_list) for trello_list in self.lists.values()
+                if params.get('filter', 'open') == 'all' or not trello_list['closed']]
+
+    def _filter_cards(self, cards, params, card_filter=None):
+        card_filter = card_filter or params.get('filter', 'open')
+        if card_filter != 'all':
+            cards = [card for card in cards if card['closed'] == (card_filter == 'closed')]
+        fields = params.get('fields')
+        if fields and fields != 'all':
+            fields = set(fields.split(',')) | {'id'}
+            return [dict((key, value) for key, value in card.items() if key in fields) for card in cards]
+        return [dict(card) for card in cards]
+
+    def get_cards(self, params, board_id, card_filter=None):
+        self._check_board(board_id)
+        return self._filter_cards(self.cards.values(), params, card_filter)
+
+    def get_list_cards(self, params, list_id):
+        self._get('lists', list_id)
+        return self._filter_cards([card for card in self.cards.values() if card['idList'] == list_id], params)
+
+    def get_labels(self, params, board_id):
+        self._check_board(board_id)
+        return [dict(label) for label in self.labels.values()]
+
+    def create_label(self, params, board_id):
+        self._check_board(board_id)
+        return dict(self._create('labels', {'name': params.get('name', ''), 'color': params.get('color'), 'idBoard': board_id}))
+
+    def get_actions(self, params, board_id):
+        self._check_board(board_id)
+        actions = [action for action in self.actions if action['type'] == 'commentCard']
+        return [dict(action) for action in actions[:int(params.get('limit', 50))]]
+
+    def get_card_actions(self, params, card_id):
+        self._get('cards', card_id)
+        actions = [action for action in self.actions if action['type'] == 'commentCard' and action['data']['card']['id'] == card_id]
+        return [dict(action) for action in actions[:int(params.get('limit', 50))]]
+
+    def create_list(self, params):
+        self._check_board(params['idBoard'])
+        return dict(self._create('lists', {'name': params['name'], 'closed': False, 'idBoard': params['idBoard']}))
+
+    def create_card(self, params):
+        self._get('lists', params['idList'])
+        return dict(self._create('cards', {
+            'name': params.get('name', ''), 'desc': params.get('desc', ''), 'idList': params['idList'],
+            'idLabels': [], 'due': None, 'closed': False, 'idBoard': self.board['id'],
+            'dateLastActivity': datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        }))
+
+    def update_card(self, params, card_id):
+        card = self._get('cards', card_id)
+        for key, value in params.items():
+            if key == 'closed':
+                value = value in (True, 'true')
+            elif key == 'due' and value:
+                # trello returns the due date with milliseconds and timezone
+                value = value[:len('2015-04-24T10:00:00')] + '.000Z'
+            if key not in ('key', 'token'):
+                card[key] = value
+        card['dateLastActivity'] = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        return dict(card)
+
+    def update_card_field(self, params, card_id, field):
+        return self.update_card({field: params['value']}, card_id)
+
+    def add_card_label(self, params, card_id):
+        card = self._get('cards', card_id)
+        self._get('labels', params['value'])
+        if params['value'] not in card['idLabels']:
+            card['idLabels'].append(params['value'])
+        return list(card['idLabels'])
+
+    def add_comment(self, params, card_id):
+        card = self._get('cards', card_id)
+        action = {'id': '{:024x}'.format(next(self._ids)), 'type': 'commentCard',
+                  'data': {'text': params['text'], 'card': {'id': card_id, 'name': card['name']}}}
+        self.actions.insert(0, action)
+        return dict(action)
@@ -0,0 +1,150 @@
+""" Local HTTP server serving the fake trello API (tests/fake_trello.py), for offline end-to-end and load tests.
+Point hugin at it with the config:
+
+trello:
+   backend: rest
+   api_url: http://localhost:8765/1
+   board_id: fakeboard
+
+python -m tests.fake_trello_server --port 8765 --latency 0.05 --rate-limit-every 50
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qsl
+except ImportError:
+    # python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qsl
+
+from tests.fake_trello import FakeTrello, FakeTrelloError
+
+API_PREFIX = '/1'
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeTrelloServer(object):
+    """ Serves a FakeTrello over HTTP.
+
+    :param FakeTrello trello: The fake board to serve, a new one by default
+    :param float latency: Delay added to every response, in seconds
+    :param int rate_limit_every: Answer every n-th request with 429, 0 to disable
+    :param float retry_after: Value of the Retry-After header of the 429 responses
+    """
+    def __init__(self, trello=None, host='localhost', port=0, latency=0, rate_limit_every=0, retry_after=1):
+        self.trello = trello or FakeTrello()
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://{}:{}{}'.format(host, port, API_PREFIX)
+
+    def start(self):
+        """ Serve in a background thread """
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def handle(self, method, url, body):
+        """ Returns (status code, headers, response object) """
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.request_count += 1
+            if self.rate_limit_every and self.request_count % self.rate_limit_every == 0:
+                self.rate_limited_count += 1
+                return 429, {'Retry-After': str(self.retry_after)}, {'message': 'API_TOKEN_LIMIT_EXCEEDED'}
+
+            parsed_url = urlparse(url)
+            if not parsed_url.path.startswith(API_PREFIX + '/'):
+                return 404, {}, {'message': 'not found'}
+            query_params = dict(parse_qsl(parsed_url.query))
+            post_args = dict(parse_qsl(body)) if body else None
+            try:
+                return 200, {}, self.trello.fetch_json(parsed_url.path[len(API_PREFIX):], http_method=method,
+                                                       query_params=query_params, post_args=post_args)
+            except FakeTrelloError as e:
+                return e.status_code, {}, {'message': str(e)}
+            except KeyError as e:
+                return 400, {}, {'message': 'missing parameter: {}'.format(e)}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode('utf-8') if length else ''
+                status, headers, response = server.handle(self.command, self.path, body)
+                content = json.dumps(response).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+            def log_message(self, format, *args):
+                logging.debug('fake trello: ' + format % args)
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0, help='delay of every response, in seconds')
+    parser.add_argument('--rate-limit-every', type=int, default=0, help='answer every n-th request with 429')
+    parser.add_argument('--retry-after', type=float, default=1, help='Retry-After of the 429 responses, in seconds')
+    args = parser.parse_args(argv)
+
+    server = FakeTrelloServer(host=args.host, port=args.port, latency=args.latency,
+                              rate_limit_every=args.rate_limit_every, retry_after=args.retry_after)
+    print('Fake trello listening on {}, board id: {}'.format(server.url, server.trello.board['id']))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(json.dumps({'requests': server.request_count, 'rate_limited': server.rate_limited_count,
+                          'requests_per_route': dict(server.trello.requests)}, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
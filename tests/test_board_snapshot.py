@@ -0,0 +1,151 @@
+import unittest
+
+from monitor_flowcells.trello_utils import board_snapshot
+from monitor_flowcells.trello_utils.board_snapshot import BoardSnapshot
+from tests.fake_trello import FakeTrello
+
+
+class FakeObject(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class CountingBoard(object):
+    """ Board stub which counts how many times it has been read """
+    def __init__(self):
+        self.reads = 0
+        self.lists = [FakeObject(id='l1', name='Sequencing'), FakeObject(id='l2', name='Nosync')]
+        self.cards = [FakeObject(id='c1', name='FC1', list_id='l1'), FakeObject(id='c2', name='FC2', list_id='l2')]
+        self.labels = [FakeObject(id='lb1', name='host', color='green'), FakeObject(id='lb2', name='', color='red')]
+
+    def all_lists(self):
+        self.reads += 1
+        return self.lists
+
+    def all_cards(self):
+        self.reads += 1
+        return self.cards
+
+    def get_labels(self):
+        self.reads += 1
+        return self.labels
+
+
+class TestBoardSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.board = CountingBoard()
+        self.snapshot = BoardSnapshot(self.board)
+
+    def test_lookups_read_board_once(self):
+        for _ in range(10):
+            self.assertEqual(self.snapshot.get_card_by_name('FC2').id, 'c2')
+            self.assertEqual(self.snapshot.get_list_by_name('Nosync').id, 'l2')
+            self.assertEqual(self.snapshot.get_label_by_name('host').id, 'lb1')
+        self.assertEqual(self.board.reads, 3)
+
+    def test_missing_names(self):
+        self.assertIsNone(self.snapshot.get_card_by_name('FC3'))
+        self.assertIsNone(self.snapshot.get_list_by_name('Archived'))
+        self.assertIsNone(self.snapshot.get_label_by_name(''))
+
+    def test_cards_by_list(self):
+        cards = self.snapshot.get_cards_by_list_id('l1')
+        self.assertEqual([card.id for card in cards], ['c1'])
+
+    def test_add_card(self):
+        self.snapshot.cards
+        self.snapshot.add_card(FakeObject(id='c3', name='FC3', list_id='l1'))
+        self.assertEqual(self.snapshot.get_card_by_name('FC3').id, 'c3')
+        self.assertEqual(self.board.reads, 1)
+
+    def test_refresh(self):
+        self.snapshot.get_card_by_name('FC1')
+        self.snapshot.refresh()
+        self.snapshot.get_card_by_name('FC1')
+        self.assertEqual(self.board.reads, 2)
+
+
+class FieldsClient(object):
+    """ Client stub answering the card requests of the 'fields' fetch mode """
+    def __init__(self):
+        self.requests = []
+        self.cards = [
+            {'id': 'c1', 'name': 'FC1', 'idList': 'l1', 'idLabels': ['lb1'], 'due': None, 'desc': 'host'},
+            {'id': 'c2', 'name': 'FC2', 'idList': 'l2', 'idLabels': [], 'due': None, 'desc': 'other host'},
+        ]
+
+    def fetch_json(self, uri_path, http_method='GET', query_params=None, post_args=None):
+        self.requests.append((uri_path, query_params))
+        if uri_path.startswith('/lists/'):
+            list_id = uri_path.split('/')[2]
+            return [card for card in self.cards if card['idList'] == list_id]
+        return self.cards
+
+
+class TestBoardSnapshotFields(unittest.TestCase):
+
+    def setUp(self):
+        self.board = CountingBoard()
+        self.board.id = 'b1'
+        self.board.client = FieldsClient()
+        self.snapshot = BoardSnapshot(self.board, card_fetch='fields')
+
+    def test_open_cards_with_fields(self):
+        self.assertEqual(self.snapshot.get_card_by_name('FC1').list_id, 'l1')
+        uri_path, query_params = self.board.client.requests[0]
+        self.assertEqual(uri_path, '/boards/b1/cards')
+        self.assertEqual(query_params, {'filter': 'open', 'fields': 'name,idList,idLabels,due,desc'})
+        # board.all_cards() is not used
+        self.assertEqual(self.board.reads, 0)
+
+    def test_cards_by_list_fetch_one_list(self):
+        self.assertEqual([card.id for card in self.snapshot.get_cards_by_list_id('l2')], ['c2'])
+        self.snapshot.get_cards_by_list_id('l2')
+        self.assertEqual([request[0] for request in self.board.client.requests], ['/lists/l2/cards'])
+        # once the whole board is fetched, lists are served from it
+        self.snapshot.cards
+        self.assertEqual([card.id for card in self.snapshot.get_cards_by_list_id('l1')], ['c1'])
+        self.assertEqual(len(self.board.client.requests), 2)
+
+    def test_cards_by_label(self):
+        self.assertEqual([card.id for card in self.snapshot.get_cards_by_label_id('lb1')], ['c1'])
+        card = self.snapshot.get_card_by_name('FC2')
+        self.snapshot.add_card_label(card, 'lb1')
+        self.assertEqual([card.id for card in self.snapshot.get_cards_by_label_id('lb1')], ['c1', 'c2'])
+
+    def test_unknown_fetch_mode(self):
+        self.assertRaises(RuntimeError, BoardSnapshot, self.board, card_fetch='some')
+
+
+class TestLastComments(unittest.TestCase):
+
+    def setUp(self):
+        self.trello = FakeTrello(list_names=['Sequencing'])
+        list_id = next(iter(self.trello.lists))
+        self.card_ids = []
+        for index in range(5):
+            card_id = self.trello._create('cards', {'name': 'FC{}'.format(index), 'desc': '', 'idList': list_id,
+                                                    'idLabels': [], 'due': None, 'closed': False, 'idBoard': 'fakeboard'})['id']
+            self.trello.fetch_json('/cards/{}/actions/comments'.format(card_id), http_method='POST',
+                                   post_args={'text': 'comment {}'.format(index)})
+            self.card_ids.append(card_id)
+        self.snapshot = BoardSnapshot(self.trello.get_board('fakeboard'), card_fetch='fields')
+
+    def test_board_with_more_comments_than_the_limit(self):
+        self.addCleanup(setattr, board_snapshot, 'COMMENT_ACTIONS_LIMIT', board_snapshot.COMMENT_ACTIONS_LIMIT)
+        board_snapshot.COMMENT_ACTIONS_LIMIT = 3
+        self.assertEqual([self.snapshot.get_last_comment(card_id) for card_id in self.card_ids],
+                         ['comment {}'.format(index) for index in range(5)])
+        # the two oldest comments are read per card, once
+        self.snapshot.get_last_comment(self.card_ids[0])
+        self.assertEqual(self.trello.requests['GET /cards/([^/]+)/actions'], 2)
+
+    def test_all_comments_in_one_request(self):
+        self.assertEqual(self.snapshot.get_last_comment(self.card_ids[0]), 'comment 0')
+        self.assertIsNone(self.snapshot.get_last_comment('unknown'))
+        self.assertEqual(self.trello.requests['GET /cards/([^/]+)/actions'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
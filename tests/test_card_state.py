@@ -0,0 +1,132 @@
+import unittest
+import datetime
+
+import trello
+
+from monitor_flowcells.trello_utils.board_snapshot import BoardSnapshot
+from monitor_flowcells.trello_utils.card_state import CardState, CardWriter, comment_key
+from tests.fake_trello import FakeTrello
+
+
+class FakeCard(object):
+    def __init__(self, **kwargs):
+        self.id = 'c1'
+        self.list_id = 'l1'
+        self.due = None
+        self.label_ids = []
+        self.description = 'description'
+        self.__dict__.update(kwargs)
+        self.calls = []
+
+    def set_due(self, due):
+        self.calls.append('set_due')
+
+    def change_list(self, list_id):
+        self.calls.append('change_list')
+
+    def add_label(self, label):
+        self.calls.append('add_label')
+
+    def set_description(self, description):
+        self.calls.append('set_description')
+
+    def comment(self, text):
+        self.calls.append('comment')
+
+
+class FakeLabel(object):
+    id = 'lb1'
+
+
+class FakeSnapshot(object):
+    def set_last_comment(self, card_id, text):
+        pass
+
+    def add_card_label(self, card, label_id):
+        card.label_ids.append(label_id)
+
+    def set_card_list(self, card, list_id):
+        card.list_id = list_id
+
+    def set_card_description(self, card, description):
+        card.description = description
+
+
+class TestCardState(unittest.TestCase):
+
+    def setUp(self):
+        self.due = datetime.datetime(2015, 4, 25, 10, 30)
+        self.comment = "STATUS: Sequencing, started: 2015-04-24, expected end time: 2015-04-25, current time: {}, current cycle: 12"
+        self.desired = CardState(list_id='l1', due=self.due, labels=[FakeLabel()], description='description',
+                                 comment=self.comment.format(datetime.datetime.now()))
+
+    def test_up_to_date_card_is_skipped(self):
+        card = FakeCard(due='2015-04-25T10:30:00.000Z', label_ids=['lb1'])
+        writer = CardWriter(FakeSnapshot())
+        writer.add(card, self.desired, CardState.from_card(card, last_comment=self.comment.format('yesterday')))
+        writer.apply()
+        self.assertEqual(card.calls, [])
+        self.assertEqual(writer.writes, 0)
+        self.assertEqual(writer.skipped, 5)
+
+    def test_changed_fields_are_written_once(self):
+        card = FakeCard(list_id='l0', description='old description')
+        writer = CardWriter(FakeSnapshot())
+        writer.add(card, self.desired, CardState.from_card(card))
+        writer.apply()
+        self.assertEqual(card.calls, ['set_due', 'change_list', 'add_label', 'set_description', 'comment'])
+        # the local card is updated, so the second update does nothing
+        writer = CardWriter(FakeSnapshot())
+        writer.add(card, self.desired, CardState.from_card(card, last_comment=self.desired.comment))
+        writer.apply()
+        self.assertEqual(writer.writes, 0)
+
+    def test_comment_key(self):
+        self.assertEqual(comment_key(self.comment.format(1)), comment_key(self.comment.format(2)))
+        self.assertIsNone(comment_key(None))
+
+    def test_comment_key_ignores_progress(self):
+        previous = "STATUS: Sequencing, started: 2015-04-24, expected end time: 2015-04-25 10:00, current time: 2015-04-24 12:00, current cycle: 12, confidence: 0.40"
+        current = "STATUS: Sequencing, started: 2015-04-24, expected end time: 2015-04-25 11:30, current time: 2015-04-24 13:00, current cycle: 20, confidence: 0.55"
+        self.assertEqual(comment_key(previous), comment_key(current))
+        self.assertEqual(comment_key(current), "STATUS: Sequencing, started: 2015-04-24")
+        self.assertNotEqual(comment_key(current), comment_key(current.replace('Sequencing', 'Demultiplexing')))
+
+    def test_comment_key_ignores_confidence(self):
+        # the confidence is added once the run has enough cycles
+        comment = self.comment.format('2015-04-25 12:00')
+        self.assertEqual(comment_key(comment), comment_key(comment + ", confidence: 0.62"))
+
+
+class TestPyTrelloCard(unittest.TestCase):
+    """ list_id and description are read-only properties of a py-trello Card """
+
+    def setUp(self):
+        self.trello = FakeTrello(list_names=['Sequencing', 'Demultiplexing'])
+        self.list_ids = [list_id for list_id in self.trello.lists]
+        card_json = self.trello._create('cards', {'name': 'FC1', 'desc': 'old', 'idList': self.list_ids[0], 'idLabels': [],
+                                                  'due': None, 'closed': False, 'idBoard': 'fakeboard'})
+        board = trello.Board(client=self.trello, board_id='fakeboard')
+        self.card = trello.Card(board, card_json['id'], name='FC1')
+        self.card.idList = card_json['idList']
+        self.card.desc = card_json['desc']
+        self.snapshot = BoardSnapshot(self.trello.get_board('fakeboard'), card_fetch='fields')
+
+    def test_move_and_describe(self):
+        writer = CardWriter(self.snapshot)
+        writer.add(self.card, CardState(list_id=self.list_ids[1], description='new'), CardState.from_card(self.card))
+        writer.apply()
+        self.assertEqual((self.card.list_id, self.card.description), (self.list_ids[1], 'new'))
+        self.assertEqual(self.trello.cards[self.card.id]['idList'], self.list_ids[1])
+        self.assertEqual(self.trello.cards[self.card.id]['desc'], 'new')
+
+    def test_moved_card_leaves_the_fetched_list(self):
+        self.assertEqual([card.name for card in self.snapshot.get_cards_by_list_id(self.list_ids[0])], ['FC1'])
+        self.assertEqual(self.snapshot.get_cards_by_list_id(self.list_ids[1]), [])
+        self.snapshot.set_card_list(self.card, self.list_ids[1])
+        self.assertEqual(self.snapshot.get_cards_by_list_id(self.list_ids[0]), [])
+        self.assertEqual([card.name for card in self.snapshot.get_cards_by_list_id(self.list_ids[1])], ['FC1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from monitor_flowcells.flowcells.base_flowcell import FC_STATUSES
+from monitor_flowcells.trello_utils import trello_board
+from monitor_flowcells.trello_utils.coordination import BoardLease
+from monitor_flowcells.trello_utils.trello_board import TrelloBoard
+from tests.fake_trello import FakeTrello
+
+
+class FakeSocket(object):
+    def __init__(self, hostname):
+        self.hostname = hostname
+
+    def gethostname(self):
+        return self.hostname
+
+
+class TestBoardLease(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'board.lease')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_exclusive(self):
+        with BoardLease(self.path):
+            self.assertTrue(os.path.exists(self.path))
+            self.assertRaises(RuntimeError, BoardLease(self.path, timeout=0).acquire)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_stale_lease_is_broken(self):
+        open(self.path, 'w').close()
+        old = time.time() - 120
+        os.utime(self.path, (old, old))
+        with BoardLease(self.path, ttl=60, timeout=0):
+            self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(os.listdir(self.folder), [])
+
+    def test_without_path(self):
+        with BoardLease():
+            self.assertEqual(os.listdir(self.folder), [])
+
+
+class TestCoordinatedBoards(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.trello = FakeTrello(list_names=[status for status in sorted(FC_STATUSES.values()) if status != FC_STATUSES['NOSYNC']])
+        self.list_id = next(iter(self.trello.lists))
+        self.labels = {}
+        for host in ('host-a', 'host-b'):
+            self.labels[host] = self.trello._create('labels', {'name': host, 'color': 'green', 'idBoard': 'fakeboard'})['id']
+            for index in range(3):
+                self.trello._create('cards', {'name': '{}-FC{}'.format(host, index), 'desc': 'host: {}'.format(host),
+                                              'idList': self.list_id, 'idLabels': [self.labels[host]], 'due': None,
+                                              'closed': False, 'idBoard': 'fakeboard'})
+        self.addCleanup(setattr, trello_board, 'socket', trello_board.socket)
+        self.addCleanup(shutil.rmtree, self.folder)
+
+    def board(self, host, **coordination):
+        trello_board.socket = FakeSocket(host)
+        coordination = dict({'enabled': True, 'lease_file': os.path.join(self.folder, 'board.lease')}, **coordination)
+        return TrelloBoard({'trello': {'board_id': 'fakeboard'}, 'coordination': coordination}, client=self.trello)
+
+    def test_own_cards_only(self):
+        board = self.board('host-a')
+        self.assertEqual(sorted(card.name for card in board.snapshot.cards), ['host-a-FC0', 'host-a-FC1', 'host-a-FC2'])
+        self.assertIsNone(board.get_card_by_name('host-b-FC0'))
+
+    def test_host_label_resolved_once(self):
+        board = self.board('host-a')
+        board.snapshot.cards
+        board.snapshot.refresh()
+        board.snapshot.cards
+        self.assertEqual(board.get_host_label().id, self.labels['host-a'])
+        self.assertEqual(self.trello.requests['GET /boards/([^/]+)/labels'], 1)
+
+    def test_configured_label_id(self):
+        board = self.board('host-b', label_id=self.labels['host-b'])
+        self.assertEqual(len(board.snapshot.cards), 3)
+        self.assertEqual(self.trello.requests['GET /boards/([^/]+)/labels'], 0)
+
+    def test_list_created_once(self):
+        board_a = self.board('host-a')
+        board_b = self.board('host-b')
+        board_a.get_list_by_name(FC_STATUSES['NOSYNC'])
+        board_b.get_list_by_name(FC_STATUSES['NOSYNC'])
+        self.assertEqual([trello_list['name'] for trello_list in self.trello.lists.values()].count(FC_STATUSES['NOSYNC']), 1)
+        self.assertEqual(os.listdir(self.folder), [])
+
+    def test_new_host_label(self):
+        board = self.board('host-c')
+        label = board.get_host_label()
+        self.assertEqual(self.trello.labels[label.id]['name'], 'host-c')
+        self.assertIs(board.get_host_label(), label)
@@ -0,0 +1,60 @@
+import datetime
+import unittest
+
+import numpy
+
+from monitor_flowcells.flowcells.cycle_stats import CycleTimeStats, WARMUP_CYCLES
+from monitor_flowcells.flowcells.cycle_times import CycleTimesReader
+
+CYCLE_TIMES = 'tests/test_data/hiseqx/150424_ST-E00214_0031_BH2WY7CCXX/Logs/CycleTimes.txt'
+START = datetime.datetime(2015, 10, 6, 11, 39)
+
+
+def make_cycles(durations):
+    """ Cycles starting one after the other, with the given durations in seconds """
+    cycles = []
+    start = START
+    for number, duration in enumerate(durations, 1):
+        cycles.append({'cycle_number': number, 'start': start, 'end': start + datetime.timedelta(seconds=duration - 1)})
+        start += datetime.timedelta(seconds=duration)
+    return cycles
+
+
+class TestCycleTimeStats(unittest.TestCase):
+    def test_warmup_and_pauses(self):
+        # slow first cycles, a 2 hour pause, and a running cycle
+        durations = [1800] * WARMUP_CYCLES + [600] * 40 + [7200] + [600] * 40 + [600]
+        stats = CycleTimeStats.from_cycles(make_cycles(durations))
+        self.assertEqual(stats.count, len(durations))
+        self.assertAlmostEqual(stats.cycle_time, 600)
+        # the plain mean is skewed
+        self.assertGreater(numpy.mean(stats.durations), 700)
+        self.assertGreater(stats.confidence, 0.9)
+
+    def test_eta(self):
+        stats = CycleTimeStats.from_cycles(make_cycles([600] * 20))
+        # 20 cycles started, the running one and 10 more to go
+        self.assertEqual(stats.eta(30), START + datetime.timedelta(seconds=600 * 30))
+        self.assertEqual(stats.eta_margin(30), datetime.timedelta(0))
+
+    def test_trend(self):
+        # the cycles get slower: the predicted end is later than with a constant cycle time
+        stats = CycleTimeStats.from_cycles(make_cycles([500 + 5 * i for i in range(30)]))
+        self.assertGreater(stats.trend()[1], 0)
+        constant_eta = START + datetime.timedelta(seconds=float(stats.starts[-1] - stats.starts[0]) + stats.cycle_time * 31)
+        self.assertGreater(stats.eta(60), constant_eta)
+
+    def test_not_enough_cycles(self):
+        stats = CycleTimeStats.from_cycles(make_cycles([600] * (WARMUP_CYCLES + 2)))
+        self.assertIsNone(stats.cycle_time)
+        self.assertIsNone(stats.eta(100))
+        self.assertEqual(stats.confidence, 0.0)
+
+    def test_reader(self):
+        reader = CycleTimesReader(CYCLE_TIMES)
+        reader.read()
+        stats = reader.stats
+        self.assertEqual(stats.count, 310)
+        self.assertIs(reader.stats, stats)
+        # the running cycle is the last one
+        self.assertLess(stats.eta(310), reader.cycles[-1]['end'] + datetime.timedelta(hours=1))
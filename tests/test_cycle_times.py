@@ -0,0 +1,58 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+from monitor_flowcells.flowcells.cycle_times import CycleTimesReader
+
+CYCLE_TIMES = 'tests/test_data/hiseqx/150424_ST-E00214_0031_BH2WY7CCXX/Logs/CycleTimes.txt'
+
+
+class TestCycleTimesReader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cycle_times = os.path.join(self.tmp_dir, 'CycleTimes.txt')
+        with open(CYCLE_TIMES, 'rb') as f:
+            self.content = f.read()
+
+    def test_read_whole_file(self):
+        reader = CycleTimesReader(CYCLE_TIMES)
+        reader.read()
+        self.assertEqual(reader.cycles[0]['cycle_number'], 1)
+        self.assertEqual(reader.last_cycle_number, 310)
+        self.assertEqual(len(reader.cycles), 310)
+        for cycle in reader.cycles:
+            self.assertLessEqual(cycle['start'], cycle['end'])
+
+    def test_incremental_read(self):
+        full_reader = CycleTimesReader(CYCLE_TIMES)
+        full_reader.read()
+
+        reader = CycleTimesReader(self.cycle_times)
+        with open(self.cycle_times, 'wb') as f:
+            # chunks are cut in the middle of the lines
+            for start in range(0, len(self.content), 1000):
+                f.write(self.content[start:start + 1000])
+                f.flush()
+                self.assertTrue(reader.read())
+        self.assertFalse(reader.read())
+        self.assertEqual(reader.cycles, full_reader.cycles)
+        self.assertEqual(reader.average_cycle_time, full_reader.average_cycle_time)
+
+    def test_truncated_file(self):
+        with open(self.cycle_times, 'wb') as f:
+            f.write(self.content)
+        reader = CycleTimesReader(self.cycle_times)
+        reader.read()
+        with open(self.cycle_times, 'wb') as f:
+            f.write(self.content[:2000])
+        reader.read()
+        self.assertLess(reader.last_cycle_number, 310)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
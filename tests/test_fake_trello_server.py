@@ -0,0 +1,33 @@
+import unittest
+
+from monitor_flowcells.trello_utils.rest_client import TrelloRestClient
+from tests.fake_trello_server import FakeTrelloServer
+
+
+class TestFakeTrelloServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeTrelloServer(rate_limit_every=3, retry_after=0).start()
+        self.client = TrelloRestClient(api_key='key', token='token', api_url=self.server.url)
+        self.board = self.client.get_board(self.server.trello.board['id'])
+
+    def test_cards(self):
+        trello_list = self.board.all_lists()[0]
+        card = trello_list.add_card(name='150424_ST-E00214_0031_BH2WY7CCXX', desc='description')
+        card.comment('STATUS: Sequencing')
+        cards = self.board.all_cards()
+        self.assertEqual([c.name for c in cards], ['150424_ST-E00214_0031_BH2WY7CCXX'])
+        self.assertEqual(cards[0].list_id, trello_list.id)
+        self.assertEqual(self.server.trello.actions[0]['data']['text'], 'STATUS: Sequencing')
+
+    def test_rate_limit_is_retried(self):
+        for _ in range(5):
+            self.board.get_labels()
+        self.assertGreater(self.server.rate_limited_count, 0)
+
+    def tearDown(self):
+        self.server.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import shutil
+import logging
+import tempfile
+import unittest
+
+from utils.cache.parse_cache import PARSE_CACHE
+from monitor_flowcells.flowcell_monitor import iter_flowcell_paths
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self, level=logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TestIterFlowcellPaths(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.data_folder = os.path.join(self.folder, 'data')
+        for name in ('150424_ST-E00214_0031_BH2WY7CCXX', '151204_D00483_0115_BC81N5ANXX', 'nosync', 'not_a_flowcell'):
+            os.makedirs(os.path.join(self.data_folder, name))
+        open(os.path.join(self.data_folder, 'README.txt'), 'w').close()
+        self.cache_settings = (PARSE_CACHE.path, PARSE_CACHE.enabled)
+        PARSE_CACHE.configure({'parse_cache': {'path': os.path.join(self.folder, 'cache.sqlite'), 'enabled': True}})
+
+    def tearDown(self):
+        PARSE_CACHE.configure({'parse_cache': {'path': self.cache_settings[0], 'enabled': self.cache_settings[1]}})
+        shutil.rmtree(self.folder)
+
+    def list_flowcells(self, dirs_only=True):
+        handler = RecordingHandler()
+        logging.getLogger().addHandler(handler)
+        try:
+            names = sorted(os.path.basename(path) for path in iter_flowcell_paths(self.data_folder, dirs_only, ignore_cache=True))
+        finally:
+            logging.getLogger().removeHandler(handler)
+        return names, [message for message in handler.messages if "doesn't match" in message]
+
+    def test_flowcells_only(self):
+        names, warnings = self.list_flowcells()
+        self.assertEqual(names, ['150424_ST-E00214_0031_BH2WY7CCXX', '151204_D00483_0115_BC81N5ANXX'])
+        # README.txt is not a directory, skipped without a warning
+        self.assertEqual(len(warnings), 2)
+
+    def test_non_flowcells_logged_once(self):
+        self.list_flowcells()
+        names, warnings = self.list_flowcells()
+        self.assertEqual(len(names), 2)
+        self.assertEqual(warnings, [])
+        # a new non-flowcell folder changes the mtime of the folder, only the new name is logged
+        os.makedirs(os.path.join(self.data_folder, 'tmp'))
+        names, warnings = self.list_flowcells()
+        self.assertEqual(len(names), 2)
+        self.assertEqual(len(warnings), 1)
+
+    def test_streaming(self):
+        paths = iter_flowcell_paths(self.data_folder, True)
+        self.assertTrue(next(paths).startswith(self.data_folder))
+
@@ -0,0 +1,152 @@
+import os
+import shutil
+import pickle
+import datetime
+import logging
+import tempfile
+import unittest
+
+from monitor_flowcells import flowcell_monitor
+from monitor_flowcells.flowcells.summary import FlowcellSummary
+from monitor_flowcells.flowcells import cycle_times
+from monitor_flowcells.flowcell_monitor import FlowcellMonitor, summarize_flowcells
+from monitor_flowcells.flowcells.transfer_status import TRANSFER_STATUS
+
+
+class FakeFlowcell(object):
+    cycle_times_file = 'Logs/CycleTimes.txt'
+
+    def __init__(self, name, status='Sequencing', description='description', sequencing_done=None):
+        self.path = '/data/' + name
+        self.name = name
+        self.status = status
+        self.due_date = datetime.datetime(2016, 1, 1, 10, 0)
+        self.check_status = None
+        self._description = description
+        self.sequencing_done = sequencing_done
+        self.transfer_candidate = status == 'Demultiplexing'
+
+    @property
+    def description(self):
+        if self._description is None:
+            raise RuntimeError('SampleSheet.csv cannot be found')
+        if self._description is AttributeError:
+            raise AttributeError("'FakeFlowcell' object has no attribute 'date'")
+        return self._description
+
+
+class TestFlowcellSummary(unittest.TestCase):
+
+    def test_from_flowcell(self):
+        summary = FlowcellSummary.from_flowcell(FakeFlowcell('fc1'))
+        self.assertEqual((summary.name, summary.status, summary.description), ('fc1', 'Sequencing', 'description'))
+        self.assertEqual(summary.due_date, datetime.datetime(2016, 1, 1, 10, 0))
+        self.assertFalse(hasattr(summary, '__dict__'))
+
+    def test_description_cannot_be_built(self):
+        summary = FlowcellSummary.from_flowcell(FakeFlowcell('fc1', description=None))
+        self.assertIsNone(summary.description)
+
+    def test_description_of_instrument_without_date(self):
+        summary = FlowcellSummary.from_flowcell(FakeFlowcell('fc1', description=AttributeError))
+        self.assertIsNone(summary.description)
+
+    def test_pickle(self):
+        summary = FlowcellSummary.from_flowcell(FakeFlowcell('fc1'))
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            copy = pickle.loads(pickle.dumps(summary, protocol))
+            self.assertEqual(copy.name, 'fc1')
+            self.assertEqual(copy.due_date, summary.due_date)
+            self.assertEqual(copy.host, summary.host)
+
+
+class TestSummarizeFlowcells(unittest.TestCase):
+
+    def setUp(self):
+        self.prefetched = []
+        self.prefetch_flowcells = TRANSFER_STATUS.prefetch_flowcells
+        TRANSFER_STATUS.prefetch_flowcells = self.prefetched.append
+
+    def tearDown(self):
+        TRANSFER_STATUS.prefetch_flowcells = self.prefetch_flowcells
+
+    def test_order_and_transfer_check(self):
+        summary = FlowcellSummary.from_flowcell(FakeFlowcell('fc1'))
+        candidate = FakeFlowcell('fc2', status='Demultiplexing')
+        summaries = summarize_flowcells([summary, candidate])
+        self.assertEqual([flowcell.name for flowcell in summaries], ['fc1', 'fc2'])
+        self.assertTrue(all(isinstance(flowcell, FlowcellSummary) for flowcell in summaries))
+        # the transfers of all candidates are checked at once
+        self.assertEqual(self.prefetched, [[candidate]])
+
+    def test_no_transfer_check_without_candidates(self):
+        summarize_flowcells([FlowcellSummary.from_flowcell(FakeFlowcell('fc1'))])
+        self.assertEqual(self.prefetched, [])
+
+    def test_reader_of_complete_run_is_released(self):
+        flowcell = FakeFlowcell('fc1', sequencing_done=datetime.datetime(2016, 1, 1))
+        cycle_times.READERS['/data/fc1/Logs/CycleTimes.txt'] = object()
+        summarize_flowcells([flowcell])
+        self.assertNotIn('/data/fc1/Logs/CycleTimes.txt', cycle_times.READERS)
+
+
+class FakeClock(object):
+    """ Every call to time() is 10 seconds after the previous one """
+    def __init__(self):
+        self.now = 0
+
+    def time(self):
+        self.now += 10
+        return self.now
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self, logging.INFO)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TestInitFlowcells(unittest.TestCase):
+
+    def setUp(self):
+        self.data_folder = tempfile.mkdtemp()
+        test_data = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_data')
+        for instrument in ('hiseqx', 'miseq'):
+            for name in os.listdir(os.path.join(test_data, instrument)):
+                shutil.copytree(os.path.join(test_data, instrument, name), os.path.join(self.data_folder, name))
+        self.prefetch_flowcells = TRANSFER_STATUS.prefetch_flowcells
+        TRANSFER_STATUS.prefetch_flowcells = lambda flowcells: None
+
+    def tearDown(self):
+        TRANSFER_STATUS.prefetch_flowcells = self.prefetch_flowcells
+        shutil.rmtree(self.data_folder)
+
+    def test_miseq_flowcell_does_not_stop_discovery(self):
+        # the status of a MiseqFlowcell cannot be computed, it is left out
+        for workers in (1, 2):
+            monitor = FlowcellMonitor({'data_folders': [self.data_folder], 'discovery': {'workers': workers}})
+            summaries = monitor.init_flowcells([(self.data_folder, True)])
+            self.assertEqual([summary.name for summary in summaries], ['150424_ST-E00214_0031_BH2WY7CCXX'])
+
+    def test_time_of_each_folder(self):
+        other_folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, other_folder)
+        name = '150424_ST-E00214_0031_BH2WY7CCXX'
+        shutil.copytree(os.path.join(self.data_folder, name), os.path.join(other_folder, name))
+        self.addCleanup(setattr, flowcell_monitor, 'time', flowcell_monitor.time)
+        flowcell_monitor.time = FakeClock()
+        handler = RecordingHandler()
+        logger = logging.getLogger()
+        self.addCleanup(logger.setLevel, logger.level)
+        self.addCleanup(logger.removeHandler, handler)
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        monitor = FlowcellMonitor({'data_folders': [self.data_folder, other_folder]})
+        monitor.init_flowcells([(self.data_folder, True), (other_folder, True)])
+        # the second folder is not timed from the start of the discovery
+        self.assertEqual([message for message in handler.messages if message.startswith('Initialized')],
+                         ['Initialized 1 flowcells from {} in 10.00s'.format(self.data_folder),
+                          'Initialized 1 flowcells from {} in 10.00s'.format(other_folder)])
@@ -0,0 +1,63 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from monitor_flowcells.trello_utils.instrumentation import ApiMetrics, endpoint_name
+
+
+class FakeClient(object):
+    def __init__(self):
+        self.calls = []
+
+    def fetch_json(self, uri_path, http_method='GET', query_params=None, post_args=None):
+        self.calls.append((http_method, uri_path))
+        return {}
+
+
+class TestApiMetrics(unittest.TestCase):
+    def test_endpoint_name(self):
+        self.assertEqual(endpoint_name('PUT', '/cards/{:024x}'.format(5)), 'PUT /cards/:id')
+        self.assertEqual(endpoint_name('POST', '/cards/{:024x}/idLabels'.format(5)), 'POST /cards/:id/idLabels')
+        self.assertEqual(endpoint_name('GET', '/boards/fakeboard/lists'), 'GET /boards/fakeboard/lists')
+
+    def test_wrap_client(self):
+        metrics = ApiMetrics()
+        client = metrics.wrap_client(FakeClient())
+        client.fetch_json('/boards/fakeboard/lists')
+        with metrics.flowcell('FC1'):
+            client.fetch_json('/cards/{:024x}'.format(1), http_method='PUT')
+            client.fetch_json('/cards/{:024x}'.format(2), 'PUT')
+        summary = metrics.summary()
+        self.assertEqual(summary['total_requests'], 3)
+        self.assertEqual(summary['endpoints']['PUT /cards/:id']['requests'], 2)
+        self.assertEqual(summary['endpoints']['PUT /cards/:id']['histogram']['le_0.05'], 2)
+        self.assertEqual(summary['flowcells'], {'FC1': 2})
+        self.assertEqual(len(client.calls), 3)
+
+    def test_slow_calls(self):
+        metrics = ApiMetrics(slow_call_threshold=1)
+        metrics.record_request('GET /boards/:id', 0.5)
+        metrics.record_request('GET /boards/:id', 3)
+        slow_calls = metrics.summary()['slow_calls']
+        self.assertEqual(len(slow_calls), 1)
+        self.assertEqual(slow_calls[0]['seconds'], 3)
+        self.assertIn('test_slow_calls', slow_calls[0]['stack'])
+
+    def test_write_json_and_reset(self):
+        metrics = ApiMetrics()
+        metrics.record_method('update', 0.2)
+        metrics.record_request('GET /boards/:id', 0.2)
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, 'metrics.json')
+            metrics.write_json(path)
+            with open(path) as f:
+                written = json.load(f)
+        finally:
+            shutil.rmtree(folder)
+        self.assertEqual(written['methods']['update']['calls'], 1)
+        self.assertEqual(written['endpoints']['GET /boards/:id']['histogram']['le_0.25'], 1)
+        metrics.reset()
+        self.assertEqual(metrics.total_requests, 0)
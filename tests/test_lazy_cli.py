@@ -0,0 +1,74 @@
+import unittest
+
+import click
+from click.testing import CliRunner
+
+from cli import LazyGroup, SUBCOMMAND_HELP
+
+
+class FakeEntryPoint(object):
+    def __init__(self, name, command, loaded):
+        self.name = name
+        self.command = command
+        self.loaded = loaded
+
+    def load(self):
+        self.loaded.append(self.name)
+        return self.command
+
+
+@click.command()
+def hello():
+    """ Say hello """
+    click.echo('hello')
+
+
+@click.command()
+def heavy():
+    """ Import everything """
+    click.echo('heavy')
+
+
+class TestLazyGroup(unittest.TestCase):
+    def setUp(self):
+        self.loaded = []
+        entry_points = dict((name, FakeEntryPoint(name, command, self.loaded)) for name, command in (('hello', hello), ('heavy', heavy)))
+        self.group = LazyGroup(name='hugin', entry_points_loader=lambda: entry_points,
+                               command_help={'hello': 'Say hello'}, aliases={'say_hello': 'hello'})
+
+    def test_help_loads_nothing(self):
+        result = CliRunner().invoke(self.group, ['--help'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn('hello', result.output)
+        self.assertIn('heavy', result.output)
+        self.assertIn('Say hello', result.output)
+        self.assertEqual(self.loaded, [])
+
+    def test_only_invoked_command_loaded(self):
+        result = CliRunner().invoke(self.group, ['hello'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.output, 'hello\n')
+        self.assertEqual(self.loaded, ['hello'])
+
+    def test_unknown_command(self):
+        result = CliRunner().invoke(self.group, ['nothing'])
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertEqual(self.loaded, [])
+
+    def test_alias(self):
+        result = CliRunner().invoke(self.group, ['say_hello'])
+        self.assertEqual(result.output, 'hello\n')
+        self.assertEqual(self.loaded, ['hello'])
+
+    def test_declared_help_matches_commands(self):
+        import monitor_flowcells.cli
+        import tests.cli
+        commands = {
+            'monitor_flowcells': monitor_flowcells.cli.monitor_flowcells,
+            'state': monitor_flowcells.cli.state,
+            'prune_board': monitor_flowcells.cli.prune_board,
+            'test': tests.cli.test_flowcells,
+        }
+        self.assertEqual(set(SUBCOMMAND_HELP), set(commands))
+        for name, command in commands.items():
+            self.assertEqual(SUBCOMMAND_HELP[name], command.get_short_help_str(limit=1000))
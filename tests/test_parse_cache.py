@@ -0,0 +1,77 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+from utils.cache.parse_cache import ParseCache
+
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = ParseCache(path=os.path.join(self.tmp_dir, 'cache', 'parse_cache.sqlite'))
+        self.file_path = os.path.join(self.tmp_dir, 'RunInfo.xml')
+        with open(self.file_path, 'w') as f:
+            f.write('content')
+        self.parsed = []
+
+    def parse(self, path):
+        self.parsed.append(path)
+        with open(path) as f:
+            return {'content': f.read()}
+
+    def test_unchanged_file_is_parsed_once(self):
+        first = self.cache.get('run_info', self.file_path, self.parse)
+        second = self.cache.get('run_info', self.file_path, self.parse)
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.parsed), 1)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_hit_is_read_only(self):
+        self.cache.get('run_info', self.file_path, self.parse)
+        changes = self.cache.connection.total_changes
+        self.cache.get('run_info', self.file_path, self.parse)
+        self.assertEqual(self.cache.connection.total_changes, changes)
+        # access times are written at once
+        self.assertEqual(self.cache.flush(), 1)
+        self.assertEqual(self.cache.connection.total_changes, changes + 1)
+        self.assertEqual(self.cache.flush(), 0)
+
+    def test_changed_file_is_parsed_again(self):
+        self.cache.get('run_info', self.file_path, self.parse)
+        with open(self.file_path, 'w') as f:
+            f.write('new content')
+        self.assertEqual(self.cache.get('run_info', self.file_path, self.parse), {'content': 'new content'})
+        self.assertEqual(len(self.parsed), 2)
+
+    def test_disabled(self):
+        self.cache.enabled = False
+        self.cache.get('run_info', self.file_path, self.parse)
+        self.cache.get('run_info', self.file_path, self.parse)
+        self.assertEqual(len(self.parsed), 2)
+
+    def test_evict(self):
+        self.cache.get('run_info', self.file_path, self.parse)
+        self.cache.get('sample_sheet', self.file_path, self.parse)
+        self.cache.max_entries = 1
+        self.assertEqual(self.cache.evict(), 1)
+
+    def test_evict_keeps_recently_used(self):
+        self.cache.get('run_info', self.file_path, self.parse)
+        self.cache.get('sample_sheet', self.file_path, self.parse)
+        self.cache.connection.execute('UPDATE parse_cache SET accessed=0')
+        self.cache.connection.commit()
+        self.cache.get('run_info', self.file_path, self.parse)
+        self.cache.max_entries = 1
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertEqual(self.cache.load('run_info', self.file_path), {'content': 'content'})
+        self.assertIsNone(self.cache.load('sample_sheet', self.file_path))
+
+    def tearDown(self):
+        self.cache.flush()
+        shutil.rmtree(self.tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
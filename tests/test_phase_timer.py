@@ -0,0 +1,53 @@
+import os
+import io
+import json
+import shutil
+import tempfile
+import unittest
+
+from utils.profiling.phase_timer import PhaseTimer
+from utils.profiling.profiler import start_profiler
+
+
+class TestPhaseTimer(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.timer = PhaseTimer()
+        with self.timer.phase('running_discovery') as phase:
+            phase.count = 3
+        with self.timer.phase('archive'):
+            pass
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_summary(self):
+        phases = self.timer.summary()['phases']
+        self.assertEqual(list(phases), ['running_discovery', 'archive'])
+        self.assertEqual(phases['running_discovery']['flowcells'], 3)
+        self.assertIsNone(phases['archive']['flowcells'])
+
+    def test_write_json(self):
+        path = os.path.join(self.folder, 'hugin.json')
+        self.timer.write(path)
+        with open(path) as f:
+            self.assertEqual(json.load(f)['phases']['running_discovery']['flowcells'], 3)
+
+    def test_write_prometheus(self):
+        path = os.path.join(self.folder, 'hugin.prom')
+        self.timer.write(path)
+        with open(path) as f:
+            content = f.read()
+        self.assertIn('# TYPE hugin_phase_wall_seconds gauge', content)
+        self.assertIn('hugin_phase_flowcells{phase="running_discovery"} 3\n', content)
+        self.assertNotIn('hugin_phase_flowcells{phase="archive"}', content)
+        self.assertEqual(os.listdir(self.folder), ['hugin.prom'])
+
+    def test_profiler(self):
+        stats_file = os.path.join(self.folder, 'hugin.prof')
+        stream = io.StringIO() if str is not bytes else io.BytesIO()
+        stop = start_profiler(stats_file, stream=stream)
+        sorted(range(1000), reverse=True)
+        stop()
+        self.assertTrue(os.path.exists(stats_file))
+        self.assertIn('cumulative', stream.getvalue())
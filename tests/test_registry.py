@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from monitor_flowcells.flowcells.registry import InstrumentRegistry, read_runtype
+from monitor_flowcells.flowcells.hiseq import HiseqFlowcell
+from monitor_flowcells.flowcells.hiseqx import HiseqxFlowcell
+from monitor_flowcells.flowcells.miseq import MiseqFlowcell
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_data')
+
+
+class FakeFlowcell(object):
+    def __init__(self, path):
+        self.path = path
+
+
+class TestReadRuntype(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def run_parameters(self, instrument):
+        folder = os.path.join(TEST_DATA, instrument)
+        return os.path.join(folder, os.listdir(folder)[0], 'runParameters.xml')
+
+    def test_flowcell_of_setup(self):
+        self.assertIn('HiSeq X', read_runtype(self.run_parameters('hiseqx')))
+
+    def test_application_name_without_flowcell(self):
+        self.assertIn('MiSeq', read_runtype(self.run_parameters('miseq')))
+
+    def test_hiseq(self):
+        runtype = read_runtype(self.run_parameters('hiseq'))
+        self.assertIn('HiSeq', runtype)
+        self.assertNotIn('HiSeq X', runtype)
+
+    def test_reading_stops_at_the_flowcell(self):
+        # the end of the file is not read: a file still being written is fine
+        path = os.path.join(self.tmp_dir, 'runParameters.xml')
+        with open(path, 'w') as f:
+            f.write('<?xml version="1.0"?>\n<RunParameters><Setup><ApplicationName>HiSeq Control Software'
+                    '</ApplicationName><Flowcell>HiSeq Flow Cell v4</Flowcell><Reads><Read ')
+        self.assertEqual(read_runtype(path), 'HiSeq Flow Cell v4')
+
+
+class TestInstrumentRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = InstrumentRegistry(group=None)
+
+    def test_builtin_instruments(self):
+        self.assertIs(self.registry.flowcell_class('HiSeq X HD v2'), HiseqxFlowcell)
+        self.assertIs(self.registry.flowcell_class('HiSeq Flow Cell v4'), HiseqFlowcell)
+        self.assertIs(self.registry.flowcell_class('TruSeq SBS Kit'), HiseqFlowcell)
+        self.assertIs(self.registry.flowcell_class('MiSeq Control Software'), MiseqFlowcell)
+
+    def test_unknown_instrument(self):
+        self.assertIsNone(self.registry.flowcell_class('NovaSeq S4'))
+
+    def test_registered_instrument(self):
+        self.registry.register('NovaSeq', FakeFlowcell)
+        self.assertIs(self.registry.flowcell_class('NovaSeq S4'), FakeFlowcell)
+
+    def test_longest_name_wins(self):
+        self.registry.register('HiSeq X HD', FakeFlowcell)
+        self.assertIs(self.registry.flowcell_class('HiSeq X HD v2'), FakeFlowcell)
+        self.assertIs(self.registry.flowcell_class('HiSeq X v2.5'), HiseqxFlowcell)
+
+    def test_class_path(self):
+        registry = InstrumentRegistry({'Fake': 'tests.test_registry:FakeFlowcell'}, group=None)
+        self.assertIs(registry.flowcell_class('Fake sequencer'), FakeFlowcell)
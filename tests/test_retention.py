@@ -0,0 +1,91 @@
+import datetime
+import unittest
+
+from monitor_flowcells import flowcell_monitor
+from monitor_flowcells.flowcells.base_flowcell import FC_STATUSES
+from monitor_flowcells.trello_utils import trello_board
+from monitor_flowcells.trello_utils.retention import RetentionPolicy, prune_board
+from monitor_flowcells.trello_utils.trello_board import TrelloBoard
+from tests.fake_trello import FakeTrello
+from tests.test_coordination import FakeSocket
+
+NOW = datetime.datetime(2016, 6, 1, 12, 0)
+
+
+class TestRetention(unittest.TestCase):
+    def setUp(self):
+        self.trello = FakeTrello(list_names=[FC_STATUSES['ARCHIVED'], FC_STATUSES['SEQUENCING']])
+        self.list_ids = dict((trello_list['name'], list_id) for list_id, trello_list in self.trello.lists.items())
+        self.labels = dict((host, self.trello._create('labels', {'name': host, 'color': 'green', 'idBoard': 'fakeboard'})['id'])
+                           for host in ('host-a', 'host-b'))
+        self.addCleanup(setattr, trello_board, 'socket', trello_board.socket)
+        trello_board.socket = FakeSocket('host-a')
+
+    def card(self, name, days, list_name=FC_STATUSES['ARCHIVED'], host='host-a'):
+        activity = (NOW - datetime.timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        return self.trello._create('cards', {'name': name, 'desc': '', 'idList': self.list_ids[list_name],
+                                             'idLabels': [self.labels[host]], 'due': None, 'closed': False,
+                                             'idBoard': 'fakeboard', 'dateLastActivity': activity})['id']
+
+    def board(self):
+        return TrelloBoard({'trello': {'board_id': 'fakeboard', 'concurrency': 2}}, client=self.trello)
+
+    def closed(self):
+        return sorted(card['name'] for card in self.trello.cards.values() if card['closed'])
+
+    def test_max_age(self):
+        self.card('old', 100)
+        self.card('recent', 10)
+        self.card('running', 100, list_name=FC_STATUSES['SEQUENCING'])
+        pruned = prune_board(self.board(), RetentionPolicy(max_age_days=30), now=NOW)
+        self.assertEqual([(pruned_card.card.name, pruned_card.reason) for pruned_card in pruned], [('old', 'no activity for 100 days')])
+        self.assertEqual(self.closed(), ['old'])
+
+    def test_max_cards_keeps_most_recent(self):
+        for days in (5, 1, 3, 2, 4):
+            self.card('fc{}'.format(days), days)
+        prune_board(self.board(), RetentionPolicy(max_cards=2), now=NOW)
+        self.assertEqual(self.closed(), ['fc3', 'fc4', 'fc5'])
+
+    def test_dry_run(self):
+        self.card('old', 100)
+        pruned = prune_board(self.board(), RetentionPolicy(max_age_days=30), dry_run=True, now=NOW)
+        self.assertEqual([pruned_card.card.name for pruned_card in pruned], ['old'])
+        self.assertEqual(self.closed(), [])
+
+    def test_batches(self):
+        for index in range(5):
+            self.card('fc{}'.format(index), 100)
+        board = self.board()
+        board.snapshot.cards
+        prune_board(board, RetentionPolicy(max_age_days=30, batch_size=2), now=NOW)
+        self.assertEqual(len(self.closed()), 5)
+        self.assertEqual(board.snapshot.cards, [])
+        self.assertIsNone(board.get_card_by_name('fc0'))
+
+    def test_cards_of_other_hosts_are_kept(self):
+        self.card('own', 100)
+        self.card('other', 100, host='host-b')
+        prune_board(self.board(), RetentionPolicy(max_age_days=30), now=NOW)
+        self.assertEqual(self.closed(), ['own'])
+
+    def test_active_lists_cannot_be_pruned(self):
+        self.assertRaises(RuntimeError, RetentionPolicy, lists=[FC_STATUSES['SEQUENCING']])
+
+    def test_from_config(self):
+        policy = RetentionPolicy.from_config({'retention': {'max_cards': 10, 'enabled': True}})
+        self.assertEqual((policy.lists, policy.max_age_days, policy.max_cards, policy.enabled),
+                         ([FC_STATUSES['ARCHIVED']], None, 10, True))
+
+
+class TestRetentionSchedule(unittest.TestCase):
+    def setUp(self):
+        self.pruned = []
+        self.addCleanup(setattr, flowcell_monitor, 'prune_board', flowcell_monitor.prune_board)
+        flowcell_monitor.prune_board = lambda board, policy: self.pruned.append(board) or []
+
+    def test_daemon_event_does_not_prune(self):
+        monitor = flowcell_monitor.FlowcellMonitor({'retention': {'enabled': True, 'max_age_days': 30}})
+        monitor._trello_board = object()
+        monitor.sync_flowcells([])
+        self.assertEqual(self.pruned, [])
@@ -0,0 +1,86 @@
+import os
+import glob
+import shutil
+import tempfile
+import unittest
+
+from monitor_flowcells.flowcells.run_files import read_run_info, read_run_parameters
+
+try:
+    from flowcell_parser.classes import RunInfoParser, RunParametersParser
+except ImportError:
+    RunInfoParser = RunParametersParser = None
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_data')
+
+
+def data_file(instrument, file_name):
+    return glob.glob(os.path.join(TEST_DATA, instrument, '*', file_name))[0]
+
+
+class TestReadRunInfo(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_hiseqx(self):
+        run_info = read_run_info(data_file('hiseqx', 'RunInfo.xml'))
+        self.assertEqual(run_info['Flowcell'], 'H2WY7CCXX')
+        self.assertEqual(run_info['Instrument'], 'ST-E00214')
+        self.assertEqual(run_info['Date'], '150424')
+        self.assertEqual(run_info['Reads'], [
+            {'Number': '1', 'NumCycles': '151', 'IsIndexedRead': 'N'},
+            {'Number': '2', 'NumCycles': '8', 'IsIndexedRead': 'Y'},
+            {'Number': '3', 'NumCycles': '151', 'IsIndexedRead': 'N'},
+        ])
+        self.assertEqual(run_info['FlowcellLayout'], {'LaneCount': '8', 'SurfaceCount': '2', 'SwathCount': '2', 'TileCount': '24'})
+
+    def test_reading_stops_at_the_flowcell_layout(self):
+        # the list of tiles is not read: a truncated file is fine
+        path = os.path.join(self.tmp_dir, 'RunInfo.xml')
+        with open(data_file('hiseqx', 'RunInfo.xml')) as f:
+            content = f.read()
+        with open(path, 'w') as f:
+            f.write(content[:content.index('<Tile>1_1110')])
+        self.assertEqual(read_run_info(path)['FlowcellLayout']['LaneCount'], '8')
+
+    @unittest.skipIf(RunInfoParser is None, 'flowcell_parser is not installed')
+    def test_same_values_as_run_info_parser(self):
+        for path in glob.glob(os.path.join(TEST_DATA, '*', '*', 'RunInfo.xml')):
+            full = RunInfoParser(path).data
+            run_info = read_run_info(path)
+            for key in ('Flowcell', 'Instrument', 'Date', 'Reads', 'FlowcellLayout'):
+                self.assertEqual(run_info[key], full[key])
+
+
+class TestReadRunParameters(unittest.TestCase):
+
+    def test_hiseq(self):
+        setup = read_run_parameters(data_file('hiseq', 'runParameters.xml'))['RunParameters']['Setup']
+        self.assertEqual(setup, {
+            'Flowcell': 'HiSeq Flow Cell v4',
+            'ApplicationName': 'HiSeq Control Software',
+            'RunMode': 'RapidHighOutput',
+            'ChemistryVersion': 'Illumina,Bruno Fluidics Controller,0,v2.0340',
+        })
+
+    def test_missing_field(self):
+        setup = read_run_parameters(data_file('hiseqx', 'runParameters.xml'))['RunParameters']['Setup']
+        self.assertEqual(setup['Flowcell'], 'HiSeq X HD v2')
+        self.assertNotIn('RunMode', setup)
+
+    def test_setup_after_other_elements(self):
+        setup = read_run_parameters(data_file('miseq', 'runParameters.xml'))['RunParameters']['Setup']
+        self.assertEqual(setup, {'ApplicationName': 'MiSeq Control Software'})
+
+    @unittest.skipIf(RunParametersParser is None, 'flowcell_parser is not installed')
+    def test_same_values_as_run_parameters_parser(self):
+        for path in glob.glob(os.path.join(TEST_DATA, '*', '*', 'runParameters.xml')):
+            full = RunParametersParser(path).data['RunParameters']['Setup']
+            setup = read_run_parameters(path)['RunParameters']['Setup']
+            for key, value in setup.items():
+                self.assertEqual(value, full[key])
+            self.assertEqual(set(setup), set(full) & set(('Flowcell', 'ApplicationName', 'RunMode', 'ChemistryVersion')))
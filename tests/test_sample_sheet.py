@@ -0,0 +1,41 @@
+import os
+import csv
+import shutil
+import tempfile
+import unittest
+
+from monitor_flowcells.flowcells.sample_sheet import summarize_sample_sheet
+
+HISEQ_SAMPLE_SHEET = 'tests/test_data/hiseq/151204_D00483_0115_BC81N5ANXX/SampleSheet.csv'
+HISEQX_SAMPLE_SHEET = 'tests/test_data/hiseqx/150424_ST-E00214_0031_BH2WY7CCXX/SampleSheet.csv'
+
+
+class TestSampleSheetSummary(unittest.TestCase):
+    def test_hiseq(self):
+        summary = summarize_sample_sheet(HISEQ_SAMPLE_SHEET)
+        with open(HISEQ_SAMPLE_SHEET) as f:
+            rows = list(csv.DictReader(f))
+        projects = []
+        for row in rows:
+            if row['SampleProject'] not in projects:
+                projects.append(row['SampleProject'])
+        self.assertEqual(list(summary.projects), projects)
+        self.assertEqual(summary.samples, len(rows))
+        self.assertEqual(summary.lanes, tuple(sorted(set(row['Lane'] for row in rows), key=int)))
+
+    def test_sections(self):
+        summary = summarize_sample_sheet(HISEQX_SAMPLE_SHEET)
+        self.assertEqual(summary.projects, ('J_Lundeberg_14_24',))
+        self.assertEqual(summary.samples, 8)
+        self.assertEqual(summary.lanes, ('1', '2', '3', '4', '5', '6', '7', '8'))
+
+    def test_no_data(self):
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, 'SampleSheet.csv')
+            with open(path, 'w') as f:
+                f.write('[Header]\nInvestigator Name,Someone\n')
+            summary = summarize_sample_sheet(path)
+        finally:
+            shutil.rmtree(folder)
+        self.assertEqual((summary.projects, summary.samples, summary.lanes), ((), 0, ()))
@@ -0,0 +1,78 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from monitor_flowcells.flowcells.base_flowcell import FC_STATUSES
+from monitor_flowcells.scheduler import PollScheduler
+from monitor_flowcells.watcher import PollingWatcher
+
+HOUR = 3600
+
+
+def make_state(path='/data/FC', status=FC_STATUSES['SEQUENCING'], due_date=None, updated=0, check_status=None):
+    return {'path': path, 'status': status, 'due_date': due_date, 'updated': updated, 'check_status': check_status}
+
+
+class TestPollScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = PollScheduler(min_interval=60, max_interval=6 * HOUR, nosync_interval=24 * HOUR, fraction=0.25, enabled=True)
+
+    def test_interval(self):
+        # HighOutput run, 200 hours left: polled rarely
+        self.assertEqual(self.scheduler.interval(make_state(due_date=200 * HOUR)), 6 * HOUR)
+        # 2 hours left: 30 minutes
+        self.assertEqual(self.scheduler.interval(make_state(due_date=2 * HOUR)), HOUR / 2)
+        # close to the transition: polled often
+        self.assertEqual(self.scheduler.interval(make_state(due_date=100)), 60)
+        self.assertEqual(self.scheduler.interval(make_state(status=FC_STATUSES['NOSYNC'], due_date=HOUR)), 24 * HOUR)
+
+    def test_overdue(self):
+        self.assertEqual(self.scheduler.interval(make_state(due_date=-HOUR)), 60)
+        # the card already shows that the flowcell is late, wait for a marker
+        self.assertEqual(self.scheduler.interval(make_state(due_date=-HOUR, check_status='Sequencing is late')), 6 * HOUR)
+
+    def test_due(self):
+        self.scheduler.refresh([make_state('/data/FC1', due_date=200 * HOUR), make_state('/data/FC2', due_date=HOUR)])
+        self.assertEqual(self.scheduler.next_poll(), HOUR / 4)
+        self.assertEqual(self.scheduler.due(now=HOUR / 4), {'/data/FC2'})
+        # not recorded after the poll: not polled again before min_interval
+        self.scheduler.refresh([make_state('/data/FC1', due_date=200 * HOUR), make_state('/data/FC2', due_date=HOUR)])
+        self.assertEqual(self.scheduler.due(now=HOUR / 4 + 30), set())
+        self.assertTrue(self.scheduler.is_due('/data/unknown'))
+
+    def test_fewer_polls(self):
+        # a flowcell updated at each poll, 125 cycles of 100 minutes: the transition is seen within min_interval
+        due_date = 125 * 100 * 60
+        now, polls = 0, 0
+        while now < due_date:
+            now += self.scheduler.interval(make_state(due_date=due_date, updated=now))
+            polls += 1
+        self.assertLess(now - due_date, 60)
+        self.assertLess(polls, due_date / 60 / 20)
+
+
+class TestPollingWatcherScheduler(unittest.TestCase):
+    def setUp(self):
+        self.data_folder = tempfile.mkdtemp()
+        self.flowcell = os.path.join(self.data_folder, '150424_ST-E00214_0031_BH2WY7CCXX')
+        os.mkdir(self.flowcell)
+        self.scheduler = PollScheduler(enabled=True)
+        self.watcher = PollingWatcher([self.data_folder], poll_interval=0, scheduler=self.scheduler)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_folder)
+
+    def test_markers_checked_when_due(self):
+        self.scheduler.refresh([make_state(self.flowcell, due_date=time.time() + 200 * HOUR, updated=time.time())])
+        open(os.path.join(self.flowcell, 'RTAComplete.txt'), 'w').close()
+        self.assertEqual(self.watcher.wait(0), set())
+        self.scheduler.refresh([])
+        self.assertEqual(self.watcher.wait(0), {self.flowcell})
+
+    def test_new_flowcell(self):
+        self.scheduler.refresh([make_state(self.flowcell, due_date=time.time() + 200 * HOUR, updated=time.time())])
+        new_flowcell = os.path.join(self.data_folder, '151204_D00483_0115_BC81N5ANXX')
+        os.mkdir(new_flowcell)
+        self.assertEqual(self.watcher.wait(0), {new_flowcell})
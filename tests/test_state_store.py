@@ -0,0 +1,135 @@
+import os
+import time
+import shutil
+import sqlite3
+import datetime
+import tempfile
+import unittest
+
+from monitor_flowcells.state_store import FlowcellStateStore
+from monitor_flowcells.flowcells.state_probe import FlowcellProbe
+
+
+class FakeCard(object):
+    def __init__(self, card_id, name, list_id):
+        self.id = card_id
+        self.name = name
+        self.list_id = list_id
+
+
+class FakeSnapshot(object):
+    def __init__(self, cards):
+        self.cards = cards
+
+    def get_card_by_id(self, card_id):
+        return dict((card.id, card) for card in self.cards).get(card_id)
+
+    def get_card_by_name(self, name):
+        return dict((card.name, card) for card in self.cards).get(name)
+
+
+class FakeFlowcell(object):
+    def __init__(self, path, status='Sequencing', due_date=None, check_status=None, transfer_candidate=False):
+        self.path = path
+        self.transfer_candidate = transfer_candidate
+        self.name = os.path.basename(path)
+        self.status = status
+        self.due_date = due_date
+        self.check_status = check_status
+        self.description = 'description'
+        self.probe = FlowcellProbe(path)
+
+
+class FakeScheduler(object):
+    def __init__(self, due):
+        self.due = due
+
+    def is_due(self, path, now=None):
+        return self.due
+
+
+class TestFlowcellStateStore(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, '150424_ST-E00214_0031_BH2WY7CCXX')
+        os.makedirs(os.path.join(self.path, 'Logs'))
+        open(os.path.join(self.path, 'runParameters.xml'), 'w').close()
+        self.store = FlowcellStateStore(path=os.path.join(self.folder, 'state.sqlite'))
+        self.snapshot = FakeSnapshot([FakeCard('c1', os.path.basename(self.path), 'l1')])
+        self.tomorrow = datetime.datetime.now() + datetime.timedelta(days=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def process(self, scheduler=None, **kwargs):
+        selected = list(self.store.select([self.path], self.snapshot, scheduler=scheduler))
+        self.store.record([FakeFlowcell(path, **kwargs) for path in selected], self.snapshot)
+        return selected
+
+    def test_unchanged_flowcell_is_skipped(self):
+        self.assertEqual(self.process(due_date=self.tomorrow), [self.path])
+        self.assertEqual(self.process(due_date=self.tomorrow), [])
+        self.assertEqual(self.store.get(self.path)['card_id'], 'c1')
+
+    def test_changed_files(self):
+        self.process(due_date=self.tomorrow)
+        open(os.path.join(self.path, 'RTAComplete.txt'), 'w').close()
+        self.assertEqual(self.process(due_date=self.tomorrow), [self.path])
+
+    def test_due_date_passed(self):
+        self.process(due_date=datetime.datetime.now() - datetime.timedelta(minutes=1))
+        self.assertEqual(self.process(), [self.path])
+
+    def test_card_moved(self):
+        self.process(due_date=self.tomorrow)
+        self.snapshot.cards[0].list_id = 'l2'
+        self.assertEqual(self.process(due_date=self.tomorrow), [self.path])
+
+    def test_max_age(self):
+        self.process(due_date=self.tomorrow)
+        state = self.store.get(self.path)
+        self.assertIsNone(self.store.needs_update(state, state['fingerprint'], self.snapshot))
+        self.assertIsNotNone(self.store.needs_update(state, state['fingerprint'], self.snapshot, now=time.time() + 25 * 3600))
+
+    def test_transfer_candidate_is_always_processed(self):
+        # the transfer starts on the remote server: no local file changes
+        self.process(status='Demultiplexing', due_date=self.tomorrow, transfer_candidate=True)
+        self.assertEqual(self.process(status='Demultiplexing', due_date=self.tomorrow, transfer_candidate=True), [self.path])
+        self.assertEqual(self.process(status='Transferring', due_date=self.tomorrow, transfer_candidate=True), [self.path])
+
+    def test_database_without_transfer_candidate(self):
+        connection = sqlite3.connect(self.store.path)
+        connection.execute('CREATE TABLE flowcell_state (path TEXT PRIMARY KEY, name TEXT NOT NULL, fingerprint TEXT NOT NULL, '
+                           'status TEXT, due_date REAL, check_status TEXT, description_hash TEXT, card_id TEXT, '
+                           'list_id TEXT, updated REAL NOT NULL)')
+        connection.close()
+        self.process(due_date=self.tomorrow)
+        self.assertEqual(self.process(due_date=self.tomorrow), [])
+
+    def test_files_of_flowcells_not_due_are_not_checked(self):
+        self.process(due_date=self.tomorrow)
+        open(os.path.join(self.path, 'RTAComplete.txt'), 'w').close()
+        self.assertEqual(self.process(scheduler=FakeScheduler(False), due_date=self.tomorrow), [])
+        self.assertEqual(self.process(scheduler=FakeScheduler(True), due_date=self.tomorrow), [self.path])
+
+    def test_flowcells_not_due_changed_elsewhere(self):
+        # the state of these flowcells changes without their files changing
+        self.process(status='Demultiplexing', due_date=self.tomorrow, transfer_candidate=True)
+        self.assertEqual(self.process(scheduler=FakeScheduler(False), due_date=self.tomorrow), [self.path])
+        self.store.reset()
+        self.process(due_date=datetime.datetime.now() - datetime.timedelta(minutes=1))
+        self.assertEqual(self.process(scheduler=FakeScheduler(False), due_date=self.tomorrow), [self.path])
+
+    def test_reset_and_prune(self):
+        self.process(due_date=self.tomorrow)
+        self.assertEqual(len(self.store.entries([os.path.basename(self.path)])), 1)
+        self.assertEqual(self.store.reset([os.path.basename(self.path)]), 1)
+        self.process(due_date=self.tomorrow)
+        shutil.rmtree(self.path)
+        self.assertEqual(self.store.prune(), 1)
+        self.assertEqual(self.store.entries(), [])
+
+    def test_disabled(self):
+        self.store.enabled = False
+        self.process(due_date=self.tomorrow)
+        self.assertEqual(self.process(due_date=self.tomorrow), [self.path])
@@ -0,0 +1,58 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+from monitor_flowcells.flowcells.transfer_status import TransferStatus
+
+FAKE_SSH = '{} {}'.format(sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_ssh.py'))
+
+
+class TestTransferStatus(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.destination = os.path.join(self.folder, 'destination')
+        os.makedirs(os.path.join(self.destination, 'FC_TRANSFERRING'))
+        os.makedirs(os.path.join(self.destination, 'FC_DONE'))
+        destinations = {'hiseqx': {'url': 'localhost', 'username': 'hugin', 'path': self.destination}}
+        self.status = TransferStatus(destinations=destinations, ssh_command=FAKE_SSH, remote_python=sys.executable,
+                                     control_dir=os.path.join(self.folder, 'ssh'))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_one_remote_call(self):
+        self.status.prefetch('hiseqx', ['FC_TRANSFERRING', 'FC_DONE', 'FC_WAITING'])
+        self.assertEqual(self.status.remote_calls, 1)
+        self.assertIsNotNone(self.status.transfer_started('hiseqx', 'FC_TRANSFERRING'))
+        self.assertIsNotNone(self.status.transfer_started('hiseqx', 'FC_DONE'))
+        self.assertIsNone(self.status.transfer_started('hiseqx', 'FC_WAITING'))
+        self.assertEqual(self.status.remote_calls, 1)
+
+    def test_ttl(self):
+        self.status.transfer_started('hiseqx', 'FC_WAITING')
+        os.makedirs(os.path.join(self.destination, 'FC_WAITING'))
+        # the cached result is reused until it expires
+        self.assertIsNone(self.status.transfer_started('hiseqx', 'FC_WAITING'))
+        self.status.ttl = 0
+        self.assertIsNotNone(self.status.transfer_started('hiseqx', 'FC_WAITING'))
+        self.assertEqual(self.status.remote_calls, 2)
+
+    def test_not_configured(self):
+        self.assertIsNone(self.status.transfer_started('miseq', 'FC_DONE'))
+        self.assertEqual(self.status.remote_calls, 0)
+
+    def test_malformed_destination(self):
+        self.status.destinations['hiseq'] = {'url': 'localhost'}
+        self.assertIsNone(self.status.transfer_started('hiseq', 'FC_DONE'))
+        self.assertIsNone(self.status.destination(None))
+        self.assertEqual(self.status.remote_calls, 0)
+        self.assertEqual(self.status._warned, set(['hiseq']))
+
+    def test_connection_failure(self):
+        self.status.ssh_command = '{} -c "import sys; sys.exit(255)"'.format(sys.executable)
+        self.status.prefetch('hiseqx', ['FC_DONE', 'FC_WAITING'])
+        # the failure is cached, the flowcells don't retry the connection one by one
+        self.assertIsNone(self.status.transfer_started('hiseqx', 'FC_DONE'))
+        self.assertEqual(self.status.remote_calls, 1)
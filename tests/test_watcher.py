@@ -0,0 +1,117 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+from monitor_flowcells import flowcell_monitor
+from monitor_flowcells.flowcell_monitor import FlowcellMonitor
+from monitor_flowcells.watcher import PollingWatcher
+
+
+class TestPollingWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.data_folder = tempfile.mkdtemp()
+        self.flowcell = os.path.join(self.data_folder, '150424_ST-E00214_0031_BH2WY7CCXX')
+        os.mkdir(self.flowcell)
+        self.watcher = PollingWatcher([self.data_folder], poll_interval=0)
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher.wait(0), set())
+
+    def test_marker_created(self):
+        open(os.path.join(self.flowcell, 'RTAComplete.txt'), 'w').close()
+        self.assertEqual(self.watcher.wait(0), {self.flowcell})
+        self.assertEqual(self.watcher.wait(0), set())
+
+    def test_moved_to_nosync(self):
+        nosync_flowcell = os.path.join(self.data_folder, 'nosync', os.path.basename(self.flowcell))
+        os.mkdir(os.path.join(self.data_folder, 'nosync'))
+        os.rename(self.flowcell, nosync_flowcell)
+        self.assertEqual(self.watcher.wait(0), {self.flowcell, nosync_flowcell})
+
+    def test_flowcell_of(self):
+        marker = os.path.join(self.flowcell, 'Demultiplexing', 'Stats')
+        self.assertEqual(self.watcher.flowcell_of(marker), (self.flowcell, os.path.join('Demultiplexing', 'Stats')))
+        self.assertEqual(self.watcher.flowcell_of('/somewhere/else'), (None, None))
+
+    def tearDown(self):
+        shutil.rmtree(self.data_folder)
+
+
+class StopDaemon(BaseException):
+    pass
+
+
+class FakeWatcher(object):
+    def __init__(self, events):
+        self.events = list(events)
+
+    def wait(self, timeout):
+        if not self.events:
+            raise StopDaemon()
+        return self.events.pop(0)
+
+
+class FakeSnapshot(object):
+    def refresh(self):
+        pass
+
+
+class FakeBoard(object):
+    snapshot = FakeSnapshot()
+
+
+class FlakyMonitor(FlowcellMonitor):
+    """ The first full update and the first flowcell update fail, like a trello timeout """
+    def __init__(self):
+        FlowcellMonitor.__init__(self, {'state_store': {'enabled': False}})
+        self._trello_board = FakeBoard()
+        self.full_updates = 0
+        self.synced = []
+
+    def update_trello_board(self, scheduler=None):
+        self.full_updates += 1
+        if self.full_updates == 1:
+            raise IOError('trello cannot be reached')
+
+    def sync_flowcells(self, flowcell_paths):
+        self.synced.append(set(flowcell_paths))
+        if len(self.synced) == 1:
+            raise IOError('trello cannot be reached')
+        return set()
+
+
+class TestDaemonFailures(unittest.TestCase):
+
+    def setUp(self):
+        self.sleeps = []
+        self.addCleanup(setattr, flowcell_monitor.time, 'sleep', flowcell_monitor.time.sleep)
+        flowcell_monitor.time.sleep = self.sleeps.append
+
+    def test_failed_iterations_are_retried(self):
+        monitor = FlakyMonitor()
+        watcher = FakeWatcher([{'/data/FC1'}, {'/data/FC2'}])
+        self.assertRaises(StopDaemon, monitor.run_daemon, watcher, retry_interval=10)
+        self.assertEqual(monitor.full_updates, 2)
+        # the flowcells of the failed update are kept pending
+        self.assertEqual(monitor.synced, [{'/data/FC1'}, {'/data/FC1', '/data/FC2'}])
+        # two iterations failed in a row
+        self.assertEqual(self.sleeps, [10, 20])
+
+    def test_backoff(self):
+        monitor = FlakyMonitor()
+        monitor.update_trello_board = lambda scheduler=None: 1 / 0
+        watcher = FakeWatcher([])
+
+        def sleep(seconds):
+            self.sleeps.append(seconds)
+            if len(self.sleeps) == 7:
+                raise StopDaemon()
+        flowcell_monitor.time.sleep = sleep
+        self.assertRaises(StopDaemon, monitor.run_daemon, watcher, retry_interval=100)
+        self.assertEqual(self.sleeps, [100, 200, 400, 800, 900, 900, 900])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+""" Persistent cache of parsed flowcell files
+"""
+import os
+import time
+import logging
+import sqlite3
+import threading
+import multiprocessing.util
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.hugin', 'parse_cache.sqlite')
+DEFAULT_MAX_ENTRIES = 20000
+DEFAULT_MAX_AGE_DAYS = 90
+# access times of the hits are written in one transaction once this number of them is pending
+ACCESS_FLUSH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS parse_cache (
+    namespace TEXT NOT NULL,
+    path TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    value BLOB NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (namespace, path)
+)
+"""
+
+
+class ParseCache(object):
+    """ Stores parsed files in a SQLite database, keyed by path, mtime and size of the file.
+    A file which has not changed since it was parsed is served from the cache.
+
+    :param str path: Path to the database file
+    :param int max_entries: Least recently used entries above this number are evicted
+    :param int max_age_days: Entries not used for this number of days are evicted
+    :param bool enabled: If False, every file is parsed
+    """
+    def __init__(self, path=DEFAULT_PATH, max_entries=DEFAULT_MAX_ENTRIES, max_age_days=DEFAULT_MAX_AGE_DAYS, enabled=True):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        # sqlite connections cannot be shared between threads and processes
+        self._local = threading.local()
+        # (namespace, path) -> access time of the hits not written yet: a hit doesn't write to the database
+        self._accessed = {}
+        self._accessed_lock = threading.Lock()
+        self._finalizer_pid = None
+
+    def configure(self, config):
+        """ Apply the 'parse_cache' section of the config file
+
+        :param dict config: The parsed config file
+        """
+        cache_config = config.get('parse_cache', {}) or {}
+        self.path = os.path.expanduser(cache_config.get('path', self.path))
+        self.max_entries = cache_config.get('max_entries', self.max_entries)
+        self.max_age_days = cache_config.get('max_age_days', self.max_age_days)
+        self.enabled = cache_config.get('enabled', self.enabled)
+        self._local = threading.local()
+        # configured before the first read: there are no pending access times of another database
+        self._accessed = {}
+
+    @property
+    def connection(self):
+        if getattr(self._local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute(SCHEMA)
+            connection.commit()
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+            if self._finalizer_pid != os.getpid():
+                # also run when a worker of a discovery process pool exits
+                multiprocessing.util.Finalize(None, self.flush, exitpriority=10)
+                self._finalizer_pid = os.getpid()
+        return self._local.connection
+
+    def get(self, namespace, path, parse):
+        """ Return the parsed content of the file.
+
+        :param str namespace: Kind of the parsed data, e.g. 'run_info'
+        :param str path: Path to the file
+        :param parse: Function which takes the path and returns the parsed data
+        """
+        if not self.enabled:
+            return parse(path)
+
+        stat = os.stat(path)
+        path = os.path.abspath(path)
+        try:
+            row = self.connection.execute(
+                'SELECT mtime, size, value FROM parse_cache WHERE namespace=? AND path=?', (namespace, path)).fetchone()
+            if row is not None and row[0] == stat.st_mtime and row[1] == stat.st_size:
+                value = pickle.loads(bytes(row[2]))
+                self.hits += 1
+                self._record_access(namespace, path)
+                return value
+        except (sqlite3.Error, OSError, pickle.UnpicklingError) as e:
+            logging.warning("Parse cache {} cannot be read: {}".format(self.path, e))
+
+        self.misses += 1
+        value = parse(path)
+        self.set(namespace, path, stat, value)
+        return value
+
+    def set(self, namespace, path, stat, value):
+        try:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO parse_cache (namespace, path, mtime, size, value, accessed) VALUES (?, ?, ?, ?, ?, ?)',
+                (namespace, path, stat.st_mtime, stat.st_size,
+                 sqlite3.Binary(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)), time.time()))
+            self.connection.commit()
+        except (sqlite3.Error, OSError, pickle.PicklingError) as e:
+            logging.warning("Parse cache {} cannot be written: {}".format(self.path, e))
+
+    def load(self, namespace, path):
+        """ Return the stored value whatever the state of the file is, or None """
+        if not self.enabled:
+            return None
+        try:
+            row = self.connection.execute(
+                'SELECT value FROM parse_cache WHERE namespace=? AND path=?', (namespace, os.path.abspath(path))).fetchone()
+            if row is not None:
+                self.hits += 1
+                return pickle.loads(bytes(row[0]))
+        except (sqlite3.Error, OSError, pickle.UnpicklingError) as e:
+            logging.warning("Parse cache {} cannot be read: {}".format(self.path, e))
+        return None
+
+    def store(self, namespace, path, value):
+        """ Store a value computed from the current state of the file """
+        if self.enabled:
+            self.set(namespace, os.path.abspath(path), os.stat(path), value)
+
+    def _record_access(self, namespace, path):
+        with self._accessed_lock:
+            self._accessed[(namespace, path)] = time.time()
+            pending = len(self._accessed)
+        if pending >= ACCESS_FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """ Write the access times of the hits, in one transaction """
+        with self._accessed_lock:
+            accessed, self._accessed = self._accessed, {}
+        if not accessed or not self.enabled:
+            return 0
+        try:
+            self.connection.executemany('UPDATE parse_cache SET accessed=? WHERE namespace=? AND path=?',
+                                        [(timestamp, namespace, path) for (namespace, path), timestamp in accessed.items()])
+            self.connection.commit()
+        except (sqlite3.Error, OSError) as e:
+            logging.warning("Parse cache {} cannot be written: {}".format(self.path, e))
+            return 0
+        return len(accessed)
+
+    def evict(self):
+        """ Remove entries which are too old, then the least recently used ones above max_entries """
+        if not self.enabled:
+            return 0
+        self.flush()
+        try:
+            connection = self.connection
+            removed = connection.execute(
+                'DELETE FROM parse_cache WHERE accessed < ?', (time.time() - self.max_age_days * 24 * 3600,)).rowcount
+            removed += connection.execute(
+                'DELETE FROM parse_cache WHERE rowid NOT IN (SELECT rowid FROM parse_cache ORDER BY accessed DESC LIMIT ?)',
+                (self.max_entries,)).rowcount
+            connection.commit()
+        except (sqlite3.Error, OSError) as e:
+            logging.warning("Parse cache {} cannot be cleaned up: {}".format(self.path, e))
+            return 0
+        logging.debug("Parse cache: {} hits, {} misses, {} entries evicted".format(self.hits, self.misses, removed))
+        return removed
+
+    def clear(self):
+        self.connection.execute('DELETE FROM parse_cache')
+        self.connection.commit()
+
+
+# shared by all flowcells, configured by the CLI
+PARSE_CACHE = ParseCache()
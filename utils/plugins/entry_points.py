@@ -0,0 +1,21 @@
+""" Entry points of the hugin plugins, found without importing them
+"""
+try:
+    from importlib.metadata import entry_points
+except ImportError:
+    # python < 3.8
+    from importlib_metadata import entry_points
+
+
+def entry_points_by_name(group):
+    """ Return the entry points of the group by name. Nothing is imported until an entry point is loaded
+
+    :param str group: Name of the entry point group, e.g. 'hugin.subcommands'
+    """
+    all_entry_points = entry_points()
+    if hasattr(all_entry_points, 'select'):
+        selected = all_entry_points.select(group=group)
+    else:
+        # python < 3.10: dict of group -> entry points
+        selected = all_entry_points.get(group, [])
+    return dict((entry_point.name, entry_point) for entry_point in selected)
@@ -0,0 +1,111 @@
+""" Wall and CPU time of the phases of a hugin run
+"""
+import os
+import json
+import time
+import logging
+import contextlib
+import collections
+
+
+def cpu_time():
+    """ User and system time of the process, including the finished child processes (e.g. a discovery process pool) """
+    times = os.times()
+    return times[0] + times[1] + times[2] + times[3]
+
+
+class Phase(object):
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        # number of flowcells processed in the phase
+        self.count = None
+
+
+class PhaseTimer(object):
+    """ Records the phases of one run, in order.
+
+    :param str prefix: Prefix of the Prometheus metric names
+    """
+    def __init__(self, prefix='hugin'):
+        self.prefix = prefix
+        self.reset()
+
+    def reset(self):
+        self.phases = collections.OrderedDict()
+        self.start_time = time.time()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """ Time the block; the yielded Phase can be given the number of processed flowcells """
+        phase = self.phases.setdefault(name, Phase(name))
+        start, cpu_start = time.time(), cpu_time()
+        try:
+            yield phase
+        finally:
+            phase.wall_time += time.time() - start
+            phase.cpu_time += cpu_time() - cpu_start
+            logging.info("Phase {}: {:.3f}s wall, {:.3f}s cpu{}".format(
+                name, phase.wall_time, phase.cpu_time, ', {} flowcells'.format(phase.count) if phase.count is not None else ''))
+
+    def summary(self):
+        return {
+            'timestamp': round(time.time(), 3),
+            'duration': round(time.time() - self.start_time, 3),
+            'phases': collections.OrderedDict((phase.name, {
+                'wall_seconds': round(phase.wall_time, 4),
+                'cpu_seconds': round(phase.cpu_time, 4),
+                'flowcells': phase.count,
+            }) for phase in self.phases.values()),
+        }
+
+    def prometheus(self):
+        """ The summary in the Prometheus text format, for the textfile collector of node-exporter """
+        summary = self.summary()
+        lines = []
+
+        def metric(name, help_text, samples):
+            name = '{}_{}'.format(self.prefix, name)
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} gauge'.format(name))
+            for labels, value in samples:
+                lines.append('{}{} {}'.format(name, labels, value))
+
+        phases = summary['phases']
+        metric('run_duration_seconds', 'Wall time of the last run.', [('', summary['duration'])])
+        metric('last_run_timestamp_seconds', 'End time of the last run.', [('', summary['timestamp'])])
+        metric('phase_wall_seconds', 'Wall time of the phases of the last run.',
+               [('{{phase="{}"}}'.format(name), stats['wall_seconds']) for name, stats in phases.items()])
+        metric('phase_cpu_seconds', 'CPU time of the phases of the last run.',
+               [('{{phase="{}"}}'.format(name), stats['cpu_seconds']) for name, stats in phases.items()])
+        metric('phase_flowcells', 'Flowcells processed by the phases of the last run.',
+               [('{{phase="{}"}}'.format(name), stats['flowcells']) for name, stats in phases.items()
+                if stats['flowcells'] is not None])
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """ Write the summary to path: Prometheus text format if the name ends with .prom, JSON otherwise.
+        The file is replaced atomically, the textfile collector never reads a partial file.
+
+        :param str path: Path to the output file
+        """
+        if path.endswith('.prom'):
+            content = self.prometheus()
+        else:
+            content = json.dumps(self.summary(), indent=2)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.rename(tmp_path, path)
+
+    def report(self, path=None):
+        summary = self.summary()
+        logging.info("Run finished in {}s: {}".format(summary['duration'], ', '.join(
+            '{} {}s'.format(name, stats['wall_seconds']) for name, stats in summary['phases'].items())))
+        if path:
+            try:
+                self.write(path)
+            except (IOError, OSError) as e:
+                logging.warning("Cannot write run timings to {}: {}".format(path, e))
+        return summary
@@ -0,0 +1,24 @@
+""" cProfile of a whole hugin run, `hugin --profile`
+"""
+import sys
+import pstats
+import cProfile
+
+
+def start_profiler(stats_file=None, limit=30, stream=None):
+    """ Start profiling, returns the function which stops it and prints the slowest functions.
+
+    :param str stats_file: Also dump the raw stats to this file, to be opened with pstats or snakeviz
+    :param int limit: Number of functions printed, sorted by cumulative time
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+    def stop():
+        profiler.disable()
+        if stats_file:
+            profiler.dump_stats(stats_file)
+        stats = pstats.Stats(profiler, stream=stream or sys.stderr)
+        stats.sort_stats('cumulative').print_stats(limit)
+        return stats
+    return stop